@@ -2,7 +2,7 @@
 
 import strawberry
 from typing import List, Optional
-from app.generated.client import Prisma
+from app.services.database import get_prisma, operacao_prisma
 
 # 🔹 Tipos GraphQL
 @strawberry.type
@@ -24,14 +24,12 @@ class Fluxo:
 class Query:
     @strawberry.field
     async def fluxo_por_id(self, id: int) -> Optional[Fluxo]:
-        prisma = Prisma()
-        await prisma.connect()
-        fluxo = await prisma.fluxoconversa.find_unique(
-    where={"id": id},
-    include={"slots": True}
-)
-
-        await prisma.disconnect()
+        prisma = await get_prisma()
+        with operacao_prisma():
+            fluxo = await prisma.fluxoconversa.find_unique(
+                where={"id": id},
+                include={"slots": True}
+            )
 
         if not fluxo:
             return None
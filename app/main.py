@@ -1,22 +1,61 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from app.routes.chat import router as chat_router
 from app.routes.upload import router as upload_router
 from app.routes.login import router as login_router
 from app.routes.register import router as register_router
+from app.routes.health import router as health_router
+from app.routes.metrics import router as metrics_router
 from strawberry.fastapi import GraphQLRouter
 from app.graphql.schema import Query
+from app.services.database import disconnect_prisma
+from app.services.prontidao import EstadoProntidao, aquecer
+from app.services.telemetria import telemetria
+from app.services.registro_interacoes import log_interacoes
+from app.services.llm_clientes import fechar_clientes
+from app.services.sessao import persistencia_turnos
 
 import strawberry
 
 schema = strawberry.Schema(query=Query)
 graphql_app = GraphQLRouter(schema, graphiql=True)
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 🔹 Módulos pesados, modelo de embeddings, pipeline RAG, Qdrant e Prisma aquecidos
+    # em segundo plano, com o servidor já aceitando conexões;
+    # /health/ready só fica verde quando tudo respondeu uma vez
+    app.state.prontidao = EstadoProntidao()
+    aquecimento = asyncio.create_task(aquecer(app.state.prontidao))
+    # 🔹 Thread que grava a telemetria em lote, fora do caminho das requisições
+    telemetria.iniciar()
+    # 🔹 Write-behind dos turnos do chat: gravados em lote no Prisma
+    if persistencia_turnos is not None:
+        persistencia_turnos.iniciar()
+    try:
+        yield
+    finally:
+        aquecimento.cancel()
+        # 🔹 Grava os eventos ainda na fila antes de sair
+        await asyncio.to_thread(telemetria.encerrar)
+        log_interacoes.fechar()
+        await fechar_clientes()
+        if persistencia_turnos is not None:
+            await persistencia_turnos.encerrar()
+        # 🔹 Um único query engine do Prisma por processo, fechado no desligamento
+        await disconnect_prisma()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(chat_router)
 app.include_router(upload_router)
 app.include_router(login_router)
 app.include_router(register_router)
+app.include_router(health_router)
+app.include_router(metrics_router)
 app.include_router(graphql_app, prefix="/graphql")
 
 if __name__ == "__main__":
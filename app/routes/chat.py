@@ -1,177 +1,378 @@
 import json
 import time
-import mlflow
-from fastapi import APIRouter, HTTPException, Header
-from typing import Optional
+import asyncio
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Header, Depends
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from typing import Optional, TYPE_CHECKING
 from pydantic import BaseModel
-from app.services.rag_chain import setup_rag_chain
+from app.services.database import get_prisma
+from app.services.rag_chain import carregar_pipeline, formatar_historico, formatar_contexto
+from app.services.sessao import (
+    SESSAO_PERSISTIR_APOS_RESPOSTA, CarregadorSessao, dados_turno, estado_sessoes, get_carregador_sessao,
+    persistencia_turnos, preparar_slots,
+)
+from app.services.extracao import extrair_intencao_e_slots
+from app.services.semantic_cache import buscar_resposta_cache, salvar_resposta_cache
+from app.services.planner import planejar_turno, concluir_turno, SAUDACAO_INICIAL, ENCAMINHAMENTO_COMERCIAL
+from app.services.telemetria import telemetria, evento_interacao, evento_erro
+from app.services.metricas import MedicaoTurno, medir, turno_atual
+from app.services.especulacao import (
+    BuscaEspeculativa, GeracaoEspeculativa, especulacao_ativa, geracao_especulativa_ativa, recuperar_documentos,
+)
+
+if TYPE_CHECKING:
+    from app.generated.client import Prisma
 
 router = APIRouter()
 
 class ChatRequest(BaseModel):
     pergunta: str
 
+
+def _log_slots(slots_dict: dict):
+    print(
+        f"[LOG] Slots extraídos: produto={slots_dict.get('produto')}, localidade={slots_dict.get('localidade')}, "
+        f"volume={slots_dict.get('volume_aproximado')}, prazo={slots_dict.get('prazo')}"
+    )
+
+
+def _log_documentos(documentos_utilizados):
+    print(f"[LOG] Documentos encontrados: {len(documentos_utilizados)}")
+    for i, doc in enumerate(documentos_utilizados):
+        print(f"[LOG] Doc {i+1}: {doc.page_content[:100]}... | Metadata: {doc.metadata}")
+
+
+async def _persistir_turno(prisma, sessao, etapa, intencao, pergunta, resposta, slots_dict, background_tasks=None):
+    slots, erros_slots = preparar_slots(slots_dict)
+    for nome, erro in erros_slots.items():
+        print(f"[ERRO] Falha ao salvar slot '{nome}': {erro}")
+    dados = dados_turno(sessao.id, etapa, intencao, pergunta, resposta, slots)
+
+    # 🔹 O estado em cache recebe na hora os mesmos slots do banco; com write-behind o banco
+    # recebe o turno no próximo lote. Se a gravação falhar, a sessão sai do cache.
+    await estado_sessoes.registrar_turno(sessao.token, pergunta, resposta, slots)
+
+    if persistencia_turnos is not None:
+        persistencia_turnos.registrar(sessao.token, dados)
+        return None
+    if background_tasks is not None:
+        background_tasks.add_task(estado_sessoes.gravar_turno, prisma, sessao.token, dados)
+        return None
+    return await estado_sessoes.gravar_turno(prisma, sessao.token, dados)
+
+
+def _registrar_mlflow(sessao, etapa, intencao, pergunta, resposta, slots_dict, documentos_utilizados, tempo_total, contexto="rag"):
+    # 🔹 Só enfileira: a gravação acontece em lote, na thread de telemetria
+    with medir("telemetria"):
+        telemetria.registrar(evento_interacao(
+            sessao.id, etapa, intencao, pergunta, resposta, slots_dict, documentos_utilizados, tempo_total, contexto
+        ))
+
+
+def _registrar_erro_mlflow(authorization, erro):
+    with medir("telemetria"):
+        telemetria.registrar(evento_erro(authorization, erro))
+
+
+def _slots_resposta(slots_dict: dict) -> dict:
+    return {
+        "produto": slots_dict.get("produto"),
+        "localidade": slots_dict.get("localidade"),
+        "volume_aproximado": slots_dict.get("volume_aproximado"),
+        "prazo": slots_dict.get("prazo")
+    }
+
+
 @router.post("/chat")
-async def chat(request: ChatRequest, authorization: Optional[str] = Header(None)):
+async def chat(
+    request: ChatRequest,
+    background_tasks: BackgroundTasks,
+    authorization: Optional[str] = Header(None),
+    prisma: "Prisma" = Depends(get_prisma),
+    sessoes: CarregadorSessao = Depends(get_carregador_sessao),
+):
     if not authorization:
         raise HTTPException(status_code=401, detail="Token de sessão ausente.")
 
     pergunta = request.pergunta.strip()
     inicio_execucao = time.time()
+    # 🔹 Durações por etapa, rotuladas com intenção e categoria no fim do turno
+    medicao = MedicaoTurno()
+    token_medicao = turno_atual.set(medicao)
+    intencao, filtro_categoria = "", ""
+    busca, geracao = None, None
 
     try:
-        chains = await setup_rag_chain(sessao_token=authorization)
-        classificacao_chain = chains["classificacao_chain"]
-        slot_filling_chain = chains["slot_filling_chain"]
-        prisma = chains["prisma"]
-        sessao = chains["sessao"]
-        eh_primeira_interacao = chains["eh_primeira_interacao"]
-        chat_history = chains["chat_history"]
-
-        intencao = classificacao_chain.invoke({"texto": pergunta}).strip()
-        print(f"[LOG] Intenção detectada: {intencao}")
-
-        try:
-            slots_dict = slot_filling_chain.invoke({"texto": pergunta})
-        except Exception as e:
-            print(f"[ERRO] Falha ao fazer parse do JSON de slots: {e}")
-            slots_dict = {}
-
-        produto = slots_dict.get("produto")
-        localidade = slots_dict.get("localidade")
-        volume = slots_dict.get("volume_aproximado")
-        prazo = slots_dict.get("prazo")
-
-        print(f"[LOG] Slots extraídos: produto={produto}, localidade={localidade}, volume={volume}, prazo={prazo}")
-
-        # 🔹 Mapeamento da intenção para categoria
-        mapa_categoria = {
-            "PEDIDO_ORCAMENTO": "produtos_servicos",
-            "PERGUNTA_PRODUTO": "produtos_servicos",
-            "VAGA_EMPREGO": "institucional",
-            "FORA_REGIAO": "institucional"
-        }
-        filtro_categoria = mapa_categoria.get(intencao)
-        print(f"[LOG] Categoria usada no filtro RAG: {filtro_categoria}")
+        with medir("setup"):
+            pipeline = await carregar_pipeline()
 
-        chains = await setup_rag_chain(sessao_token=authorization, filtro_categoria=filtro_categoria)
-        rag_chain = chains["rag_chain"]
+        # 🔹 Sessão e extração (intenção + slots) são independentes: rodam em paralelo.
+        # Com RAG_ESPECULATIVO=1 a busca vetorial de todas as categorias começa junto e fica pronta
+        # atrás do classificador; com GERACAO_ESPECULATIVA=1 a resposta de produtos_servicos também.
+        tarefa_sessao = sessoes.carregar(authorization)
+        if especulacao_ativa():
+            busca = BuscaEspeculativa(pipeline, pergunta, tarefa_sessao)
+        if geracao_especulativa_ativa():
+            geracao = GeracaoEspeculativa(pipeline, pergunta, tarefa_sessao, busca)
+        contexto, (intencao, slots_dict) = await asyncio.gather(
+            tarefa_sessao,
+            extrair_intencao_e_slots(pipeline, pergunta),
+        )
+        sessao = contexto["sessao"]
+        eh_primeira_interacao = contexto["eh_primeira_interacao"]
+        chat_history = contexto["chat_history"]
 
-        resultado = rag_chain.invoke({
-            "question": pergunta,
-            "chat_history": chat_history
-        })
-
-        resposta_base = resultado.get("answer", "").strip()
-        fontes = resultado.get("sources", "")
+        print(f"[LOG] Intenção detectada: {intencao}")
+        _log_slots(slots_dict)
 
-        documentos_utilizados = resultado.get("source_documents", [])
-        print(f"[LOG] Documentos encontrados: {len(documentos_utilizados)}")
-        for i, doc in enumerate(documentos_utilizados):
-            print(f"[LOG] Doc {i+1}: {doc.page_content[:100]}... | Metadata: {doc.metadata}")
+        # 🔹 Plano do turno: respostas fixas dispensam busca vetorial e geração
+        plano = planejar_turno(intencao, slots_dict, eh_primeira_interacao)
+        filtro_categoria = plano["categoria"]
+        resposta_base, fontes, documentos_utilizados = "", "", []
+        if geracao is not None and not (plano["usar_rag"] and geracao.atende(filtro_categoria)):
+            geracao.cancelar()
 
-        origens_utilizadas = list({
-            doc.metadata.get("source", "desconhecido") for doc in documentos_utilizados
-        })
+        if plano["usar_rag"]:
+            print(f"[LOG] Categoria usada no filtro RAG: {filtro_categoria}")
 
-        saudacao = "Bom dia, tudo bem? " if eh_primeira_interacao else ""
+            # 🔹 Perguntas quase idênticas reaproveitam a resposta RAG já gerada
+            entrada_cache, chave_cache = await buscar_resposta_cache(pergunta, filtro_categoria, chat_history)
+            especulado = None
+            if not entrada_cache and geracao is not None and geracao.atende(filtro_categoria):
+                # 🔹 Mesma categoria da geração especulativa: espera só o que falta dela
+                with medir("geracao_resposta"):
+                    especulado = await geracao.resultado(filtro_categoria)
+            if entrada_cache:
+                resposta_base = entrada_cache["resposta"]
+                documentos_utilizados = entrada_cache["documentos"]
+                if geracao is not None:
+                    geracao.cancelar()
+            elif especulado is not None:
+                documentos_utilizados, resposta_base = especulado
+                salvar_resposta_cache(chave_cache, filtro_categoria, resposta_base, documentos_utilizados)
+            else:
+                documentos_utilizados = await recuperar_documentos(
+                    pipeline, pergunta, chat_history, filtro_categoria, busca
+                )
+                with medir("geracao_resposta"):
+                    resposta_base = (await pipeline["answer_chain"].ainvoke({
+                        "question": pergunta,
+                        "chat_history": formatar_historico(chat_history),
+                        "context": formatar_contexto(documentos_utilizados),
+                    })).strip()
+                salvar_resposta_cache(chave_cache, filtro_categoria, resposta_base, documentos_utilizados)
 
-        if intencao == "PEDIDO_ORCAMENTO" and produto and localidade:
-            resposta = "Estou transferindo seu atendimento para o vendedor responsável. Em instantes ele entra em contato para dar continuidade ao seu pedido."
-        elif "consultar um especialista" in resposta_base.lower() or len(documentos_utilizados) == 0:
-            resposta = "Preciso consultar um especialista sobre isso."
+            _log_documentos(documentos_utilizados)
         else:
-            encaminhamento = "\nPosso encaminhar seu pedido para nosso setor comercial." if intencao == "PEDIDO_ORCAMENTO" else ""
-            resposta = f"{saudacao}{resposta_base}{encaminhamento}".strip()
-
-        if intencao == "CONFIRMACAO" and produto and localidade:
-            resposta = f"Ótimo! Já tenho o pedido de {volume or 'volume não informado'} de {produto} para {localidade}. Estou encaminhando ao setor responsável."
-
-        if intencao == "SAUDACAO" and eh_primeira_interacao:
-            etapa = "INICIO"
-        elif intencao == "PEDIDO_ORCAMENTO" and (produto and localidade):
-            etapa = "FINALIZADO"
-        elif intencao == "PEDIDO_ORCAMENTO":
-            etapa = "COLETA_INFO"
-        elif intencao in ("DESPEDIDA", "FORA_REGIAO") or "consultar um especialista" in resposta.lower():
-            etapa = "FINALIZADO"
-        elif intencao == "CONFIRMACAO":
-            etapa = "FINALIZADO"
-        else:
-            etapa = "MEIO"
+            print("[LOG] Resposta fixa planejada, RAG não executado")
 
-        fluxo = await prisma.fluxoconversa.create(data={
-            "sessaoId": sessao.id,
-            "etapa": etapa,
-            "intencao": intencao,
-            "pedido": pergunta,
-            "resposta": resposta
-        })
-
-        for nome, valor in slots_dict.items():
-            if valor:
-                try:
-                    await prisma.slotpreenchido.create(data={
-                        "fluxoId": fluxo.id,
-                        "nome": nome,
-                        "valor": valor
-                    })
-                    print(f"[LOG] Slot salvo: {nome} = {valor}")
-                except Exception as e:
-                    print(f"[ERRO] Falha ao salvar slot '{nome}': {e}")
+        resposta, etapa = concluir_turno(plano, resposta_base, documentos_utilizados)
+
+        with medir("persistencia"):
+            await _persistir_turno(
+                prisma, sessao, etapa, intencao, pergunta, resposta, slots_dict,
+                background_tasks if SESSAO_PERSISTIR_APOS_RESPOSTA else None,
+            )
 
         tempo_total = time.time() - inicio_execucao
 
         # 🔹 Log com MLflow
-        mlflow.set_experiment("chat")
-        with mlflow.start_run():
-            mlflow.set_tag("sessao_id", sessao.id)
-            mlflow.set_tag("etapa", etapa)
-            mlflow.set_tag("sucesso", True)
-            mlflow.log_param("intencao", intencao)
-            mlflow.log_param("pergunta", pergunta)
-            mlflow.log_param("resposta", resposta[:300])
-
-            docs_usados = [doc.page_content for doc in resultado.get("source_documents", [])]
-            mlflow.log_dict({"documentos": docs_usados}, "rag_contexto.json")
-            mlflow.log_metric("tempo_execucao", tempo_total)
-
-            mlflow.log_dict({
-                "pergunta": pergunta,
-                "resposta": resposta,
-                "documentos": [doc.page_content for doc in documentos_utilizados],
-                "origens": origens_utilizadas,
-                "slots": slots_dict,
-                "intencao": intencao
-            }, artifact_file="interacao.json")
-
-            mlflow.log_dict({
-                "origens_utilizadas": origens_utilizadas,
-                "contexto": "rag"
-            }, "input_metadata.json")
+        _registrar_mlflow(
+            sessao, etapa, intencao, pergunta, resposta, slots_dict, documentos_utilizados, tempo_total,
+            contexto="rag" if plano["usar_rag"] else "template"
+        )
 
         return {
             "intencao": intencao,
             "etapa": etapa,
             "resposta": resposta,
             "fonte": fontes,
-            "slots": {
-                "produto": produto,
-                "localidade": localidade,
-                "volume_aproximado": volume,
-                "prazo": prazo
-            }
+            "slots": _slots_resposta(slots_dict)
         }
 
     except Exception as e:
         print(f"[FATAL] Erro inesperado: {e}")
-        mlflow.set_experiment("chat")
-        with mlflow.start_run():
-            mlflow.set_tag("sessao_id", authorization)
-            mlflow.set_tag("erro", str(e))
-            mlflow.set_tag("sucesso", False)
+        _registrar_erro_mlflow(authorization, e)
 
         raise HTTPException(status_code=500, detail=f"Erro no processamento: {str(e)}")
 
     finally:
-        await prisma.disconnect()
+        # 🔹 Resposta fixa, cache semântico, outra categoria ou erro: especulações não usadas são descartadas
+        if geracao is not None:
+            geracao.cancelar()
+        if busca is not None:
+            busca.cancelar()
+        medicao.finalizar(intencao, filtro_categoria)
+        turno_atual.reset(token_medicao)
+
+
+def _evento_sse(evento: str, dados) -> str:
+    return f"event: {evento}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n"
+
+
+@router.post("/chat/stream")
+async def chat_stream(
+    request: ChatRequest,
+    authorization: Optional[str] = Header(None),
+    prisma: "Prisma" = Depends(get_prisma),
+    sessoes: CarregadorSessao = Depends(get_carregador_sessao),
+):
+    """
+    Variante SSE do /chat. Eventos emitidos:
+    - `meta`: intenção, slots e categoria, assim que conhecidos
+    - `token`: trechos da resposta conforme o LLM gera
+    - `fim`: resposta final (pode substituir os tokens, ex.: "consultar um especialista") e etapa
+    - `erro`: falha no processamento
+    Persistência e log no MLflow rodam depois que o stream fecha.
+    """
+    if not authorization:
+        raise HTTPException(status_code=401, detail="Token de sessão ausente.")
+
+    pergunta = request.pergunta.strip()
+    inicio_execucao = time.time()
+    turno = {}
+    medicao = MedicaoTurno()
+
+    async def gerar_eventos():
+        turno_atual.set(medicao)
+        busca, geracao = None, None
+        try:
+            with medir("setup"):
+                pipeline = await carregar_pipeline()
+
+            tarefa_sessao = sessoes.carregar(authorization)
+            if especulacao_ativa():
+                busca = BuscaEspeculativa(pipeline, pergunta, tarefa_sessao)
+            if geracao_especulativa_ativa():
+                geracao = GeracaoEspeculativa(pipeline, pergunta, tarefa_sessao, busca)
+            contexto, (intencao, slots_dict) = await asyncio.gather(
+                tarefa_sessao,
+                extrair_intencao_e_slots(pipeline, pergunta),
+            )
+            plano = planejar_turno(intencao, slots_dict, contexto["eh_primeira_interacao"])
+            filtro_categoria = plano["categoria"]
+            if geracao is not None and not (plano["usar_rag"] and geracao.atende(filtro_categoria)):
+                geracao.cancelar()
+            print(f"[LOG] Intenção detectada: {intencao}")
+            _log_slots(slots_dict)
+
+            yield _evento_sse("meta", {
+                "intencao": intencao,
+                "slots": _slots_resposta(slots_dict),
+                "categoria": filtro_categoria
+            })
+
+            documentos_utilizados = []
+            resposta_base = ""
+            entrada_cache, chave_cache, especulado = None, None, None
+            if plano["usar_rag"]:
+                entrada_cache, chave_cache = await buscar_resposta_cache(
+                    pergunta, filtro_categoria, contexto["chat_history"]
+                )
+                if not entrada_cache and geracao is not None:
+                    especulado = await geracao.documentos_prontos(filtro_categoria)
+                if entrada_cache:
+                    documentos_utilizados = entrada_cache["documentos"]
+                    if geracao is not None:
+                        geracao.cancelar()
+                elif especulado is not None:
+                    documentos_utilizados = especulado
+                else:
+                    documentos_utilizados = await recuperar_documentos(
+                        pipeline, pergunta, contexto["chat_history"], filtro_categoria, busca
+                    )
+                _log_documentos(documentos_utilizados)
+
+            if documentos_utilizados:
+                if plano["eh_primeira_interacao"]:
+                    yield _evento_sse("token", {"texto": SAUDACAO_INICIAL})
+
+                if entrada_cache:
+                    resposta_base = entrada_cache["resposta"]
+                    yield _evento_sse("token", {"texto": resposta_base})
+                else:
+                    async def gerar_resposta():
+                        answer_chain = pipeline["resposta_prompt"] | pipeline["llm"]
+                        async for trecho in answer_chain.astream({
+                            "question": pergunta,
+                            "chat_history": formatar_historico(contexto["chat_history"]),
+                            "context": formatar_contexto(documentos_utilizados),
+                        }):
+                            if trecho.content:
+                                yield trecho.content
+
+                    # Repassa o que a geração especulativa já produziu e segue com o restante;
+                    # se ela falhar antes do primeiro trecho, gera de novo como no /chat
+                    trechos = geracao.trechos(gerar_resposta) if especulado is not None else gerar_resposta()
+                    try:
+                        with medir("geracao_resposta"):
+                            async for texto in trechos:
+                                resposta_base += texto
+                                yield _evento_sse("token", {"texto": texto})
+                    finally:
+                        # Cliente desconectado: fecha já o stream (e interrompe a geração especulativa)
+                        await trechos.aclose()
+                    salvar_resposta_cache(chave_cache, filtro_categoria, resposta_base.strip(), documentos_utilizados)
+
+                if intencao == "PEDIDO_ORCAMENTO" and "consultar um especialista" not in resposta_base.lower():
+                    yield _evento_sse("token", {"texto": ENCAMINHAMENTO_COMERCIAL})
+
+            resposta, etapa = concluir_turno(plano, resposta_base.strip(), documentos_utilizados)
+
+            turno.update(
+                sessao=contexto["sessao"],
+                etapa=etapa,
+                intencao=intencao,
+                resposta=resposta,
+                slots_dict=slots_dict,
+                documentos_utilizados=documentos_utilizados,
+                contexto="rag" if plano["usar_rag"] else "template",
+                categoria=filtro_categoria,
+            )
+
+            yield _evento_sse("fim", {"intencao": intencao, "etapa": etapa, "resposta": resposta})
+
+        except Exception as e:
+            print(f"[FATAL] Erro inesperado no stream: {e}")
+            turno["erro"] = e
+            yield _evento_sse("erro", {"detail": f"Erro no processamento: {str(e)}"})
+        finally:
+            if geracao is not None:
+                geracao.cancelar()
+            if busca is not None:
+                busca.cancelar()
+
+    async def finalizar_turno():
+        if not turno:
+            return
+
+        token_medicao = turno_atual.set(medicao)
+        try:
+            if "erro" in turno:
+                _registrar_erro_mlflow(authorization, turno["erro"])
+                return
+
+            with medir("persistencia"):
+                await _persistir_turno(
+                    prisma, turno["sessao"], turno["etapa"], turno["intencao"],
+                    pergunta, turno["resposta"], turno["slots_dict"]
+                )
+            tempo_total = time.time() - inicio_execucao
+            _registrar_mlflow(
+                turno["sessao"], turno["etapa"], turno["intencao"], pergunta, turno["resposta"],
+                turno["slots_dict"], turno["documentos_utilizados"], tempo_total,
+                contexto=turno["contexto"]
+            )
+        except Exception as e:
+            print(f"[ERRO] Falha ao finalizar turno do stream: {e}")
+        finally:
+            medicao.finalizar(turno.get("intencao", ""), turno.get("categoria", ""))
+            turno_atual.reset(token_medicao)
+
+    return StreamingResponse(
+        gerar_eventos(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(finalizar_turno),
+    )
@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+
+router = APIRouter()
+
+
+@router.get("/health/live")
+async def health_live():
+    return {"status": "ok"}
+
+
+@router.get("/health/ready")
+async def health_ready(request: Request):
+    """200 só depois do aquecimento (modelo, pipeline, Qdrant e Prisma); 503 até lá."""
+    estado = getattr(request.app.state, "prontidao", None)
+    if estado is None:
+        return JSONResponse(status_code=503, content={"status": "aquecendo", "etapas": {}})
+    return JSONResponse(status_code=200 if estado.pronto else 503, content=estado.resumo())
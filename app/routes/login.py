@@ -1,8 +1,12 @@
-from fastapi import APIRouter, HTTPException
+from typing import TYPE_CHECKING
+from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
-from app.generated.client import Prisma
+from app.services.database import get_prisma, operacao_prisma
 import uuid
 
+if TYPE_CHECKING:
+    from app.generated.client import Prisma
+
 router = APIRouter()
 
 class LoginRequest(BaseModel):
@@ -16,29 +20,25 @@ class LoginResponse(BaseModel):
     email: str
 
 @router.post("/login", response_model=LoginResponse)
-async def login(request: LoginRequest):
-    prisma = Prisma()
-    await prisma.connect()
-
-    # 🔹 Verifica se o usuário já existe
-    usuario = await prisma.usuario.find_unique(where={"email": request.email})
-
-    # 🔹 Se não existir, cria
-    if not usuario:
-        usuario = await prisma.usuario.create(data={
-            "email": request.email,
-            "nome": request.nome
+async def login(request: LoginRequest, prisma: "Prisma" = Depends(get_prisma)):
+    with operacao_prisma():
+        # 🔹 Verifica se o usuário já existe
+        usuario = await prisma.usuario.find_unique(where={"email": request.email})
+
+        # 🔹 Se não existir, cria
+        if not usuario:
+            usuario = await prisma.usuario.create(data={
+                "email": request.email,
+                "nome": request.nome
+            })
+
+        # 🔹 Cria nova sessão
+        token = str(uuid.uuid4())
+        await prisma.sessao.create(data={
+            "token": token,
+            "usuarioId": usuario.id
         })
 
-    # 🔹 Cria nova sessão
-    token = str(uuid.uuid4())
-    await prisma.sessao.create(data={
-        "token": token,
-        "usuarioId": usuario.id
-    })
-
-    await prisma.disconnect()
-
     return LoginResponse(
         token=token,
         usuario_id=usuario.id,
@@ -0,0 +1,53 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.services.database import conexao_perdida, get_prisma
+from app.services.metricas import latencia_etapas, estatisticas_prometheus
+from app.services.semantic_cache import cache_semantico
+from app.services.telemetria import telemetria
+from app.services.especulacao import estatisticas_busca, estatisticas_geracao
+from app.services.sessao import estado_sessoes, persistencia_turnos
+
+router = APIRouter()
+
+
+def _componentes() -> dict:
+    componentes = {
+        "cache_semantico": cache_semantico.estatisticas(),
+        "telemetria": telemetria.estatisticas(),
+        "busca_especulativa": estatisticas_busca.estatisticas(),
+        "geracao_especulativa": estatisticas_geracao.estatisticas(),
+    }
+    if estado_sessoes.cache is not None:
+        componentes["estado_sessoes"] = estado_sessoes.cache.estatisticas()
+    if persistencia_turnos is not None:
+        componentes["persistencia_turnos"] = persistencia_turnos.estatisticas()
+    from app.services.embeddings import cache_vetores, embedding_pool, embeddings_consulta
+
+    componentes["embedding_pool"] = embedding_pool.estatisticas()
+    componentes["embedding_batcher"] = embeddings_consulta.batcher.estatisticas()
+    if cache_vetores is not None:
+        componentes["cache_vetores"] = cache_vetores.estatisticas()
+
+    from app.services.llm_cache import caches_llm
+
+    for nome, cache in caches_llm.items():
+        componentes[f"cache_llm_{nome}"] = cache.estatisticas()
+    return componentes
+
+
+@router.get("/metrics")
+async def metrics():
+    """Histogramas de latência por etapa, contadores internos e métricas do engine do Prisma."""
+    partes = [latencia_etapas.prometheus()]
+    try:
+        partes.append(estatisticas_prometheus("chat_componente", _componentes()))
+    except Exception as e:
+        print(f"[WARN] Falha ao coletar estatísticas dos componentes: {e}")
+    try:
+        prisma = await get_prisma()
+        partes.append(await prisma.get_metrics(format="prometheus"))
+    except Exception as e:
+        print(f"[WARN] Falha ao coletar métricas do Prisma: {e}")
+        conexao_perdida(e)
+
+    return PlainTextResponse("\n".join(partes), media_type="text/plain; version=0.0.4; charset=utf-8")
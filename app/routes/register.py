@@ -1,8 +1,12 @@
-from fastapi import APIRouter, HTTPException
+from typing import TYPE_CHECKING
+from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel, EmailStr
-from app.generated.client import Prisma
+from app.services.database import get_prisma, operacao_prisma
 from passlib.context import CryptContext
 
+if TYPE_CHECKING:
+    from app.generated.client import Prisma
+
 router = APIRouter()
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -12,12 +16,10 @@ class RegisterRequest(BaseModel):
     senha: str
 
 @router.post("/register")
-async def register(request: RegisterRequest):
-    prisma = Prisma()
-    await prisma.connect()
-
+async def register(request: RegisterRequest, prisma: "Prisma" = Depends(get_prisma)):
     # Verifica se já existe usuário com esse email
-    existing = await prisma.usuario.find_unique(where={"email": request.email})
+    with operacao_prisma():
+        existing = await prisma.usuario.find_unique(where={"email": request.email})
     if existing:
         raise HTTPException(status_code=400, detail="Email já registrado.")
 
@@ -25,13 +27,13 @@ async def register(request: RegisterRequest):
     hashed = pwd_context.hash(request.senha)
 
     # Cria o usuário
-    user = await prisma.usuario.create(data={
-        "nome": request.nome,
-        "email": request.email,
-        "senha_hash": hashed
-    })
+    with operacao_prisma():
+        user = await prisma.usuario.create(data={
+            "nome": request.nome,
+            "email": request.email,
+            "senha_hash": hashed
+        })
 
-    await prisma.disconnect()
     return {
         "id": user.id,
         "email": user.email,
@@ -1,10 +1,5 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_core.documents import Document
-from app.services.embeddings import embedding_model
-from qdrant_client import QdrantClient
-from qdrant_client.models import VectorParams, Distance
-from langchain_community.vectorstores.qdrant import Qdrant as LangchainQdrant
+from app.services.semantic_cache import cache_semantico
 
 import json
 import os
@@ -16,6 +11,13 @@ QDRANT_COLLECTION = "cemear_knowledge_base"
 
 @router.post("/upload-conhecimento")
 async def upload_conhecimento(file: UploadFile = File(...)):
+    # 🔹 Dependências pesadas só no primeiro upload, não na subida da API
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    from langchain_community.vectorstores.qdrant import Qdrant as LangchainQdrant
+    from qdrant_client import QdrantClient, AsyncQdrantClient
+    from qdrant_client.models import VectorParams, Distance
+    from app.services.embeddings import embeddings_consulta
+
     try:
         content = await file.read()
 
@@ -57,13 +59,14 @@ async def upload_conhecimento(file: UploadFile = File(...)):
 
         # 🔹 Cria cliente Qdrant
         qdrant_client = QdrantClient(url=QDRANT_URL)
+        async_qdrant_client = AsyncQdrantClient(url=QDRANT_URL)
 
-        # 🔹 Descobre tamanho do vetor dinamicamente
-        sample_vector = embedding_model.embed_query("exemplo de texto")
+        # 🔹 Descobre tamanho do vetor dinamicamente (inferência no pool de embeddings)
+        sample_vector = await embeddings_consulta.aembed_query("exemplo de texto")
         embedding_size = len(sample_vector)
 
         # 🔹 Recria coleção com dimensão correta
-        qdrant_client.recreate_collection(
+        await async_qdrant_client.recreate_collection(
             collection_name=QDRANT_COLLECTION,
             vectors_config=VectorParams(
                 size=embedding_size,
@@ -74,12 +77,16 @@ async def upload_conhecimento(file: UploadFile = File(...)):
         # 🔹 Instância da vectorstore Langchain
         vectorstore = LangchainQdrant(
             client=qdrant_client,
+            async_client=async_qdrant_client,
             collection_name=QDRANT_COLLECTION,
-            embeddings=embedding_model,
+            embeddings=embeddings_consulta,
         )
 
-        # 🔹 Adiciona documentos
-        vectorstore.add_documents(documentos)
+        # 🔹 Adiciona documentos sem travar o event loop: embeddings rodam no pool
+        await vectorstore.aadd_documents(documentos)
+
+        # 🔹 Coleção substituída: respostas em cache não valem mais
+        cache_semantico.invalidar()
 
         return {
             "status": "sucesso",
@@ -0,0 +1,142 @@
+import os
+import json
+import time
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+
+# 🔹 Onde fica o estado das sessões ativas: "memoria" (por processo), "redis" (compartilhado) ou "off"
+SESSAO_CACHE_BACKEND = os.getenv("SESSAO_CACHE_BACKEND", "memoria").strip().lower()
+SESSAO_CACHE_TTL_S = float(os.getenv("SESSAO_CACHE_TTL_S", "1800"))
+SESSAO_CACHE_MAX_SESSOES = int(os.getenv("SESSAO_CACHE_MAX_SESSOES", "10000"))
+SESSAO_REDIS_URL = os.getenv("SESSAO_REDIS_URL", "redis://localhost:6379/0")
+SESSAO_REDIS_PREFIXO = os.getenv("SESSAO_REDIS_PREFIXO", "sessao:")
+
+
+class CacheEstados(ABC):
+    """
+    Interface dos caches de estado de sessão. Valores são dicts serializáveis em JSON;
+    `obter` devolve uma cópia, então alterar o resultado não muda o cache sem `salvar`.
+    """
+
+    @abstractmethod
+    async def obter(self, chave: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def salvar(self, chave: str, valor: dict):
+        ...
+
+    @abstractmethod
+    async def remover(self, chave: str):
+        ...
+
+    def estatisticas(self) -> dict:
+        return {}
+
+
+class CacheEstadosMemoria(CacheEstados):
+    """LRU com TTL por entrada (renovado a cada escrita), dentro do processo."""
+
+    def __init__(self, max_entradas: int = SESSAO_CACHE_MAX_SESSOES, ttl: float = SESSAO_CACHE_TTL_S, relogio=time.monotonic):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.relogio = relogio
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        self.remocoes = 0
+
+    async def obter(self, chave: str) -> Optional[dict]:
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is not None and self.ttl > 0 and self.relogio() - entrada[0] > self.ttl:
+                del self._entradas[chave]
+                self.remocoes += 1
+                entrada = None
+            if entrada is None:
+                self.falhas += 1
+                return None
+            self._entradas.move_to_end(chave)
+            self.acertos += 1
+            return json.loads(entrada[1])
+
+    async def salvar(self, chave: str, valor: dict):
+        with self._lock:
+            self._entradas[chave] = (self.relogio(), json.dumps(valor, ensure_ascii=False))
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+                self.remocoes += 1
+
+    async def remover(self, chave: str):
+        with self._lock:
+            self._entradas.pop(chave, None)
+
+    def estatisticas(self) -> dict:
+        total = self.acertos + self.falhas
+        return {
+            "backend": "memoria",
+            "entradas": len(self._entradas),
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "remocoes": self.remocoes,
+            "taxa_acerto": self.acertos / total if total else 0.0,
+        }
+
+
+class CacheEstadosRedis(CacheEstados):
+    """
+    Estado compartilhado entre nós da aplicação, em qualquer servidor que fale o protocolo
+    do Redis (`get`/`set ex`/`delete` assíncronos). O TTL vira expiração da chave; o limite
+    de tamanho fica com a política `maxmemory-policy allkeys-lru` do servidor.
+    """
+
+    def __init__(self, cliente, ttl: float = SESSAO_CACHE_TTL_S, prefixo: str = SESSAO_REDIS_PREFIXO):
+        self.cliente = cliente
+        self.ttl = ttl
+        self.prefixo = prefixo
+        self.acertos = 0
+        self.falhas = 0
+
+    async def obter(self, chave: str) -> Optional[dict]:
+        valor = await self.cliente.get(self.prefixo + chave)
+        if valor is None:
+            self.falhas += 1
+            return None
+        self.acertos += 1
+        return json.loads(valor)
+
+    async def salvar(self, chave: str, valor: dict):
+        await self.cliente.set(
+            self.prefixo + chave, json.dumps(valor, ensure_ascii=False), ex=int(self.ttl) if self.ttl > 0 else None
+        )
+
+    async def remover(self, chave: str):
+        await self.cliente.delete(self.prefixo + chave)
+
+    def estatisticas(self) -> dict:
+        total = self.acertos + self.falhas
+        return {
+            "backend": "redis",
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "taxa_acerto": self.acertos / total if total else 0.0,
+        }
+
+
+def criar_cache_estados(backend: str = SESSAO_CACHE_BACKEND) -> Optional[CacheEstados]:
+    if backend == "off":
+        return None
+    if backend == "redis":
+        try:
+            import redis.asyncio as redis_asyncio
+        except ImportError:
+            print("[WARN] Pacote redis ausente (pip install redis); estado de sessão em memória")
+        else:
+            return CacheEstadosRedis(redis_asyncio.from_url(SESSAO_REDIS_URL, decode_responses=True))
+    elif backend != "memoria":
+        print(f"[WARN] SESSAO_CACHE_BACKEND desconhecido: {backend}; usando memória")
+    return CacheEstadosMemoria()
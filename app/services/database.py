@@ -0,0 +1,131 @@
+import asyncio
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from app.generated.client import Prisma
+
+# 🔹 Cliente único do processo: um só query engine para todas as requisições.
+# Criado no primeiro uso — o client gerado (types/actions) é pesado de importar.
+prisma = None
+
+_lock = asyncio.Lock()
+_loop = None
+# Marcado por `conexao_perdida` quando uma operação falha com o engine fora do ar
+_reconectar = False
+# Endereço HTTP do query engine: só falhas de transporte para ele contam como engine fora do ar
+_url_engine = None
+
+
+def _cliente() -> "Prisma":
+    global prisma
+    if prisma is None:
+        from app.generated.client import Prisma
+
+        prisma = Prisma()
+    return prisma
+
+
+def _engine_ativo() -> bool:
+    if prisma is None or _reconectar or not prisma.is_connected():
+        return False
+
+    # A sessão HTTP do engine fica presa ao event loop em que foi criada
+    return _loop is asyncio.get_running_loop()
+
+
+def _mesmo_destino(url, base) -> bool:
+    import httpx
+
+    base = httpx.URL(base)
+    return (url.scheme, url.host, url.port) == (base.scheme, base.host, base.port)
+
+
+def _erro_de_conexao(erro: BaseException) -> bool:
+    import httpx
+    from app.generated.errors import ClientNotConnectedError, HTTPClientClosedError
+    from app.generated.engine.errors import EngineConnectionError, NotConnectedError
+
+    tipos_prisma = (ClientNotConnectedError, HTTPClientClosedError, EngineConnectionError, NotConnectedError)
+    vistos = set()
+    # Percorre a cadeia de causas; LLM e Qdrant também usam httpx, então um erro de transporte
+    # só conta se a requisição era para o query engine
+    while erro is not None and id(erro) not in vistos:
+        if isinstance(erro, tipos_prisma):
+            return True
+        if isinstance(erro, httpx.TransportError) and _url_engine is not None:
+            try:
+                if _mesmo_destino(erro.request.url, _url_engine):
+                    return True
+            except RuntimeError:
+                pass  # erro sem a requisição associada
+        vistos.add(id(erro))
+        erro = erro.__cause__ or erro.__context__
+    return False
+
+
+def conexao_perdida(erro: BaseException) -> bool:
+    """
+    Chamar onde o erro de uma operação do Prisma é tratado. Se o query engine caiu (processo
+    morto, sessão HTTP fechada), o próximo `get_prisma` reconecta o cliente compartilhado.
+    """
+    global _reconectar
+
+    if prisma is None or not _erro_de_conexao(erro):
+        return False
+    if not _reconectar:
+        print(f"[WARN] Query engine do Prisma indisponível ({type(erro).__name__}), reconectando no próximo uso")
+    _reconectar = True
+    return True
+
+
+@contextmanager
+def operacao_prisma():
+    """Envolve operações do Prisma: erro de conexão com o engine marca a reconexão e sobe."""
+    try:
+        yield
+    except Exception as e:
+        conexao_perdida(e)
+        raise
+
+
+async def connect_prisma() -> "Prisma":
+    """Conecta (ou reconecta, se o engine caiu) o cliente compartilhado."""
+    global _loop, _reconectar, _url_engine
+
+    _cliente()
+    async with _lock:
+        if _engine_ativo():
+            return prisma
+
+        if prisma.is_connected():
+            print("[WARN] Query engine do Prisma indisponível, reconectando...")
+            try:
+                await prisma.disconnect()
+            except Exception as e:
+                print(f"[WARN] Falha ao encerrar engine anterior: {e}")
+
+        await prisma.connect()
+        _loop = asyncio.get_running_loop()
+        _reconectar = False
+        # O client gerado não expõe o endereço do engine; só é lido aqui, a cada conexão
+        _url_engine = getattr(getattr(prisma, "_internal_engine", None), "url", None)
+        print("[LOG] Prisma conectado")
+
+    return prisma
+
+
+async def disconnect_prisma() -> None:
+    global _loop
+
+    async with _lock:
+        if prisma is not None and prisma.is_connected():
+            await prisma.disconnect()
+        _loop = None
+
+
+async def get_prisma() -> "Prisma":
+    """Dependência FastAPI: entrega o cliente compartilhado já conectado."""
+    if _engine_ativo():
+        return prisma
+    return await connect_prisma()
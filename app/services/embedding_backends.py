@@ -0,0 +1,190 @@
+import os
+import threading
+from abc import abstractmethod
+from pathlib import Path
+from typing import List
+from langchain_core.embeddings import Embeddings
+
+# 🔹 Backend de inferência: "sentence_transformers" (fp32), "onnx" ou "int8"
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "sentence_transformers").strip().lower()
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "BAAI/bge-large-en-v1.5")
+# Diretório local com o modelo (pesos HF e, para o backend onnx, model.onnx)
+EMBEDDING_MODEL_DIR = os.getenv("EMBEDDING_MODEL_DIR")
+EMBEDDING_MAX_TOKENS = int(os.getenv("EMBEDDING_MAX_TOKENS", "512"))
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+
+
+def _origem_modelo(diretorio: str = None) -> str:
+    return diretorio or EMBEDDING_MODEL_DIR or EMBEDDING_MODEL
+
+
+class BackendEmbeddings(Embeddings):
+    """
+    Interface comum dos backends: `embed_documents` devolve vetores normalizados (L2),
+    então a similaridade de cosseno do Qdrant é a mesma em todos eles.
+    """
+
+    nome = "base"
+
+    @abstractmethod
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Vetores normalizados dos textos; cada backend implementa."""
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class BackendSentenceTransformers(BackendEmbeddings):
+    """Caminho atual: sentence-transformers em fp32."""
+
+    nome = "sentence_transformers"
+
+    def __init__(self, diretorio: str = None):
+        from sentence_transformers import SentenceTransformer
+
+        self.modelo = SentenceTransformer(_origem_modelo(diretorio), device="cpu")
+        self.modelo.max_seq_length = EMBEDDING_MAX_TOKENS
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vetores = self.modelo.encode(
+            list(texts), batch_size=EMBEDDING_BATCH_SIZE, normalize_embeddings=True, convert_to_numpy=True
+        )
+        return vetores.tolist()
+
+
+class BackendInt8(BackendSentenceTransformers):
+    """sentence-transformers com as camadas Linear quantizadas dinamicamente para int8."""
+
+    nome = "int8"
+
+    def __init__(self, diretorio: str = None):
+        import torch
+
+        super().__init__(diretorio)
+        self.modelo = torch.quantization.quantize_dynamic(self.modelo, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class BackendOnnx(BackendEmbeddings):
+    """
+    ONNX Runtime em CPU. Espera `model.onnx` (ou `model_int8.onnx`, se `quantizado`)
+    e o tokenizer no diretório do modelo; veja `exportar_onnx`.
+    Pooling pelo token [CLS] + normalização, como o bge.
+    """
+
+    nome = "onnx"
+
+    def __init__(self, diretorio: str = None, quantizado: bool = False):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        diretorio = Path(_origem_modelo(diretorio))
+        arquivo = diretorio / ("model_int8.onnx" if quantizado else "model.onnx")
+        if not arquivo.exists():
+            raise FileNotFoundError(
+                f"{arquivo} não encontrado; gere com `python -m benchmarks.bench_embeddings --exportar-onnx {diretorio}`"
+            )
+
+        opcoes = ort.SessionOptions()
+        opcoes.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        threads = int(os.getenv("EMBEDDING_TORCH_THREADS", "0"))
+        if threads > 0:
+            opcoes.intra_op_num_threads = threads
+
+        self.tokenizer = AutoTokenizer.from_pretrained(str(diretorio))
+        self.sessao = ort.InferenceSession(str(arquivo), opcoes, providers=["CPUExecutionProvider"])
+        self.entradas = {entrada.name for entrada in self.sessao.get_inputs()}
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        import numpy as np
+
+        vetores = []
+        texts = list(texts)
+        for inicio in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+            tokens = self.tokenizer(
+                texts[inicio:inicio + EMBEDDING_BATCH_SIZE], padding=True, truncation=True,
+                max_length=EMBEDDING_MAX_TOKENS, return_tensors="np",
+            )
+            feed = {nome: valor.astype(np.int64) for nome, valor in tokens.items() if nome in self.entradas}
+            ultima_camada = self.sessao.run(None, feed)[0]
+            cls = ultima_camada[:, 0]
+            cls = cls / np.maximum(np.linalg.norm(cls, axis=1, keepdims=True), 1e-12)
+            vetores.extend(cls.astype(np.float32).tolist())
+        return vetores
+
+
+def exportar_onnx(origem: str, destino: str, quantizar: bool = True):
+    """Exporta o modelo HF para `destino/model.onnx` (e `model_int8.onnx`, quantizado)."""
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    destino = Path(destino)
+    destino.mkdir(parents=True, exist_ok=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(origem)
+    modelo = AutoModel.from_pretrained(origem).eval()
+    exemplo = tokenizer(["exemplo de texto"], return_tensors="pt")
+    nomes = list(exemplo.keys())
+
+    with torch.no_grad():
+        torch.onnx.export(
+            modelo,
+            tuple(exemplo[n] for n in nomes),
+            str(destino / "model.onnx"),
+            input_names=nomes,
+            output_names=["last_hidden_state"],
+            dynamic_axes={**{n: {0: "batch", 1: "seq"} for n in nomes}, "last_hidden_state": {0: "batch", 1: "seq"}},
+            opset_version=17,
+        )
+    tokenizer.save_pretrained(str(destino))
+
+    if quantizar:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+
+        quantize_dynamic(str(destino / "model.onnx"), str(destino / "model_int8.onnx"), weight_type=QuantType.QInt8)
+    print(f"[LOG] Modelo exportado para {destino}")
+
+
+BACKENDS = {
+    "sentence_transformers": BackendSentenceTransformers,
+    "onnx": BackendOnnx,
+    "onnx_int8": lambda diretorio=None: BackendOnnx(diretorio, quantizado=True),
+    "int8": BackendInt8,
+}
+
+
+def criar_backend(nome: str = None, diretorio: str = None) -> BackendEmbeddings:
+    nome = (nome or EMBEDDING_BACKEND).strip().lower()
+    if nome not in BACKENDS:
+        raise ValueError(f"Backend de embeddings desconhecido: {nome}. Opções: {', '.join(BACKENDS)}")
+    print(f"[LOG] Carregando backend de embeddings '{nome}' ({_origem_modelo(diretorio)})")
+    return BACKENDS[nome](diretorio)
+
+
+class BackendSobDemanda(BackendEmbeddings):
+    """
+    Adia o carregamento do modelo: importar o módulo não toca nos pesos.
+    O lifespan chama `carregar()` no aquecimento; fora dele, o primeiro uso carrega.
+    """
+
+    nome = "sob_demanda"
+
+    def __init__(self, backend: str = None, diretorio: str = None, fabrica=None):
+        self.backend = backend
+        self.diretorio = diretorio
+        self.fabrica = fabrica or criar_backend
+        self._modelo = None
+        self._lock = threading.Lock()
+
+    @property
+    def carregado(self) -> bool:
+        return self._modelo is not None
+
+    def carregar(self) -> BackendEmbeddings:
+        if self._modelo is None:
+            with self._lock:
+                if self._modelo is None:
+                    self._modelo = self.fabrica(self.backend, self.diretorio)
+        return self._modelo
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.carregar().embed_documents(texts)
@@ -0,0 +1,120 @@
+import os
+import asyncio
+from typing import List
+from langchain_core.embeddings import Embeddings
+from app.services.metricas import medir
+
+# 🔹 Janela de coleta das consultas concorrentes
+EMBEDDING_BATCH_MAX = int(os.getenv("EMBEDDING_BATCH_MAX", "32"))
+EMBEDDING_BATCH_ESPERA_MS = float(os.getenv("EMBEDDING_BATCH_ESPERA_MS", "5"))
+
+
+class MicroBatcherEmbeddings:
+    """
+    Junta as consultas de embedding que chegam de corrotinas concorrentes dentro de uma
+    janela curta (até `max_batch` textos ou `max_espera_ms`) e roda um único
+    `embed_documents` para o lote, devolvendo a cada chamador o seu vetor.
+    """
+
+    def __init__(self, executar_lote, max_batch: int = EMBEDDING_BATCH_MAX, max_espera_ms: float = EMBEDDING_BATCH_ESPERA_MS):
+        # `executar_lote`: corrotina que recebe list[str] e devolve list[list[float]]
+        self.executar_lote = executar_lote
+        self.max_batch = max(1, max_batch)
+        self.max_espera = max(0.0, max_espera_ms) / 1000
+        self._pendentes = []
+        self._timer = None
+        self._tarefas = set()
+        self.lotes = 0
+        self.textos = 0
+        self.maior_lote = 0
+
+    async def embed_query(self, texto: str) -> List[float]:
+        loop = asyncio.get_running_loop()
+        futuro = loop.create_future()
+        self._pendentes.append((texto, futuro))
+
+        if len(self._pendentes) >= self.max_batch:
+            self._disparar()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_espera, self._disparar)
+
+        return await futuro
+
+    def _disparar(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._pendentes:
+            lote = self._pendentes[:self.max_batch]
+            self._pendentes = self._pendentes[self.max_batch:]
+            tarefa = asyncio.ensure_future(self._executar(lote))
+            self._tarefas.add(tarefa)
+            tarefa.add_done_callback(self._tarefas.discard)
+
+    async def _executar(self, lote):
+        # Textos repetidos no mesmo lote são calculados uma vez só
+        textos = list(dict.fromkeys(texto for texto, _ in lote))
+        self.lotes += 1
+        self.textos += len(lote)
+        self.maior_lote = max(self.maior_lote, len(lote))
+
+        try:
+            vetores = dict(zip(textos, await self.executar_lote(textos)))
+        except Exception as e:
+            for _, futuro in lote:
+                if not futuro.done():
+                    futuro.set_exception(e)
+            return
+
+        for texto, futuro in lote:
+            if not futuro.done():
+                futuro.set_result(vetores[texto])
+
+    def estatisticas(self) -> dict:
+        return {
+            "lotes": self.lotes,
+            "textos": self.textos,
+            "media_por_lote": self.textos / self.lotes if self.lotes else 0.0,
+            "maior_lote": self.maior_lote,
+            "pendentes": len(self._pendentes),
+        }
+
+
+class EmbeddingsComMicroBatch(Embeddings):
+    """
+    Embeddings do LangChain cujo `aembed_query` passa pelo micro-batcher.
+    Com `pool`, toda inferência assíncrona roda no pool de workers de embeddings;
+    com `cache`, consultas já vistas nem chegam ao modelo.
+    """
+
+    def __init__(self, base: Embeddings, pool=None, batcher: MicroBatcherEmbeddings = None, cache=None):
+        self.base = base
+        self.pool = pool
+        self.batcher = batcher or MicroBatcherEmbeddings(self.aembed_documents)
+        self.cache = cache
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.base.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        vetor = self.cache.buscar(text) if self.cache is not None else None
+        if vetor is None:
+            vetor = self.base.embed_query(text)
+            if self.cache is not None:
+                self.cache.salvar(text, vetor)
+        return vetor
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.pool is not None:
+            return await self.pool.embed_documents(texts)
+        return await asyncio.to_thread(self.base.embed_documents, texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        with medir("embedding"):
+            vetor = self.cache.buscar(text) if self.cache is not None else None
+            if vetor is None:
+                vetor = await self.batcher.embed_query(text)
+                if self.cache is not None:
+                    self.cache.salvar(text, vetor)
+            return vetor
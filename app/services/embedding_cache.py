@@ -0,0 +1,103 @@
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+import numpy as np
+
+# 🔹 Cache texto normalizado → vetor, na frente do modelo de embeddings
+EMBEDDING_CACHE_ATIVO = os.getenv("EMBEDDING_CACHE_ATIVO", "1") == "1"
+EMBEDDING_CACHE_MAX_MB = float(os.getenv("EMBEDDING_CACHE_MAX_MB", "64"))
+
+_ESPACOS = re.compile(r"\s+")
+
+
+def normalizar_texto(texto: str) -> str:
+    """Mesma pergunta com caixa, acentuação composta ou espaços diferentes vira a mesma chave."""
+    return _ESPACOS.sub(" ", unicodedata.normalize("NFC", texto)).strip().casefold()
+
+
+class CacheVetores:
+    """
+    LRU de vetores de consulta guardados num único array float32 (slab).
+    Cada chave aponta para uma linha do slab; o slab cresce dobrando até o
+    orçamento de memória e, cheio, a linha da chave menos usada é reaproveitada.
+    """
+
+    def __init__(self, max_bytes: int = int(EMBEDDING_CACHE_MAX_MB * 1024 * 1024)):
+        self.max_bytes = max(0, int(max_bytes))
+        self.dimensao = None
+        self.capacidade = 0
+        self._slab = None
+        self._linhas = OrderedDict()
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        self.remocoes = 0
+
+    def buscar(self, texto: str):
+        chave = normalizar_texto(texto)
+        with self._lock:
+            linha = self._linhas.get(chave)
+            if linha is None:
+                self.falhas += 1
+                return None
+            self._linhas.move_to_end(chave)
+            self.acertos += 1
+            return self._slab[linha].tolist()
+
+    def salvar(self, texto: str, vetor):
+        vetor = np.asarray(vetor, dtype=np.float32)
+        chave = normalizar_texto(texto)
+
+        with self._lock:
+            if self.dimensao is None:
+                self.dimensao = vetor.shape[0]
+                self.capacidade = self.max_bytes // (self.dimensao * 4)
+            if vetor.shape != (self.dimensao,) or self.capacidade == 0:
+                return
+
+            linha = self._linhas.get(chave)
+            if linha is None:
+                linha = self._reservar_linha()
+                self._linhas[chave] = linha
+            self._linhas.move_to_end(chave)
+            self._slab[linha] = vetor
+
+    def _reservar_linha(self) -> int:
+        ocupadas = len(self._linhas)
+        alocadas = 0 if self._slab is None else self._slab.shape[0]
+        if ocupadas < alocadas:
+            return ocupadas
+
+        if alocadas < self.capacidade:
+            novo = np.empty((min(max(16, alocadas * 2), self.capacidade), self.dimensao), dtype=np.float32)
+            if self._slab is not None:
+                novo[:alocadas] = self._slab
+            self._slab = novo
+            return ocupadas
+
+        # Slab cheio: reaproveita a linha da chave menos usada
+        _, linha = self._linhas.popitem(last=False)
+        self.remocoes += 1
+        return linha
+
+    def limpar(self):
+        with self._lock:
+            self._linhas.clear()
+            self._slab = None
+
+    def estatisticas(self) -> dict:
+        total = self.acertos + self.falhas
+        dimensao = self.dimensao or 0
+        return {
+            "entradas": len(self._linhas),
+            "capacidade": self.capacidade,
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "remocoes": self.remocoes,
+            "taxa_acerto": self.acertos / total if total else 0.0,
+            "bytes_usados": len(self._linhas) * dimensao * 4,
+            "bytes_alocados": 0 if self._slab is None else self._slab.nbytes,
+            "bytes_max": self.max_bytes,
+        }
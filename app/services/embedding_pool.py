@@ -0,0 +1,87 @@
+import os
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# 🔹 Paralelismo da inferência de embeddings
+EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", "2"))
+# Threads intra-op do PyTorch por forward pass (0 = padrão do torch)
+EMBEDDING_TORCH_THREADS = int(os.getenv("EMBEDDING_TORCH_THREADS", "0"))
+
+
+def configurar_threads_torch(threads: int):
+    if threads <= 0:
+        return
+    try:
+        import torch
+        torch.set_num_threads(threads)
+        print(f"[LOG] PyTorch configurado com {threads} threads intra-op")
+    except ImportError:
+        pass
+
+
+class PoolEmbeddings:
+    """
+    Executa `embed_documents` do modelo num pool de threads limitado, fora do event loop.
+    O PyTorch libera o GIL durante o forward pass, então threads bastam para não
+    travar as outras requisições; o limite de workers evita disputa de CPU.
+    """
+
+    def __init__(self, modelo, workers: int = EMBEDDING_WORKERS, torch_threads: int = EMBEDDING_TORCH_THREADS):
+        self.modelo = modelo
+        self.workers = max(1, workers)
+        configurar_threads_torch(torch_threads)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="embeddings")
+        self._lock = threading.Lock()
+        self.em_fila = 0
+        self.em_execucao = 0
+        self.maior_fila = 0
+        self.concluidas = 0
+        self.textos = 0
+        self.tempo_total = 0.0
+
+    def _rodar(self, textos):
+        with self._lock:
+            self.em_fila -= 1
+            self.em_execucao += 1
+        inicio = time.perf_counter()
+        try:
+            return self.modelo.embed_documents(textos)
+        finally:
+            with self._lock:
+                self.em_execucao -= 1
+                self.concluidas += 1
+                self.textos += len(textos)
+                self.tempo_total += time.perf_counter() - inicio
+
+    async def embed_documents(self, textos):
+        with self._lock:
+            self.em_fila += 1
+            self.maior_fila = max(self.maior_fila, self.em_fila)
+        futuro = self._executor.submit(self._rodar, list(textos))
+        futuro.add_done_callback(self._descontar_cancelada)
+        return await asyncio.wrap_future(futuro)
+
+    def _descontar_cancelada(self, futuro):
+        # Cancelada antes de começar: `_rodar` nunca tirou o item da fila
+        if futuro.cancelled():
+            with self._lock:
+                self.em_fila -= 1
+
+    async def embed_query(self, texto):
+        return (await self.embed_documents([texto]))[0]
+
+    def estatisticas(self) -> dict:
+        return {
+            "workers": self.workers,
+            "em_fila": self.em_fila,
+            "em_execucao": self.em_execucao,
+            "maior_fila": self.maior_fila,
+            "concluidas": self.concluidas,
+            "textos": self.textos,
+            "tempo_medio_ms": self.tempo_total / self.concluidas * 1000 if self.concluidas else 0.0,
+        }
+
+    def encerrar(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
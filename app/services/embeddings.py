@@ -1,6 +1,17 @@
-from langchain.embeddings import HuggingFaceEmbeddings
+from app.services.embedding_backends import BackendSobDemanda
+from app.services.embedding_batcher import EmbeddingsComMicroBatch
+from app.services.embedding_cache import EMBEDDING_CACHE_ATIVO, CacheVetores
+from app.services.embedding_pool import PoolEmbeddings
 
-embedding_model = HuggingFaceEmbeddings(
-    model_name="BAAI/bge-large-en-v1.5",
-    encode_kwargs={"normalize_embeddings": True}
-)
+# 🔹 bge-large em fp32 (sentence-transformers), ONNX Runtime ou int8 — veja EMBEDDING_BACKEND.
+# Os pesos só são carregados no aquecimento do lifespan (ou no primeiro uso).
+embedding_model = BackendSobDemanda()
+
+# 🔹 Inferência fora do event loop, num pool limitado de workers
+embedding_pool = PoolEmbeddings(embedding_model)
+
+# 🔹 Perguntas repetidas (entre turnos e sessões) reaproveitam o vetor já calculado
+cache_vetores = CacheVetores() if EMBEDDING_CACHE_ATIVO else None
+
+# 🔹 Consultas concorrentes (retriever, caches, classificador) viram um único forward pass
+embeddings_consulta = EmbeddingsComMicroBatch(embedding_model, pool=embedding_pool, cache=cache_vetores)
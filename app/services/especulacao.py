@@ -0,0 +1,274 @@
+import os
+import asyncio
+from app.services.rag_chain import (
+    CATEGORIAS_RAG, QDRANT_COLLECTION, RAG_CONDENSACAO, RAG_K,
+    filtro_categoria_qdrant, formatar_contexto, formatar_historico, preparar_consulta,
+)
+from app.services.metricas import medir
+
+# 🔹 Busca vetorial especulativa (opt-in): roda junto com a classificação, para todas as categorias.
+# Custa um embedding e uma busca por turno, inclusive nos de resposta fixa (saudação, despedida...)
+RAG_ESPECULATIVO = os.getenv("RAG_ESPECULATIVO", "0") == "1"
+
+# 🔹 Geração especulativa (opt-in): responde já com o contexto da categoria mais comum
+GERACAO_ESPECULATIVA = os.getenv("GERACAO_ESPECULATIVA", "0") == "1"
+GERACAO_ESPECULATIVA_CATEGORIA = os.getenv("GERACAO_ESPECULATIVA_CATEGORIA", "produtos_servicos")
+
+
+class EstatisticasEspeculacao:
+    def __init__(self):
+        self.iniciadas = 0
+        self.usadas = 0
+        self.canceladas = 0
+        self.falhas = 0
+
+    def estatisticas(self) -> dict:
+        return {
+            "iniciadas": self.iniciadas,
+            "usadas": self.usadas,
+            "canceladas": self.canceladas,
+            "falhas": self.falhas,
+            "taxa_uso": self.usadas / self.iniciadas if self.iniciadas else 0.0,
+        }
+
+
+class EstatisticasGeracao(EstatisticasEspeculacao):
+    """Contadores da geração especulativa; tokens contados como trechos do stream do LLM."""
+
+    def __init__(self):
+        super().__init__()
+        self.tokens_usados = 0
+        self.tokens_desperdicados = 0
+
+    def estatisticas(self) -> dict:
+        return {
+            **super().estatisticas(),
+            "tokens_usados": self.tokens_usados,
+            "tokens_desperdicados": self.tokens_desperdicados,
+        }
+
+
+estatisticas_busca = EstatisticasEspeculacao()
+estatisticas_geracao = EstatisticasGeracao()
+
+
+def especulacao_ativa() -> bool:
+    # Com condensação por LLM a consulta só existe depois de outra chamada ao modelo
+    return RAG_ESPECULATIVO and RAG_CONDENSACAO != "llm"
+
+
+def geracao_especulativa_ativa() -> bool:
+    return GERACAO_ESPECULATIVA
+
+
+async def buscar_todas_categorias(pipeline, consulta: str, categorias=CATEGORIAS_RAG, k: int = RAG_K) -> dict:
+    """Um embedding e um único `search_batch` no Qdrant: {categoria: [Document]}."""
+    from langchain_core.documents import Document
+    from qdrant_client import models
+    from app.services.embeddings import embeddings_consulta
+
+    vetor = await embeddings_consulta.aembed_query(consulta)
+    with medir("busca_vetorial"):
+        resultados = await pipeline["qdrant_async_client"].search_batch(
+            collection_name=QDRANT_COLLECTION,
+            requests=[
+                models.SearchRequest(
+                    vector=vetor,
+                    filter=filtro_categoria_qdrant(categoria) if categoria else None,
+                    limit=k,
+                    with_payload=True,
+                )
+                for categoria in categorias
+            ],
+        )
+
+    return {
+        categoria: [
+            Document(page_content=ponto.payload.get("page_content", ""), metadata=ponto.payload.get("metadata") or {})
+            for ponto in pontos
+        ]
+        for categoria, pontos in zip(categorias, resultados)
+    }
+
+
+class BuscaEspeculativa:
+    """
+    Dispara a busca assim que o histórico da sessão chega, sem esperar a intenção.
+    `documentos(categoria)` devolve o resultado da categoria escolhida pelo plano
+    (ou None, se a busca falhou e o caminho normal deve ser usado); `cancelar` descarta tudo.
+    """
+
+    def __init__(self, pipeline, pergunta: str, tarefa_sessao, estatisticas: EstatisticasEspeculacao = estatisticas_busca):
+        self.estatisticas = estatisticas
+        self.estatisticas.iniciadas += 1
+        self.usada = False
+        self.tarefa = asyncio.create_task(self._buscar(pipeline, pergunta, tarefa_sessao))
+
+    async def _buscar(self, pipeline, pergunta, tarefa_sessao):
+        contexto = await asyncio.shield(tarefa_sessao)
+        consulta = await preparar_consulta(pergunta, contexto["chat_history"])
+        return await buscar_todas_categorias(pipeline, consulta)
+
+    async def documentos(self, categoria):
+        # shield: quem espera (ex.: a geração especulativa) pode ser cancelado sem levar a busca junto
+        try:
+            resultado = await asyncio.shield(self.tarefa)
+        except Exception as e:
+            if not self.usada:
+                self.estatisticas.falhas += 1
+            self.usada = True
+            print(f"[WARN] Busca especulativa falhou, usando o retriever: {e}")
+            return None
+        if not self.usada:
+            self.estatisticas.usadas += 1
+        self.usada = True
+        return resultado.get(categoria)
+
+    def cancelar(self):
+        """Descarta a busca se ninguém a usou (resposta fixa, cache semântico ou erro)."""
+        if not self.tarefa.done():
+            self.tarefa.cancel()
+            self.estatisticas.canceladas += 1
+        elif not self.tarefa.cancelled():
+            self.tarefa.exception()  # evita "Task exception was never retrieved"
+
+
+async def recuperar_documentos(pipeline, pergunta: str, chat_history, categoria, busca: BuscaEspeculativa = None):
+    """Documentos da categoria: da busca especulativa, se houver, senão pelo retriever."""
+    documentos = await busca.documentos(categoria) if busca is not None else None
+    if documentos is None:
+        consulta = await preparar_consulta(pergunta, chat_history, pipeline["condense_chain"])
+        with medir("busca_vetorial"):
+            documentos = await pipeline["retrievers"][categoria].ainvoke(consulta)
+    return documentos
+
+
+class GeracaoEspeculativa:
+    """
+    Gera a resposta com o contexto de `categoria` enquanto a intenção ainda é classificada.
+    Se o plano cair na mesma categoria, `resultado`/`trechos` entregam o que já foi gerado;
+    senão `cancelar` interrompe o stream do LLM (fechando a conexão, o provedor para de gerar).
+    """
+
+    def __init__(
+        self, pipeline, pergunta: str, tarefa_sessao, busca: BuscaEspeculativa = None,
+        categoria: str = GERACAO_ESPECULATIVA_CATEGORIA, estatisticas: EstatisticasGeracao = estatisticas_geracao,
+    ):
+        self.categoria = categoria
+        self.estatisticas = estatisticas
+        self.estatisticas.iniciadas += 1
+        self.documentos = []
+        self.trechos_gerados = []
+        self.usada = False
+        self.encerrada = False
+        self._novo_trecho = asyncio.Event()
+        self._documentos_prontos = asyncio.Event()
+        self.tarefa = asyncio.create_task(self._gerar(pipeline, pergunta, tarefa_sessao, busca))
+
+    @property
+    def tokens(self) -> int:
+        return len(self.trechos_gerados)
+
+    async def _gerar(self, pipeline, pergunta, tarefa_sessao, busca):
+        try:
+            contexto = await asyncio.shield(tarefa_sessao)
+            chat_history = contexto["chat_history"]
+            self.documentos = await recuperar_documentos(pipeline, pergunta, chat_history, self.categoria, busca)
+            self._documentos_prontos.set()
+
+            answer_chain = pipeline["resposta_prompt"] | pipeline["llm"]
+            async for trecho in answer_chain.astream({
+                "question": pergunta,
+                "chat_history": formatar_historico(chat_history),
+                "context": formatar_contexto(self.documentos),
+            }):
+                if trecho.content:
+                    self.trechos_gerados.append(trecho.content)
+                    self._novo_trecho.set()
+        finally:
+            self._documentos_prontos.set()
+            self._novo_trecho.set()
+
+    def atende(self, categoria) -> bool:
+        return not self.encerrada and categoria == self.categoria
+
+    def _usar(self):
+        if not self.usada:
+            self.usada = True
+            self.encerrada = True
+            self.estatisticas.usadas += 1
+
+    def _falhou(self, e):
+        self.encerrada = True
+        self.estatisticas.falhas += 1
+        self.estatisticas.tokens_desperdicados += self.tokens
+        print(f"[WARN] Geração especulativa falhou, gerando de novo: {e}")
+
+    async def resultado(self, categoria):
+        """(documentos, resposta) se a geração serve para `categoria`; None para seguir o caminho normal."""
+        if not self.atende(categoria):
+            return None
+        try:
+            await asyncio.shield(self.tarefa)
+        except Exception as e:
+            self._falhou(e)
+            return None
+        self._usar()
+        self.estatisticas.tokens_usados += self.tokens
+        return self.documentos, "".join(self.trechos_gerados).strip()
+
+    async def trechos(self, alternativa=None):
+        """
+        Repassa os trechos já gerados e os próximos, conforme chegam (para o /chat/stream).
+        Só chamar depois de `atende(categoria)`. Se a geração falhar antes do primeiro trecho,
+        segue com `alternativa()` (a geração normal), como o /chat; sem ela, sobe a exceção.
+        Se o consumidor sair antes do fim (cliente desconectou), o stream do LLM é interrompido.
+        """
+        self._usar()
+        enviados = 0
+        try:
+            while True:
+                while enviados < len(self.trechos_gerados):
+                    yield self.trechos_gerados[enviados]
+                    enviados += 1
+                if self.tarefa.done():
+                    break
+                self._novo_trecho.clear()
+                await asyncio.shield(self._novo_trecho.wait())
+        finally:
+            if not self.tarefa.done():
+                self.tarefa.cancel()
+                self.estatisticas.tokens_desperdicados += self.tokens - enviados
+
+        erro = None if self.tarefa.cancelled() else self.tarefa.exception()
+        if erro is not None:
+            if enviados or alternativa is None:
+                self.estatisticas.falhas += 1
+                raise erro
+            self._falhou(erro)
+            async for texto in alternativa():
+                yield texto
+            return
+        self.estatisticas.tokens_usados += self.tokens
+
+    async def documentos_prontos(self, categoria):
+        """Documentos da geração assim que recuperados (sem esperar o LLM); None se não serve ou falhou."""
+        if not self.atende(categoria):
+            return None
+        await asyncio.shield(self._documentos_prontos.wait())
+        if self.tarefa.done() and self.tarefa.exception() is not None:
+            self._falhou(self.tarefa.exception())
+            return None
+        return self.documentos
+
+    def cancelar(self):
+        """Descarta a geração se o plano não a usou; contabiliza os tokens já gerados como desperdício."""
+        if self.encerrada:
+            return
+        self.encerrada = True
+        self.estatisticas.canceladas += 1
+        self.estatisticas.tokens_desperdicados += self.tokens
+        if not self.tarefa.done():
+            self.tarefa.cancel()
+        elif not self.tarefa.cancelled():
+            self.tarefa.exception()
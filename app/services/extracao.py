@@ -0,0 +1,90 @@
+import os
+import asyncio
+from typing import Literal, Optional
+from pydantic import BaseModel, ConfigDict, ValidationError
+from app.services.intent_classifier import classificar_local
+from app.services.metricas import medir
+from app.services.planner import INTENCOES
+
+# 🔹 "combinada": intenção + slots numa chamada só; "separada": classificador e slot filling
+EXTRACAO_MODO = os.getenv("EXTRACAO_MODO", "combinada").strip().lower()
+
+SLOTS = ("produto", "volume_aproximado", "localidade", "prazo")
+
+
+class ExtracaoTurno(BaseModel):
+    model_config = ConfigDict(extra="forbid", str_strip_whitespace=True)
+
+    intencao: Literal[INTENCOES]
+    produto: Optional[str]
+    volume_aproximado: Optional[str]
+    localidade: Optional[str]
+    prazo: Optional[str]
+
+
+async def _classificar(classificacao_chain, pergunta: str) -> str:
+    with medir("classificacao"):
+        return await classificacao_chain.ainvoke({"texto": pergunta})
+
+
+async def _extrair_slots(slot_filling_chain, pergunta: str) -> dict:
+    try:
+        with medir("slot_filling"):
+            return await slot_filling_chain.ainvoke({"texto": pergunta})
+    except Exception as e:
+        print(f"[ERRO] Falha ao fazer parse do JSON de slots: {e}")
+        return {}
+
+
+async def extrair_separado(pipeline, pergunta: str):
+    """Caminho de duas chamadas: classificador e slot filling em paralelo."""
+    intencao, slots_dict = await asyncio.gather(
+        _classificar(pipeline["classificacao_chain"], pergunta),
+        _extrair_slots(pipeline["slot_filling_chain"], pergunta),
+    )
+    intencao = intencao.strip()
+    if intencao not in INTENCOES:
+        print(f"[WARN] Intenção desconhecida do classificador, usando OUTRO: {intencao[:50]!r}")
+        intencao = "OUTRO"
+    return intencao, slots_dict
+
+
+async def extrair_combinado(pipeline, pergunta: str):
+    """Uma única chamada em JSON mode, validada contra o schema estrito."""
+    with medir("classificacao"):
+        bruto = await pipeline["extracao_chain"].ainvoke({"texto": pergunta})
+    extracao = ExtracaoTurno.model_validate_json(bruto)
+    slots_dict = extracao.model_dump(include=set(SLOTS))
+    return extracao.intencao, slots_dict
+
+
+async def _classificar_local(pergunta: str):
+    try:
+        with medir("classificacao_local"):
+            return await classificar_local(pergunta)
+    except Exception as e:
+        print(f"[WARN] Classificador local falhou, seguindo com o LLM: {e}")
+        return None
+
+
+async def _extrair_llm(pipeline, pergunta: str, modo: str):
+    if modo == "combinada":
+        try:
+            return await extrair_combinado(pipeline, pergunta)
+        except (ValidationError, ValueError) as e:
+            print(f"[WARN] Extração combinada inválida, usando classificador + slots: {e}")
+    return await extrair_separado(pipeline, pergunta)
+
+
+async def extrair_intencao_e_slots(pipeline, pergunta: str, modo: str = None):
+    """
+    Retorna (intencao, slots_dict) para a frase do cliente.
+    No modo combinado, só volta ao caminho de duas chamadas se a validação falhar.
+    """
+    # 🔹 Fast path: intenções em que o classificador local é confiável dispensam o LLM.
+    # Sem classificador treinado ele devolve None na hora; o vetor da pergunta fica no cache
+    # de embeddings e é reaproveitado pelo cache semântico e pela busca.
+    intencao = await _classificar_local(pergunta)
+    if intencao:
+        return intencao, {slot: None for slot in SLOTS}
+    return await _extrair_llm(pipeline, pergunta, modo or EXTRACAO_MODO)
@@ -0,0 +1,187 @@
+import os
+import json
+import asyncio
+from pathlib import Path
+import numpy as np
+from app.services.planner import INTENCOES
+
+# 🔹 Configuração do classificador local (fast path antes do LLM)
+INTENT_LOCAL_ATIVO = os.getenv("INTENT_LOCAL_ATIVO", "1") == "1"
+INTENT_LOCAL_LIMIAR = float(os.getenv("INTENT_LOCAL_LIMIAR", "0.88"))
+INTENT_LOCAL_MARGEM = float(os.getenv("INTENT_LOCAL_MARGEM", "0.05"))
+INTENT_LOCAL_MAX_EXEMPLOS = int(os.getenv("INTENT_LOCAL_MAX_EXEMPLOS", "2000"))
+MLRUNS_DIR = os.getenv("MLRUNS_DIR", "mlruns")
+
+# Só estas intenções dispensam o LLM: nelas os slots não mudam a resposta
+INTENCOES_FAST_PATH = tuple(
+    i.strip() for i in os.getenv("INTENT_LOCAL_INTENCOES", "SAUDACAO,DESPEDIDA").split(",") if i.strip()
+)
+
+EXEMPLOS_SEMENTE = {
+    "SAUDACAO": [
+        "oi", "olá", "bom dia", "boa tarde", "boa noite", "oi, tudo bem?",
+        "olá, bom dia", "e aí", "opa, boa tarde", "oi, tudo bom?",
+    ],
+    "DESPEDIDA": [
+        "tchau", "obrigado, tchau", "até mais", "valeu, até logo", "obrigada, era só isso",
+        "muito obrigado", "até a próxima", "falou, obrigado", "boa noite, obrigado", "só isso, valeu",
+    ],
+    "CONFIRMACAO": [
+        "sim", "isso mesmo", "pode seguir", "confirmo", "está certo", "exato", "pode encaminhar",
+    ],
+    "VAGA_EMPREGO": [
+        "tem vaga de emprego?", "vocês estão contratando?", "quero trabalhar na Cemear",
+        "como envio meu currículo?",
+    ],
+    "PEDIDO_ORCAMENTO": [
+        "quero um orçamento", "quanto custa o piso vinílico?", "preciso de orçamento de divisória",
+        "gostaria de uma cotação de forro",
+    ],
+    "PERGUNTA_PRODUTO": [
+        "vocês trabalham com piso laminado?", "quais tipos de divisória vocês têm?",
+        "o forro de gesso é acústico?", "vocês vendem brise?",
+    ],
+}
+
+
+def _normalizar(matriz: np.ndarray) -> np.ndarray:
+    normas = np.linalg.norm(matriz, axis=-1, keepdims=True)
+    return matriz / np.maximum(normas, 1e-12)
+
+
+class ClassificadorIntencaoLocal:
+    """
+    Classificador por centróide mais próximo sobre os vetores do embedding_model.
+    Só devolve uma intenção quando a similaridade passa do limiar e há margem
+    suficiente para a segunda colocada; caso contrário o LLM decide.
+    """
+
+    def __init__(self, embeddings, limiar: float = INTENT_LOCAL_LIMIAR, margem: float = INTENT_LOCAL_MARGEM):
+        self.embeddings = embeddings
+        self.limiar = limiar
+        self.margem = margem
+        self.intencoes = []
+        self.centroides = None
+        self.total_exemplos = 0
+
+    def treinar(self, exemplos):
+        """`exemplos`: lista de (texto, intencao)."""
+        exemplos = [(t.strip(), i) for t, i in exemplos if t and t.strip() and i in INTENCOES]
+        if not exemplos:
+            raise ValueError("Nenhum exemplo rotulado para treinar o classificador.")
+
+        textos = [t for t, _ in exemplos]
+        rotulos = np.array([i for _, i in exemplos])
+        vetores = _normalizar(np.asarray(self.embeddings.embed_documents(textos), dtype=np.float32))
+
+        self.intencoes = sorted(set(rotulos))
+        self.centroides = _normalizar(np.stack([
+            vetores[rotulos == intencao].mean(axis=0) for intencao in self.intencoes
+        ]))
+        self.total_exemplos = len(exemplos)
+        return self
+
+    def pontuar(self, vetor):
+        """Retorna [(intencao, similaridade)] em ordem decrescente para o vetor da frase."""
+        vetor = _normalizar(np.asarray(vetor, dtype=np.float32))
+        similaridades = self.centroides @ vetor
+        ordem = np.argsort(similaridades)[::-1]
+        return [(self.intencoes[i], float(similaridades[i])) for i in ordem]
+
+    def prever(self, texto: str):
+        """Retorna (intencao, confianca) se a predição for confiável, senão (None, confianca)."""
+        return self.prever_vetor(self.embeddings.embed_query(texto))
+
+    def prever_vetor(self, vetor):
+        if self.centroides is None:
+            return None, 0.0
+
+        ranking = self.pontuar(vetor)
+        intencao, melhor = ranking[0]
+        segunda = ranking[1][1] if len(ranking) > 1 else -1.0
+
+        if melhor >= self.limiar and melhor - segunda >= self.margem:
+            return intencao, melhor
+        return None, melhor
+
+
+def carregar_exemplos_mlruns(diretorio: str = MLRUNS_DIR):
+    exemplos = []
+    for arquivo in Path(diretorio).glob("*/*/artifacts/interacao.json"):
+        try:
+            dados = json.loads(arquivo.read_text(encoding="utf-8"))
+            exemplos.append((dados.get("pergunta"), dados.get("intencao")))
+        except Exception as e:
+            print(f"[WARN] Ignorando artefato inválido {arquivo}: {e}")
+    return exemplos
+
+
+def carregar_exemplos_log(limite: int = INTENT_LOCAL_MAX_EXEMPLOS, log=None):
+    """Últimos `limite` exemplos do log; só descomprime os segmentos mais novos necessários."""
+    if log is None:
+        from app.services.registro_interacoes import log_interacoes as log
+
+    exemplos = []
+    for caminho in log.segmentos_recentes():
+        exemplos = [
+            (evento.get("pergunta"), evento.get("intencao"))
+            for evento in log.ler_segmento(caminho) if evento.get("tipo") == "interacao"
+        ] + exemplos
+        if len(exemplos) >= limite:
+            break
+    return exemplos[-limite:]
+
+
+async def carregar_exemplos_banco(prisma, limite: int = INTENT_LOCAL_MAX_EXEMPLOS):
+    fluxos = await prisma.fluxoconversa.find_many(
+        where={"pedido": {"not": None}}, order={"id": "desc"}, take=limite
+    )
+    return [(f.pedido, f.intencao) for f in fluxos]
+
+
+_classificador = None
+
+
+async def treinar_classificador_local(prisma, embeddings=None):
+    """Treina o classificador com exemplos semente, FluxoConversa, log de interações e artefatos do mlruns."""
+    global _classificador
+
+    if not INTENT_LOCAL_ATIVO:
+        return None
+
+    if embeddings is None:
+        from app.services.embeddings import embedding_model as embeddings
+
+    exemplos = [(texto, intencao) for intencao, textos in EXEMPLOS_SEMENTE.items() for texto in textos]
+    exemplos += carregar_exemplos_mlruns()
+    exemplos += await asyncio.to_thread(carregar_exemplos_log)
+    try:
+        exemplos += await carregar_exemplos_banco(prisma)
+    except Exception as e:
+        print(f"[WARN] Falha ao carregar exemplos do banco: {e}")
+
+    classificador = ClassificadorIntencaoLocal(embeddings)
+    await asyncio.to_thread(classificador.treinar, exemplos)
+    _classificador = classificador
+    print(f"[LOG] Classificador local treinado com {classificador.total_exemplos} exemplos")
+    return classificador
+
+
+def get_classificador_local():
+    return _classificador
+
+
+async def classificar_local(pergunta: str):
+    """Fast path: retorna a intenção se o classificador local for confiável para ela, senão None."""
+    classificador = get_classificador_local()
+    if classificador is None:
+        return None
+
+    from app.services.embeddings import embeddings_consulta
+
+    vetor = await embeddings_consulta.aembed_query(pergunta)
+    intencao, confianca = classificador.prever_vetor(vetor)
+    if intencao in INTENCOES_FAST_PATH:
+        print(f"[LOG] Intenção {intencao} pelo classificador local (confiança {confianca:.2f})")
+        return intencao
+    return None
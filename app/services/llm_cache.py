@@ -0,0 +1,145 @@
+import os
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+
+# 🔹 Configuração do cache exato de respostas do LLM
+LLM_CACHE_CHAINS = tuple(
+    c.strip() for c in os.getenv("LLM_CACHE_CHAINS", "classificacao,slots,extracao").split(",") if c.strip()
+)
+LLM_CACHE_MEMORIA_MAX = int(os.getenv("LLM_CACHE_MEMORIA_MAX", "5000"))
+LLM_CACHE_SQLITE = os.getenv("LLM_CACHE_SQLITE", ".cache/llm_cache.sqlite")
+
+
+def chave_cache(prompt: str, llm_string: str) -> str:
+    """Hash do prompt + llm_string (modelo, temperatura e demais parâmetros do LLM)."""
+    return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+
+class ArmazemSQLite:
+    """Camada em disco compartilhada pelos caches de todas as chains; sobrevive a reinícios."""
+
+    def __init__(self, caminho: str = LLM_CACHE_SQLITE):
+        if caminho != ":memory:":
+            os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache (chave TEXT PRIMARY KEY, valor TEXT NOT NULL)"
+        )
+        self._conexao.commit()
+        self._lock = threading.Lock()
+
+    def ler(self, chave: str) -> Optional[str]:
+        with self._lock:
+            linha = self._conexao.execute(
+                "SELECT valor FROM llm_cache WHERE chave = ?", (chave,)
+            ).fetchone()
+        return linha[0] if linha else None
+
+    def gravar(self, chave: str, valor: str):
+        with self._lock:
+            self._conexao.execute(
+                "INSERT OR REPLACE INTO llm_cache (chave, valor) VALUES (?, ?)", (chave, valor)
+            )
+            self._conexao.commit()
+
+    def limpar(self):
+        with self._lock:
+            self._conexao.execute("DELETE FROM llm_cache")
+            self._conexao.commit()
+
+
+class CacheLLMEmCamadas(BaseCache):
+    """
+    Cache exato para o LLM de uma chain: LRU em memória na frente do SQLite.
+    Só acerta quando prompt, modelo e temperatura são idênticos, então a
+    resposta devolvida é a mesma que já foi dada para aquela entrada.
+    """
+
+    def __init__(self, nome: str, armazem: Optional[ArmazemSQLite] = None, memoria_max: int = LLM_CACHE_MEMORIA_MAX):
+        self.nome = nome
+        self.armazem = armazem
+        self.memoria_max = memoria_max
+        self._memoria = OrderedDict()
+        self._lock = threading.Lock()
+        self.acertos_memoria = 0
+        self.acertos_disco = 0
+        self.falhas = 0
+
+    def _guardar_memoria(self, chave, valor):
+        with self._lock:
+            self._memoria[chave] = valor
+            self._memoria.move_to_end(chave)
+            while len(self._memoria) > self.memoria_max:
+                self._memoria.popitem(last=False)
+
+    def lookup(self, prompt: str, llm_string: str):
+        chave = chave_cache(prompt, llm_string)
+
+        with self._lock:
+            valor = self._memoria.get(chave)
+            if valor is not None:
+                self._memoria.move_to_end(chave)
+                self.acertos_memoria += 1
+                return valor
+
+        if self.armazem is not None:
+            serializado = self.armazem.ler(chave)
+            if serializado is not None:
+                valor = loads(serializado)
+                self._guardar_memoria(chave, valor)
+                self.acertos_disco += 1
+                return valor
+
+        self.falhas += 1
+        return None
+
+    def update(self, prompt: str, llm_string: str, return_val):
+        chave = chave_cache(prompt, llm_string)
+        self._guardar_memoria(chave, return_val)
+        if self.armazem is not None:
+            self.armazem.gravar(chave, dumps(return_val))
+
+    def clear(self, **kwargs):
+        with self._lock:
+            self._memoria.clear()
+        if self.armazem is not None:
+            self.armazem.limpar()
+
+    def estatisticas(self) -> dict:
+        acertos = self.acertos_memoria + self.acertos_disco
+        total = acertos + self.falhas
+        return {
+            "chain": self.nome,
+            "entradas_memoria": len(self._memoria),
+            "acertos_memoria": self.acertos_memoria,
+            "acertos_disco": self.acertos_disco,
+            "falhas": self.falhas,
+            "taxa_acerto": acertos / total if total else 0.0,
+        }
+
+
+_armazem = None
+caches_llm = {}
+
+
+def cache_para_chain(nome: str):
+    """Cache da chain `nome`, ou None se o cache estiver desligado para ela."""
+    global _armazem
+
+    if nome not in LLM_CACHE_CHAINS:
+        return None
+    if nome not in caches_llm:
+        if _armazem is None and LLM_CACHE_SQLITE:
+            _armazem = ArmazemSQLite(LLM_CACHE_SQLITE)
+        caches_llm[nome] = CacheLLMEmCamadas(nome, armazem=_armazem)
+    return caches_llm[nome]
+
+
+def estatisticas_cache_llm() -> list:
+    return [cache.estatisticas() for cache in caches_llm.values()]
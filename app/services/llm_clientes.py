@@ -0,0 +1,88 @@
+import os
+import threading
+
+# 🔹 Provedor do LLM (qualquer API compatível com a da OpenAI)
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://api.mistral.ai/v1")
+LLM_MODELO = os.getenv("LLM_MODELO", "mistral-large-latest")
+LLM_TEMPERATURA = float(os.getenv("LLM_TEMPERATURA", "0.3"))
+LLM_TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", "60"))
+
+# 🔹 Pool HTTP compartilhado por todas as chains do processo
+LLM_POOL_MAX_CONEXOES = int(os.getenv("LLM_POOL_MAX_CONEXOES", "20"))
+LLM_POOL_MAX_KEEPALIVE = int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "10"))
+LLM_KEEPALIVE_S = float(os.getenv("LLM_KEEPALIVE_S", "60"))
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "1") == "1"
+
+_lock = threading.Lock()
+_clientes = {}
+
+
+def _http2_disponivel() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        print("[WARN] Pacote h2 ausente (pip install 'httpx[http2]'); usando HTTP/1.1")
+        return False
+
+
+def _opcoes_http() -> dict:
+    import httpx
+
+    return {
+        "http2": LLM_HTTP2 and _http2_disponivel(),
+        "limits": httpx.Limits(
+            max_connections=LLM_POOL_MAX_CONEXOES,
+            max_keepalive_connections=LLM_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=LLM_KEEPALIVE_S,
+        ),
+        "timeout": httpx.Timeout(LLM_TIMEOUT_S, connect=10.0),
+    }
+
+
+def http_async_client():
+    """Cliente httpx assíncrono único do processo: conexões TLS reaproveitadas entre chamadas."""
+    with _lock:
+        cliente = _clientes.get("async")
+        if cliente is None or cliente.is_closed:
+            import httpx
+
+            cliente = _clientes["async"] = httpx.AsyncClient(**_opcoes_http())
+        return cliente
+
+
+def http_client():
+    """Equivalente síncrono, para `invoke`/`stream` fora do event loop."""
+    with _lock:
+        cliente = _clientes.get("sync")
+        if cliente is None or cliente.is_closed:
+            import httpx
+
+            cliente = _clientes["sync"] = httpx.Client(**_opcoes_http())
+        return cliente
+
+
+def criar_llm(cache=None, temperatura: float = LLM_TEMPERATURA, modelo: str = LLM_MODELO, base_url: str = LLM_BASE_URL, api_key: str = None):
+    """ChatOpenAI apontando para o provedor configurado, sobre o pool HTTP compartilhado."""
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(
+        model=modelo,
+        api_key=api_key or os.getenv("MISTRAL_API_KEY"),
+        base_url=base_url,
+        temperature=temperatura,
+        cache=cache,
+        http_client=http_client(),
+        http_async_client=http_async_client(),
+    )
+
+
+async def fechar_clientes():
+    with _lock:
+        clientes = list(_clientes.values())
+        _clientes.clear()
+    for cliente in clientes:
+        if hasattr(cliente, "aclose"):
+            await cliente.aclose()
+        else:
+            cliente.close()
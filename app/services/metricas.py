@@ -0,0 +1,131 @@
+import os
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from app.services.planner import INTENCOES
+
+# 🔹 Buckets (segundos) dos histogramas de latência por etapa
+METRICAS_BUCKETS = tuple(
+    float(b) for b in os.getenv(
+        "METRICAS_BUCKETS", "0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10,30"
+    ).split(",")
+)
+
+ETAPAS = (
+    "setup",
+    "sessao",
+    "classificacao_local",
+    "classificacao",
+    "slot_filling",
+    "cache_semantico",
+    "embedding",
+    "busca_vetorial",
+    "geracao_resposta",
+    "persistencia",
+    "telemetria",
+    "total",
+)
+
+
+class HistogramaLatencia:
+    """Histograma cumulativo no formato do Prometheus, com rótulos etapa/intencao/categoria."""
+
+    def __init__(self, nome: str, descricao: str, buckets=METRICAS_BUCKETS):
+        self.nome = nome
+        self.descricao = descricao
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observar(self, segundos: float, etapa: str, intencao: str = "", categoria: str = ""):
+        # Rótulo fora das intenções conhecidas vira "OUTRO": texto livre do LLM não cria séries novas
+        if intencao and intencao not in INTENCOES:
+            intencao = "OUTRO"
+        chave = (etapa, intencao or "", categoria or "")
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None:
+                serie = self._series[chave] = {"contagens": [0] * len(self.buckets), "soma": 0.0, "total": 0}
+            for i, limite in enumerate(self.buckets):
+                if segundos <= limite:
+                    serie["contagens"][i] += 1
+            serie["soma"] += segundos
+            serie["total"] += 1
+
+    def series(self) -> dict:
+        with self._lock:
+            return {chave: {**s, "contagens": list(s["contagens"])} for chave, s in self._series.items()}
+
+    def prometheus(self) -> str:
+        linhas = [f"# HELP {self.nome} {self.descricao}", f"# TYPE {self.nome} histogram"]
+        for (etapa, intencao, categoria), serie in sorted(self.series().items()):
+            rotulos = f'etapa="{etapa}",intencao="{_escapar(intencao)}",categoria="{_escapar(categoria)}"'
+            for limite, contagem in zip(self.buckets, serie["contagens"]):
+                linhas.append(f'{self.nome}_bucket{{{rotulos},le="{limite:g}"}} {contagem}')
+            linhas.append(f'{self.nome}_bucket{{{rotulos},le="+Inf"}} {serie["total"]}')
+            linhas.append(f"{self.nome}_sum{{{rotulos}}} {serie['soma']:.6f}")
+            linhas.append(f"{self.nome}_count{{{rotulos}}} {serie['total']}")
+        return "\n".join(linhas) + "\n"
+
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+latencia_etapas = HistogramaLatencia(
+    "chat_etapa_duracao_segundos", "Duração de cada etapa do pipeline de chat."
+)
+
+
+class MedicaoTurno:
+    """
+    Durações das etapas de um turno. Intenção e categoria só são conhecidas no meio
+    do turno, então as durações ficam aqui e vão para o histograma em `finalizar`.
+    """
+
+    def __init__(self, histograma: HistogramaLatencia = latencia_etapas):
+        self.histograma = histograma
+        self.inicio = time.perf_counter()
+        self.duracoes = []
+        self.finalizada = False
+
+    def adicionar(self, etapa: str, segundos: float):
+        self.duracoes.append((etapa, segundos))
+
+    def finalizar(self, intencao: str = "", categoria: str = ""):
+        if self.finalizada:
+            return
+        self.finalizada = True
+        for etapa, segundos in self.duracoes:
+            self.histograma.observar(segundos, etapa, intencao, categoria)
+        self.histograma.observar(time.perf_counter() - self.inicio, "total", intencao, categoria)
+
+
+# Turno da requisição atual; herdado pelas tarefas criadas dentro dela (asyncio.gather)
+turno_atual = contextvars.ContextVar("turno_atual", default=None)
+
+
+@contextmanager
+def medir(etapa: str, medicao: MedicaoTurno = None):
+    """Mede o bloco e registra no turno atual (ou direto no histograma, sem rótulos, fora de um turno)."""
+    medicao = medicao or turno_atual.get()
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracao = time.perf_counter() - inicio
+        if medicao is not None:
+            medicao.adicionar(etapa, duracao)
+        else:
+            latencia_etapas.observar(duracao, etapa)
+
+
+def estatisticas_prometheus(nome: str, componentes: dict) -> str:
+    """`{componente: estatisticas()}` como gauges `nome{componente=..., estatistica=...}`."""
+    linhas = [f"# HELP {nome} Contadores e estado dos componentes internos.", f"# TYPE {nome} gauge"]
+    for componente, estatisticas in sorted(componentes.items()):
+        for estatistica, valor in sorted(estatisticas.items()):
+            if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+                linhas.append(f'{nome}{{componente="{componente}",estatistica="{estatistica}"}} {valor}')
+    return "\n".join(linhas) + "\n"
@@ -0,0 +1,99 @@
+from typing import Optional
+
+# 🔹 Intenções que o classificador pode devolver; qualquer outro texto vira "OUTRO"
+INTENCOES = (
+    "SAUDACAO",
+    "PEDIDO_ORCAMENTO",
+    "PERGUNTA_PRODUTO",
+    "VAGA_EMPREGO",
+    "FORA_REGIAO",
+    "CONTINUIDADE_FLUXO",
+    "DESPEDIDA",
+    "CONFIRMACAO",
+    "OUTRO",
+)
+
+# 🔹 Mapeamento da intenção para categoria
+MAPA_CATEGORIA = {
+    "PEDIDO_ORCAMENTO": "produtos_servicos",
+    "PERGUNTA_PRODUTO": "produtos_servicos",
+    "VAGA_EMPREGO": "institucional",
+    "FORA_REGIAO": "institucional"
+}
+
+RESPOSTA_TRANSFERENCIA = "Estou transferindo seu atendimento para o vendedor responsável. Em instantes ele entra em contato para dar continuidade ao seu pedido."
+RESPOSTA_ESPECIALISTA = "Preciso consultar um especialista sobre isso."
+SAUDACAO_INICIAL = "Bom dia, tudo bem? "
+ENCAMINHAMENTO_COMERCIAL = "\nPosso encaminhar seu pedido para nosso setor comercial."
+
+
+def resposta_fixa(intencao: str, slots_dict: dict) -> Optional[str]:
+    """Respostas que não dependem do que o RAG gerar."""
+    produto = slots_dict.get("produto")
+    localidade = slots_dict.get("localidade")
+    volume = slots_dict.get("volume_aproximado")
+
+    if intencao == "CONFIRMACAO" and produto and localidade:
+        return f"Ótimo! Já tenho o pedido de {volume or 'volume não informado'} de {produto} para {localidade}. Estou encaminhando ao setor responsável."
+    if intencao == "PEDIDO_ORCAMENTO" and produto and localidade:
+        return RESPOSTA_TRANSFERENCIA
+    return None
+
+
+def definir_etapa(intencao, slots_dict, resposta, eh_primeira_interacao) -> str:
+    produto = slots_dict.get("produto")
+    localidade = slots_dict.get("localidade")
+
+    if intencao == "SAUDACAO" and eh_primeira_interacao:
+        return "INICIO"
+    elif intencao == "PEDIDO_ORCAMENTO" and (produto and localidade):
+        return "FINALIZADO"
+    elif intencao == "PEDIDO_ORCAMENTO":
+        return "COLETA_INFO"
+    elif intencao in ("DESPEDIDA", "FORA_REGIAO") or "consultar um especialista" in resposta.lower():
+        return "FINALIZADO"
+    elif intencao == "CONFIRMACAO":
+        return "FINALIZADO"
+    return "MEIO"
+
+
+def planejar_turno(intencao: str, slots_dict: dict, eh_primeira_interacao: bool) -> dict:
+    """
+    Decide, antes da recuperação, o que o turno precisa executar.
+    Se a resposta final já é um texto fixo, busca vetorial e LLM de resposta não rodam.
+    """
+    plano = {
+        "intencao": intencao,
+        "slots": slots_dict,
+        "eh_primeira_interacao": eh_primeira_interacao,
+        "categoria": MAPA_CATEGORIA.get(intencao),
+        "usar_rag": True,
+        "resposta": None,
+        "etapa": None,
+    }
+
+    fixa = resposta_fixa(intencao, slots_dict)
+    if fixa:
+        plano.update(
+            usar_rag=False,
+            resposta=fixa,
+            etapa=definir_etapa(intencao, slots_dict, fixa, eh_primeira_interacao),
+        )
+    return plano
+
+
+def concluir_turno(plano: dict, resposta_base: str = "", documentos_utilizados=()):
+    """Monta (resposta, etapa) a partir do plano e, se houve, do resultado do RAG."""
+    if not plano["usar_rag"]:
+        return plano["resposta"], plano["etapa"]
+
+    intencao = plano["intencao"]
+    if "consultar um especialista" in resposta_base.lower() or len(documentos_utilizados) == 0:
+        resposta = RESPOSTA_ESPECIALISTA
+    else:
+        saudacao = SAUDACAO_INICIAL if plano["eh_primeira_interacao"] else ""
+        encaminhamento = ENCAMINHAMENTO_COMERCIAL if intencao == "PEDIDO_ORCAMENTO" else ""
+        resposta = f"{saudacao}{resposta_base}{encaminhamento}".strip()
+
+    etapa = definir_etapa(intencao, plano["slots"], resposta, plano["eh_primeira_interacao"])
+    return resposta, etapa
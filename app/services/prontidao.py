@@ -0,0 +1,151 @@
+import os
+import time
+import asyncio
+import importlib
+
+# 🔹 Intervalo entre tentativas quando uma dependência ainda não respondeu
+PRONTIDAO_RETENTATIVA_S = float(os.getenv("PRONTIDAO_RETENTATIVA_S", "5"))
+
+TEXTOS_AQUECIMENTO = [
+    "aquecimento",
+    "Vocês trabalham com forro de gesso?",
+    "Quero orçamento de piso vinílico para Porto Alegre",
+]
+
+# Importados numa thread logo após a subida, antes da primeira requisição precisar deles
+MODULOS_PESADOS = (
+    "mlflow",
+    "app.generated.client",
+    "langchain_openai",
+    "langchain_community.vectorstores.qdrant",
+    "qdrant_client",
+    "transformers",
+)
+
+# Sem estas etapas a API responde, mas as primeiras requisições pagam o aquecimento
+ETAPAS_OBRIGATORIAS = ("embeddings", "pipeline", "qdrant", "prisma")
+
+
+class EstadoProntidao:
+    """Situação de cada etapa do aquecimento; pronto quando todas as obrigatórias passaram."""
+
+    def __init__(self):
+        self.etapas = {etapa: "pendente" for etapa in ETAPAS_OBRIGATORIAS + ("classificador",)}
+        self.erros = {}
+        self.duracoes = {}
+        self.inicio = time.monotonic()
+        self.pronto_em = None
+
+    @property
+    def pronto(self) -> bool:
+        return all(self.etapas[etapa] == "ok" for etapa in ETAPAS_OBRIGATORIAS)
+
+    def marcar(self, etapa: str, status: str, duracao: float = None, erro: Exception = None):
+        self.etapas[etapa] = status
+        if duracao is not None:
+            self.duracoes[etapa] = round(duracao * 1000, 1)
+        if erro is not None:
+            self.erros[etapa] = str(erro)
+        else:
+            self.erros.pop(etapa, None)
+        if self.pronto and self.pronto_em is None:
+            self.pronto_em = time.monotonic()
+            print(f"[LOG] Aquecimento concluído em {self.pronto_em - self.inicio:.1f}s")
+
+    def resumo(self) -> dict:
+        return {
+            "status": "pronto" if self.pronto else "aquecendo",
+            "etapas": dict(self.etapas),
+            "duracoes_ms": dict(self.duracoes),
+            "erros": dict(self.erros),
+        }
+
+
+async def _executar_etapa(estado: EstadoProntidao, etapa: str, corrotina) -> bool:
+    inicio = time.perf_counter()
+    try:
+        await corrotina
+    except Exception as e:
+        estado.marcar(etapa, "falhou", time.perf_counter() - inicio, e)
+        print(f"[WARN] Aquecimento: etapa {etapa} falhou: {e}")
+        return False
+    estado.marcar(etapa, "ok", time.perf_counter() - inicio)
+    return True
+
+
+def precarregar_modulos(modulos=MODULOS_PESADOS):
+    for modulo in modulos:
+        try:
+            importlib.import_module(modulo)
+        except Exception as e:
+            print(f"[WARN] Pré-carga de {modulo} falhou: {e}")
+
+
+async def _aquecer_embeddings():
+    from app.services.embeddings import embedding_model, embeddings_consulta
+
+    # Carrega os pesos fora do event loop e passa um lote pelo pool de inferência
+    await asyncio.to_thread(embedding_model.carregar)
+    await embeddings_consulta.aembed_documents(TEXTOS_AQUECIMENTO)
+
+
+async def _aquecer_pipeline():
+    from app.services.rag_chain import carregar_pipeline
+
+    # Mesma montagem que as requisições esperam, se chegarem antes do fim do aquecimento
+    await carregar_pipeline()
+
+
+async def _aquecer_qdrant():
+    from app.services.rag_chain import QDRANT_COLLECTION, carregar_pipeline
+
+    # Só a conexão com o Qdrant: numa implantação nova a coleção só existe depois do
+    # primeiro /upload-conhecimento, e exigir uma busca deixaria o pod fora do ar para sempre.
+    # O embedder já foi aquecido pelo pool na etapa de embeddings.
+    pipeline = await carregar_pipeline()
+    if not await pipeline["qdrant_async_client"].collection_exists(QDRANT_COLLECTION):
+        print(f"[WARN] Coleção {QDRANT_COLLECTION} ainda não existe no Qdrant; aguardando o primeiro upload")
+
+
+async def _aquecer_prisma():
+    from app.services.database import get_prisma, operacao_prisma
+
+    prisma = await get_prisma()
+    with operacao_prisma():
+        await prisma.sessao.find_first()
+
+
+async def _treinar_classificador():
+    from app.services.database import get_prisma
+    from app.services.intent_classifier import treinar_classificador_local
+
+    await treinar_classificador_local(await get_prisma())
+
+
+async def aquecer(estado: EstadoProntidao, retentativa: float = PRONTIDAO_RETENTATIVA_S):
+    """
+    Pré-carrega os módulos pesados e aquece embeddings, pipeline, Qdrant e Prisma,
+    repetindo as etapas que falharem até todas passarem.
+    O classificador local é opcional: se falhar, o LLM decide.
+    """
+    await asyncio.to_thread(precarregar_modulos)
+
+    etapas = {
+        "embeddings": _aquecer_embeddings,
+        "pipeline": _aquecer_pipeline,
+        "qdrant": _aquecer_qdrant,
+        "prisma": _aquecer_prisma,
+    }
+
+    while True:
+        for etapa, funcao in etapas.items():
+            if estado.etapas[etapa] != "ok":
+                if not await _executar_etapa(estado, etapa, funcao()):
+                    break
+        if estado.pronto:
+            break
+        await asyncio.sleep(retentativa)
+
+    if not await _executar_etapa(estado, "classificador", _treinar_classificador()):
+        print("[WARN] Classificador local indisponível, usando apenas o LLM")
+    return estado
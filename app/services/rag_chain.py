@@ -1,37 +1,121 @@
 import os
-from langchain_community.chat_models import ChatOpenAI
-from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import StrOutputParser, JsonOutputParser
-from langchain.output_parsers import OutputFixingParser
-from langchain.chains import ConversationalRetrievalChain
-from langchain_community.vectorstores.qdrant import Qdrant as LangchainQdrant
-from qdrant_client import QdrantClient
-from app.services.embeddings import embedding_model
-from app.generated.client import Prisma
+import re
+import asyncio
+import threading
+from app.services.database import get_prisma
+from app.services.sessao import carregar_sessao
+
+# LangChain, Qdrant e o modelo de embeddings só são importados ao montar o pipeline
 
 QDRANT_URL = os.getenv("QDRANT_URL", "http://localhost:6333")
 QDRANT_COLLECTION = "cemear_knowledge_base"
 
-async def setup_rag_chain(sessao_token: str, filtro_categoria: str = None):
-    prisma = Prisma()
-    await prisma.connect()
+# 🔹 Reescrita da pergunta antes da busca: "off", "heuristica" (sem LLM) ou "llm"
+RAG_CONDENSACAO = os.getenv("RAG_CONDENSACAO", "heuristica").strip().lower()
 
-    # 🔹 Sessão e histórico
-    sessao = await prisma.sessao.find_unique(where={"token": sessao_token})
-    historico = await prisma.fluxoconversa.find_many(
-        where={"sessaoId": sessao.id}, order={"id": "asc"}, take=5
-    )
-    eh_primeira_interacao = len(historico) == 0
-    chat_history = [(h.pedido, h.resposta) for h in historico if h.resposta]
-
-    # 🔹 LLM
-    llm = ChatOpenAI(
-        model="mistral-large-latest",
-        openai_api_key=os.getenv("MISTRAL_API_KEY"),
-        base_url="https://api.mistral.ai/v1",
-        temperature=0.3,
+# 🔹 Categorias com retriever pré-montado (None = sem filtro)
+CATEGORIAS_RAG = (None, "produtos_servicos", "institucional")
+RAG_K = 3
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+_montagem = None
+
+
+def filtro_categoria_qdrant(filtro_categoria):
+    """Filtro do Qdrant para a categoria; a vectorstore guarda os metadados em `metadata.*`."""
+    from qdrant_client import models
+
+    return models.Filter(must=[
+        models.FieldCondition(key="metadata.categoria", match=models.MatchValue(value=filtro_categoria))
+    ])
+
+
+def _criar_retriever(vectorstore, filtro_categoria=None):
+    search_kwargs = {"k": RAG_K}
+    if filtro_categoria:
+        print(f"[LOG] Aplicando filtro de categoria no retriever: {filtro_categoria}")
+        search_kwargs["filter"] = filtro_categoria_qdrant(filtro_categoria)
+    else:
+        print("[LOG] Nenhum filtro de categoria aplicado")
+
+    return vectorstore.as_retriever(
+        search_type="similarity",
+        search_kwargs=search_kwargs
     )
 
+
+def formatar_historico(chat_history) -> str:
+    """Histórico no formato Human/Assistant usado em {chat_history}."""
+    buffer = ""
+    for pedido, resposta in chat_history:
+        buffer += f"\nHuman: {pedido or ''}\nAssistant: {resposta or ''}"
+    return buffer
+
+
+def formatar_contexto(documentos) -> str:
+    """Conteúdo dos documentos recuperados, separados por linha em branco, para {context}."""
+    return "\n\n".join(doc.page_content for doc in documentos)
+
+
+_REFERENCIAS = re.compile(
+    r"\b(isso|isto|esse|essa|esses|essas|este|esta|ele|ela|eles|elas|dele|dela|disso|nesse|nessa|desse|dessa|mesmo|mesma|tamb[ée]m)\b",
+    re.IGNORECASE,
+)
+
+
+def condensar_heuristica(pergunta: str, chat_history) -> str:
+    """
+    Reescrita sem LLM: perguntas curtas ou que fazem referência ao turno anterior
+    ("e o preço?", "vocês instalam isso?") levam o último pedido do cliente junto para a busca.
+    """
+    pedidos = [pedido for pedido, _ in chat_history if pedido]
+    if not pedidos:
+        return pergunta
+    if len(pergunta.split()) <= 4 or _REFERENCIAS.search(pergunta):
+        return f"{pedidos[-1]} {pergunta}"
+    return pergunta
+
+
+async def preparar_consulta(pergunta: str, chat_history, condense_chain=None, modo: str = None) -> str:
+    """Texto usado na busca vetorial para a pergunta atual, conforme o modo de condensação."""
+    modo = modo or RAG_CONDENSACAO
+    if not chat_history or modo == "off":
+        return pergunta
+    if modo == "llm" and condense_chain is not None:
+        return (await condense_chain.ainvoke({
+            "question": pergunta,
+            "chat_history": formatar_historico(chat_history),
+        })).strip()
+    return condensar_heuristica(pergunta, chat_history)
+
+
+def _criar_llm(cache=None):
+    from app.services.llm_clientes import criar_llm
+
+    # 🔹 Todas as chains compartilham o mesmo pool HTTP (keep-alive/HTTP2) com o provedor
+    return criar_llm(cache=cache)
+
+
+def build_pipeline():
+    """
+    Monta uma única vez os componentes do pipeline que não dependem da sessão:
+    LLM, cadeias de intenção e slots, vectorstore, um retriever por categoria e a chain de resposta.
+    """
+    from langchain_core.prompts import PromptTemplate
+    from langchain_core.output_parsers import StrOutputParser, JsonOutputParser
+    from langchain.output_parsers import OutputFixingParser
+    from langchain_community.vectorstores.qdrant import Qdrant as LangchainQdrant
+    from qdrant_client import QdrantClient, AsyncQdrantClient
+    from app.services.embeddings import embeddings_consulta
+    from app.services.llm_cache import cache_para_chain
+
+    # 🔹 LLM (cada chain com seu cache exato, habilitado por LLM_CACHE_CHAINS)
+    llm = _criar_llm(cache=cache_para_chain("resposta"))
+    llm_classificacao = _criar_llm(cache=cache_para_chain("classificacao"))
+    llm_slots = _criar_llm(cache=cache_para_chain("slots"))
+    llm_extracao = _criar_llm(cache=cache_para_chain("extracao"))
+
     # 🔹 Intenção
     intencao_prompt = PromptTemplate.from_template("""
 Você é um classificador de intenção para uma assistente virtual da Cemear (pisos, divisórias e soluções acústicas).
@@ -49,7 +133,7 @@ Classifique a frase do cliente em UMA das seguintes categorias:
 Frase: {texto}
 Categoria:
 """)
-    classificacao_chain = intencao_prompt | llm | StrOutputParser()
+    classificacao_chain = intencao_prompt | llm_classificacao | StrOutputParser()
 
     # 🔹 Slot filling
     slot_prompt = PromptTemplate.from_template("""
@@ -73,39 +157,60 @@ Responda APENAS com um JSON válido, exatamente neste formato:
 Frase: {texto}
 JSON:
 """)
-    slot_filling_chain = slot_prompt | llm | OutputFixingParser.from_llm(
-        parser=JsonOutputParser(), llm=llm
+    slot_filling_chain = slot_prompt | llm_slots | OutputFixingParser.from_llm(
+        parser=JsonOutputParser(), llm=llm_slots
     )
 
+    # 🔹 Intenção + slots numa única chamada (JSON mode)
+    extracao_prompt = PromptTemplate.from_template("""
+Você é o extrator de uma assistente virtual da Cemear (pisos, divisórias e soluções acústicas).
+Para a frase do cliente, classifique a intenção em UMA das categorias abaixo e extraia as informações do pedido.
+
+Categorias de intenção:
+- SAUDACAO
+- PEDIDO_ORCAMENTO
+- PERGUNTA_PRODUTO
+- VAGA_EMPREGO
+- FORA_REGIAO
+- CONTINUIDADE_FLUXO
+- DESPEDIDA
+- CONFIRMACAO
+- OUTRO
+
+Se alguma informação não estiver presente, use `null`.
+
+Responda APENAS com um JSON válido, exatamente neste formato:
+{{
+  "intencao": string,
+  "produto": string | null,
+  "volume_aproximado": string | null,
+  "localidade": string | null,
+  "prazo": string | null
+}}
+
+Frase: {texto}
+JSON:
+""")
+    extracao_chain = extracao_prompt | llm_extracao.bind(
+        response_format={"type": "json_object"}
+    ) | StrOutputParser()
+
     # 🔹 Qdrant
     qdrant_client = QdrantClient(url=QDRANT_URL)
+    qdrant_async_client = AsyncQdrantClient(url=QDRANT_URL)
+    # O cliente assíncrono faz a busca usar `aembed_query`, que passa pelo micro-batcher
     vectorstore = LangchainQdrant(
         client=qdrant_client,
+        async_client=qdrant_async_client,
         collection_name=QDRANT_COLLECTION,
-        embeddings=embedding_model,
+        embeddings=embeddings_consulta,
     )
 
-    # 🔹 Ajuste do filtro
-    search_kwargs = {"k": 3}
-    if filtro_categoria:
-        filtro = {
-            "must": [
-                {
-                    "key": "categoria",
-                    "match": {"value": filtro_categoria}
-                }
-            ]
-        }
-
-        print(f"[LOG] Aplicando filtro de categoria no retriever: {filtro}")
-        search_kwargs["filter"] = filtro
-    else:
-        print("[LOG] Nenhum filtro de categoria aplicado")
-
-    retriever = vectorstore.as_retriever(
-        search_type="similarity",
-        search_kwargs=search_kwargs
-    )
+    # 🔹 Um retriever por categoria, montado uma vez
+    retrievers = {
+        categoria: _criar_retriever(vectorstore, categoria)
+        for categoria in CATEGORIAS_RAG
+    }
 
     # 🔹 Prompt final RAG
     resposta_prompt = PromptTemplate.from_template("""
@@ -130,32 +235,92 @@ PERGUNTA ATUAL:
 {question}
 """)
 
-    rag_chain = ConversationalRetrievalChain.from_llm(
-        llm=llm,
-        retriever=retriever,
-        return_source_documents=True,
-        combine_docs_chain_kwargs={"prompt": resposta_prompt}
-    )
+    # 🔹 Reescrita via LLM, usada apenas com RAG_CONDENSACAO=llm
+    condense_prompt = PromptTemplate.from_template("""
+Dada a conversa abaixo e uma pergunta de continuação, reescreva a pergunta de continuação
+como uma pergunta independente, no idioma original.
 
-    # 🔹 Teste opcional: loga documentos recuperados se quiser validar manualmente
-    try:
-        from langchain_core.runnables import Runnable
-        if isinstance(rag_chain, Runnable):
-            docs = retriever.get_relevant_documents("gesso")
-            print(f"[DEBUG] Documentos exemplo para 'gesso':")
-            for d in docs:
-                print(f"- Conteúdo: {d.page_content[:60]}...")
-                print(f"  Metadados: {d.metadata}")
-    except Exception as e:
-        print(f"[WARN] Falha ao testar exemplo de busca: {e}")
+Histórico:
+{chat_history}
+Pergunta de continuação: {question}
+Pergunta independente:
+""")
+    condense_chain = condense_prompt | llm | StrOutputParser()
+    answer_chain = resposta_prompt | llm | StrOutputParser()
 
     return {
-        "prisma": prisma,
         "llm": llm,
         "classificacao_chain": classificacao_chain,
         "slot_filling_chain": slot_filling_chain,
-        "rag_chain": rag_chain,
-        "sessao": sessao,
-        "eh_primeira_interacao": eh_primeira_interacao,
-        "chat_history": chat_history,
+        "extracao_chain": extracao_chain,
+        "qdrant_client": qdrant_client,
+        "qdrant_async_client": qdrant_async_client,
+        "vectorstore": vectorstore,
+        "retrievers": retrievers,
+        "resposta_prompt": resposta_prompt,
+        "answer_chain": answer_chain,
+        "condense_chain": condense_chain,
+    }
+
+
+def init_pipeline():
+    """Monta o pipeline e o registra como o pipeline do processo (uma vez, mesmo com chamadas concorrentes)."""
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            _pipeline = build_pipeline()
+    return _pipeline
+
+
+async def carregar_pipeline():
+    """
+    Pipeline do processo para código assíncrono. A montagem roda numa thread e é uma
+    tarefa só, compartilhada entre o aquecimento e as requisições que chegarem antes dele terminar.
+    """
+    global _montagem
+    if _pipeline is not None:
+        return _pipeline
+
+    loop = asyncio.get_running_loop()
+    if (
+        _montagem is None
+        or _montagem.get_loop() is not loop
+        or (_montagem.done() and (_montagem.cancelled() or _montagem.exception() is not None))
+    ):
+        _montagem = loop.create_task(asyncio.to_thread(init_pipeline))
+    return await asyncio.shield(_montagem)
+
+
+def get_pipeline():
+    """
+    Pipeline do processo para código síncrono (scripts, benchmarks). Dentro do event loop
+    use `await carregar_pipeline()`: montar aqui bloquearia todas as conexões.
+    """
+    if _pipeline is not None:
+        return _pipeline
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return init_pipeline()
+    raise RuntimeError("Pipeline ainda não montado; use `await carregar_pipeline()` no event loop.")
+
+
+async def setup_rag_chain(sessao_token: str, filtro_categoria: str = None):
+    pipeline = await carregar_pipeline()
+
+    prisma = await get_prisma()
+
+    # 🔹 Sessão e histórico
+    contexto = await carregar_sessao(prisma, sessao_token)
+
+    return {
+        "prisma": prisma,
+        "llm": pipeline["llm"],
+        "classificacao_chain": pipeline["classificacao_chain"],
+        "slot_filling_chain": pipeline["slot_filling_chain"],
+        "retriever": pipeline["retrievers"][filtro_categoria],
+        "answer_chain": pipeline["answer_chain"],
+        "sessao": contexto["sessao"],
+        "eh_primeira_interacao": contexto["eh_primeira_interacao"],
+        "chat_history": contexto["chat_history"],
     }
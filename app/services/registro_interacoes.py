@@ -0,0 +1,215 @@
+"""
+Log de interações append-only: cada turno vira uma linha JSON num segmento NDJSON
+comprimido (gzip), com rotação por tamanho/data e um índice pequeno por sessão e dia.
+Substitui o diretório de run do MLflow por mensagem; `exportar_para_mlflow` envia
+só os agregados diários.
+
+Uso:
+    python -m app.services.registro_interacoes exportar [--desde 2026-01-01] [--ate 2026-01-31]
+"""
+import os
+import gzip
+import json
+import time
+import argparse
+import threading
+from pathlib import Path
+from datetime import datetime, date
+
+INTERACOES_DIR = os.getenv("INTERACOES_DIR", "data/interacoes")
+INTERACOES_SEGMENTO_MAX_MB = float(os.getenv("INTERACOES_SEGMENTO_MAX_MB", "64"))
+MLFLOW_EXPERIMENTO_AGREGADO = os.getenv("MLFLOW_EXPERIMENTO_AGREGADO", "chat_agregado")
+
+ARQUIVO_INDICE = "indice.ndjson"
+
+
+def _dia(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).date().isoformat()
+
+
+class LogInteracoes:
+    """
+    Escreve lotes de eventos no segmento ativo (`interacoes-<dia>-<pid>-<n>.ndjson.gz`).
+    O segmento é fechado ao passar de `max_bytes` ou ao virar o dia; ao fechar, uma linha
+    com o dia e as sessões dele vai para `indice.ndjson`. Segmentos sem entrada no índice
+    (ativo ou de um processo que caiu) são sempre lidos.
+    """
+
+    def __init__(self, diretorio: str = INTERACOES_DIR, max_bytes: int = int(INTERACOES_SEGMENTO_MAX_MB * 1024 * 1024)):
+        self.diretorio = Path(diretorio)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._arquivo = None
+        self._segmento = None
+        self._dia_segmento = None
+        self._sessoes = set()
+        self._eventos = 0
+        self._numero = 0
+
+    # ---------- escrita ----------
+
+    def _abrir_segmento(self, dia: str):
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        while True:
+            self._numero += 1
+            nome = f"interacoes-{dia}-{os.getpid()}-{self._numero:04d}.ndjson.gz"
+            if not (self.diretorio / nome).exists():
+                break
+        self._segmento = self.diretorio / nome
+        self._arquivo = gzip.open(self._segmento, "at", encoding="utf-8")
+        self._dia_segmento = dia
+        self._sessoes = set()
+        self._eventos = 0
+
+    def _fechar_segmento(self):
+        if self._arquivo is None:
+            return
+        self._arquivo.close()
+        entrada = {
+            "segmento": self._segmento.name,
+            "dia": self._dia_segmento,
+            "eventos": self._eventos,
+            "sessoes": sorted(self._sessoes),
+        }
+        with open(self.diretorio / ARQUIVO_INDICE, "a", encoding="utf-8") as indice:
+            indice.write(json.dumps(entrada, ensure_ascii=False) + "\n")
+        self._arquivo = None
+        self._segmento = None
+
+    def escrever_lote(self, lote):
+        with self._lock:
+            for evento in lote:
+                dia = _dia(evento.get("timestamp", time.time()))
+                if self._arquivo is not None and (
+                    dia != self._dia_segmento or self._segmento.stat().st_size >= self.max_bytes
+                ):
+                    self._fechar_segmento()
+                if self._arquivo is None:
+                    self._abrir_segmento(dia)
+
+                self._arquivo.write(json.dumps(evento, ensure_ascii=False, default=str) + "\n")
+                self._sessoes.add(str(evento.get("sessao_id")))
+                self._eventos += 1
+            if self._arquivo is not None:
+                # Sync flush: o segmento ativo fica legível até aqui mesmo se o processo cair
+                self._arquivo.flush()
+
+    def fechar(self):
+        with self._lock:
+            self._fechar_segmento()
+
+    # ---------- leitura ----------
+
+    def indice(self) -> dict:
+        caminho = self.diretorio / ARQUIVO_INDICE
+        if not caminho.exists():
+            return {}
+        entradas = {}
+        for linha in caminho.read_text(encoding="utf-8").splitlines():
+            if linha.strip():
+                entrada = json.loads(linha)
+                entradas[entrada["segmento"]] = entrada
+        return entradas
+
+    def segmentos(self, sessao_id=None, desde: str = None, ate: str = None):
+        """Segmentos que podem conter eventos da sessão e do intervalo de dias (inclusivo)."""
+        indice = self.indice()
+        selecionados = []
+        for caminho in sorted(self.diretorio.glob("interacoes-*.ndjson.gz")):
+            entrada = indice.get(caminho.name)
+            if entrada is not None:
+                if sessao_id is not None and str(sessao_id) not in entrada["sessoes"]:
+                    continue
+                if (desde and entrada["dia"] < desde) or (ate and entrada["dia"] > ate):
+                    continue
+            selecionados.append(caminho)
+        return selecionados
+
+    def segmentos_recentes(self):
+        """Todos os segmentos, do mais novo para o mais antigo (dia do índice ou do nome, depois mtime)."""
+        indice = self.indice()
+
+        def chave(caminho):
+            entrada = indice.get(caminho.name)
+            dia = entrada["dia"] if entrada is not None else caminho.name[len("interacoes-"):][:10]
+            return dia, caminho.stat().st_mtime, caminho.name
+
+        return sorted(self.diretorio.glob("interacoes-*.ndjson.gz"), key=chave, reverse=True)
+
+    def ler_segmento(self, caminho):
+        """Eventos de um segmento, na ordem em que foram gravados."""
+        try:
+            with gzip.open(caminho, "rt", encoding="utf-8") as arquivo:
+                for linha in arquivo:
+                    yield json.loads(linha)
+        except (EOFError, OSError, json.JSONDecodeError) as e:
+            # Segmento ainda aberto ou de um processo que caiu: aproveita o que foi gravado
+            if caminho != self._segmento:
+                print(f"[WARN] Segmento {caminho.name} truncado: {e}")
+
+    def ler(self, sessao_id=None, desde: str = None, ate: str = None):
+        """Itera os eventos filtrando por sessão e por dia (`YYYY-MM-DD`, inclusivo)."""
+        for caminho in self.segmentos(sessao_id, desde, ate):
+            for evento in self.ler_segmento(caminho):
+                if sessao_id is not None and str(evento.get("sessao_id")) != str(sessao_id):
+                    continue
+                dia = _dia(evento.get("timestamp", 0))
+                if (desde and dia < desde) or (ate and dia > ate):
+                    continue
+                yield evento
+
+
+def agregar_por_dia(eventos) -> dict:
+    dias = {}
+    for evento in eventos:
+        dia = dias.setdefault(_dia(evento["timestamp"]), {
+            "turnos": 0, "erros": 0, "com_documentos": 0, "tempos": [], "intencoes": {}, "contextos": {},
+        })
+        if evento["tipo"] == "erro":
+            dia["erros"] += 1
+            continue
+        dia["turnos"] += 1
+        dia["com_documentos"] += bool(evento.get("documentos"))
+        dia["tempos"].append(evento.get("tempo_execucao", 0.0))
+        dia["intencoes"][evento["intencao"]] = dia["intencoes"].get(evento["intencao"], 0) + 1
+        dia["contextos"][evento["contexto"]] = dia["contextos"].get(evento["contexto"], 0) + 1
+
+    for dados in dias.values():
+        tempos = sorted(dados.pop("tempos"))
+        dados["tempo_medio"] = sum(tempos) / len(tempos) if tempos else 0.0
+        dados["tempo_p95"] = tempos[max(0, int(len(tempos) * 0.95) - 1)] if tempos else 0.0
+    return dias
+
+
+def exportar_para_mlflow(log: LogInteracoes, desde: str = None, ate: str = None, experimento: str = MLFLOW_EXPERIMENTO_AGREGADO):
+    """Uma run do MLflow por dia, com as métricas agregadas e a contagem por intenção."""
+    import mlflow
+
+    dias = agregar_por_dia(log.ler(desde=desde, ate=ate))
+    mlflow.set_experiment(experimento)
+    for dia, dados in sorted(dias.items()):
+        with mlflow.start_run(run_name=f"interacoes-{dia}"):
+            mlflow.set_tag("dia", dia)
+            mlflow.log_metrics({
+                "turnos": dados["turnos"],
+                "erros": dados["erros"],
+                "turnos_com_documentos": dados["com_documentos"],
+                "tempo_medio": dados["tempo_medio"],
+                "tempo_p95": dados["tempo_p95"],
+                **{f"intencao_{nome}": total for nome, total in dados["intencoes"].items()},
+            })
+            mlflow.log_dict(dados, "agregado.json")
+        print(f"[LOG] {dia}: {dados['turnos']} turnos, {dados['erros']} erros exportados")
+    return dias
+
+
+log_interacoes = LogInteracoes()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("comando", choices=["exportar"])
+    parser.add_argument("--desde", default=None)
+    parser.add_argument("--ate", default=date.today().isoformat())
+    args = parser.parse_args()
+    exportar_para_mlflow(log_interacoes, args.desde, args.ate)
@@ -0,0 +1,149 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+from app.services.metricas import medir
+
+# 🔹 Configuração do cache semântico de respostas RAG
+CACHE_SEMANTICO_ATIVO = os.getenv("CACHE_SEMANTICO_ATIVO", "1") == "1"
+CACHE_SEMANTICO_LIMIAR = float(os.getenv("CACHE_SEMANTICO_LIMIAR", "0.95"))
+CACHE_SEMANTICO_MAX_ENTRADAS = int(os.getenv("CACHE_SEMANTICO_MAX_ENTRADAS", "2000"))
+CACHE_SEMANTICO_TTL = float(os.getenv("CACHE_SEMANTICO_TTL", "86400"))
+
+
+class CacheSemantico:
+    """
+    Cache de respostas RAG indexado pelo embedding da pergunta.
+    A chave é (vetor da pergunta, categoria do filtro, versão da base de conhecimento);
+    um acerto exige mesma categoria, mesma versão e similaridade de cosseno >= limiar.
+    """
+
+    def __init__(
+        self,
+        limiar: float = CACHE_SEMANTICO_LIMIAR,
+        max_entradas: int = CACHE_SEMANTICO_MAX_ENTRADAS,
+        ttl: float = CACHE_SEMANTICO_TTL,
+        relogio=time.monotonic,
+    ):
+        self.limiar = limiar
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.relogio = relogio
+        self.versao_base = 0
+        self._entradas = OrderedDict()
+        self._proximo_id = 0
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        self.remocoes = 0
+
+    @staticmethod
+    def _normalizar(vetor) -> np.ndarray:
+        vetor = np.asarray(vetor, dtype=np.float32)
+        return vetor / max(float(np.linalg.norm(vetor)), 1e-12)
+
+    def _expirada(self, entrada, agora) -> bool:
+        return self.ttl > 0 and agora - entrada["criado_em"] > self.ttl
+
+    def buscar(self, vetor, categoria):
+        """Retorna a entrada mais similar (resposta, documentos, similaridade) ou None."""
+        consulta = self._normalizar(vetor)
+        agora = self.relogio()
+
+        with self._lock:
+            melhor_id, melhor_sim = None, -1.0
+            for chave, entrada in list(self._entradas.items()):
+                if self._expirada(entrada, agora):
+                    del self._entradas[chave]
+                    self.remocoes += 1
+                    continue
+                if entrada["categoria"] != categoria or entrada["versao"] != self.versao_base:
+                    continue
+                similaridade = float(entrada["vetor"] @ consulta)
+                if similaridade > melhor_sim:
+                    melhor_id, melhor_sim = chave, similaridade
+
+            if melhor_id is None or melhor_sim < self.limiar:
+                self.falhas += 1
+                return None
+
+            self._entradas.move_to_end(melhor_id)
+            self.acertos += 1
+            entrada = self._entradas[melhor_id]
+            return {
+                "resposta": entrada["resposta"],
+                "documentos": entrada["documentos"],
+                "similaridade": melhor_sim,
+            }
+
+    def salvar(self, vetor, categoria, resposta, documentos, versao: int = None):
+        """
+        `versao` é a versão da base vista na busca; se a base mudou desde então,
+        a resposta foi gerada com documentos antigos e não entra no cache.
+        """
+        with self._lock:
+            if versao is not None and versao != self.versao_base:
+                return False
+            self._entradas[self._proximo_id] = {
+                "vetor": self._normalizar(vetor),
+                "categoria": categoria,
+                "versao": self.versao_base,
+                "resposta": resposta,
+                "documentos": list(documentos),
+                "criado_em": self.relogio(),
+            }
+            self._proximo_id += 1
+
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+                self.remocoes += 1
+        return True
+
+    def invalidar(self):
+        """Nova versão da base de conhecimento: nenhuma resposta antiga vale mais."""
+        with self._lock:
+            self.versao_base += 1
+            self._entradas.clear()
+        print(f"[LOG] Cache semântico invalidado (versão da base {self.versao_base})")
+
+    def estatisticas(self) -> dict:
+        total = self.acertos + self.falhas
+        return {
+            "entradas": len(self._entradas),
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "remocoes": self.remocoes,
+            "taxa_acerto": self.acertos / total if total else 0.0,
+            "versao_base": self.versao_base,
+        }
+
+
+cache_semantico = CacheSemantico()
+
+
+async def buscar_resposta_cache(pergunta: str, categoria, chat_history=None):
+    """
+    Retorna (entrada ou None, chave para `salvar_resposta_cache`). A chave guarda o vetor
+    da pergunta e a versão da base vista agora; é None quando o cache não se aplica.
+    Perguntas com histórico ficam de fora: a resposta depende da conversa, não só da pergunta.
+    """
+    if not CACHE_SEMANTICO_ATIVO or chat_history:
+        return None, None
+
+    from app.services.embeddings import embeddings_consulta
+
+    versao = cache_semantico.versao_base
+    with medir("cache_semantico"):
+        vetor = await embeddings_consulta.aembed_query(pergunta)
+        entrada = cache_semantico.buscar(vetor, categoria)
+    if entrada:
+        print(f"[LOG] Cache semântico: acerto (similaridade {entrada['similaridade']:.3f})")
+    return entrada, {"vetor": vetor, "versao": versao}
+
+
+def salvar_resposta_cache(chave, categoria, resposta, documentos):
+    if not CACHE_SEMANTICO_ATIVO or chave is None or not documentos:
+        return
+    if not cache_semantico.salvar(chave["vetor"], categoria, resposta, documentos, versao=chave["versao"]):
+        print("[LOG] Cache semântico: base atualizada durante a geração, resposta não armazenada")
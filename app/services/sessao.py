@@ -0,0 +1,300 @@
+import os
+import asyncio
+from collections import Counter, namedtuple
+from app.services.cache_estado import CacheEstados, criar_cache_estados
+from app.services.database import conexao_perdida, get_prisma, operacao_prisma
+from app.services.metricas import medir
+
+# 🔹 Quantos turnos recentes entram no histórico do prompt
+SESSAO_HISTORICO_TURNOS = int(os.getenv("SESSAO_HISTORICO_TURNOS", "5"))
+
+# 🔹 Write-behind: turnos vão para o banco em lote, fora do caminho da requisição
+SESSAO_WRITE_BEHIND = os.getenv("SESSAO_WRITE_BEHIND", "1") == "1"
+SESSAO_FLUSH_INTERVALO_S = float(os.getenv("SESSAO_FLUSH_INTERVALO_S", "1.0"))
+SESSAO_FLUSH_MAX_LOTE = int(os.getenv("SESSAO_FLUSH_MAX_LOTE", "100"))
+
+# 🔹 Sem write-behind: grava o turno depois que a resposta já foi enviada
+SESSAO_PERSISTIR_APOS_RESPOSTA = os.getenv("SESSAO_PERSISTIR_APOS_RESPOSTA", "0") == "1"
+
+# Só o que o turno usa da sessão; vale tanto para o registro do banco quanto para o do cache
+SessaoAtiva = namedtuple("SessaoAtiva", "id token")
+
+
+async def buscar_estado_sessao(prisma, sessao_token: str, turnos: int = SESSAO_HISTORICO_TURNOS) -> dict:
+    """
+    Sessão, os `turnos` mais recentes e seus slots numa única consulta (include da relação `fluxo`).
+    O banco devolve do mais novo para o mais antigo; o estado guarda a ordem cronológica.
+    """
+    with medir("sessao"), operacao_prisma():
+        # prisma-client-py não suporta `select`: o FluxoConversa vem inteiro, só pedido/resposta/slots são usados
+        sessao = await prisma.sessao.find_unique(
+            where={"token": sessao_token},
+            include={"fluxo": {"take": turnos, "order_by": {"id": "desc"}, "include": {"slots": True}}},
+        )
+    if sessao is None:
+        raise ValueError("Sessão não encontrada.")
+
+    historico = list(reversed(sessao.fluxo or []))
+    slots = {}
+    for fluxo in historico:
+        slots.update({slot.nome: slot.valor for slot in fluxo.slots or []})
+    return {
+        "sessao_id": sessao.id,
+        "turnos": [[fluxo.pedido, fluxo.resposta] for fluxo in historico],
+        "slots": slots,
+    }
+
+
+def contexto_do_estado(sessao_token: str, estado: dict) -> dict:
+    return {
+        "sessao": SessaoAtiva(estado["sessao_id"], sessao_token),
+        "eh_primeira_interacao": len(estado["turnos"]) == 0,
+        "chat_history": [(pedido, resposta) for pedido, resposta in estado["turnos"] if resposta],
+        "slots": dict(estado["slots"]),
+    }
+
+
+async def carregar_sessao(prisma, sessao_token: str, turnos: int = SESSAO_HISTORICO_TURNOS) -> dict:
+    """Contexto do turno direto do banco, sem passar pelo cache de estado."""
+    return contexto_do_estado(sessao_token, await buscar_estado_sessao(prisma, sessao_token, turnos))
+
+
+def preparar_slots(slots_dict: dict):
+    """
+    Slots preenchidos prontos para o create aninhado e, por slot, o motivo de não poder ser salvo.
+    Validar antes evita que um valor inválido derrube a transação do turno inteiro.
+    """
+    slots, erros = [], {}
+    for nome, valor in slots_dict.items():
+        if valor is None or valor == "":
+            continue
+        if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+            valor = str(valor)
+        if not isinstance(valor, str):
+            erros[nome] = f"valor do tipo {type(valor).__name__} não é texto"
+            continue
+        if valor.strip():
+            slots.append({"nome": nome, "valor": valor.strip()})
+    return slots, erros
+
+
+def dados_turno(sessao_id, etapa, intencao, pedido, resposta, slots) -> dict:
+    """`data` do FluxoConversa com os slots (de `preparar_slots`) como create aninhado."""
+    return {
+        "sessaoId": sessao_id,
+        "etapa": etapa,
+        "intencao": intencao,
+        "pedido": pedido,
+        "resposta": resposta,
+        "slots": {"create": slots},
+    }
+
+
+async def gravar_turno(prisma, dados: dict):
+    """Turno e slots num único create aninhado: uma ida ao query engine, numa transação."""
+    try:
+        fluxo = await prisma.fluxoconversa.create(data=dados)
+    except Exception as e:
+        for slot in dados["slots"]["create"]:
+            print(f"[ERRO] Slot '{slot['nome']}' não foi salvo: turno da sessão {dados['sessaoId']} falhou")
+        print(f"[ERRO] Falha ao salvar turno da sessão {dados['sessaoId']}: {e}")
+        conexao_perdida(e)
+        raise
+    print(f"[LOG] Turno salvo com {len(dados['slots']['create'])} slots")
+    return fluxo
+
+
+class PersistenciaTurnos:
+    """
+    Write-behind dos turnos: `registrar` só enfileira; uma tarefa grava a cada
+    `intervalo` segundos (ou ao juntar `max_lote`) num único `prisma.batch_()`.
+    Se o lote falhar, os turnos são gravados um a um para isolar o que falhou;
+    `ao_falhar(sessao_token)` é chamado para cada turno perdido.
+    """
+
+    def __init__(self, obter_prisma=get_prisma, max_lote: int = SESSAO_FLUSH_MAX_LOTE, intervalo: float = SESSAO_FLUSH_INTERVALO_S):
+        self.obter_prisma = obter_prisma
+        self.ao_falhar = None
+        self.max_lote = max_lote
+        self.intervalo = intervalo
+        self._pendentes = []
+        self._por_token = Counter()
+        self._cheio = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._tarefa = None
+        self.gravados = 0
+        self.lotes = 0
+        self.falhas = 0
+
+    def registrar(self, sessao_token: str, dados: dict):
+        self._pendentes.append((sessao_token, dados))
+        self._por_token[sessao_token] += 1
+        if len(self._pendentes) >= self.max_lote:
+            self._cheio.set()
+
+    def pendente(self, sessao_token: str) -> bool:
+        return self._por_token[sessao_token] > 0
+
+    async def _gravar(self, lote):
+        prisma = await self.obter_prisma()
+        try:
+            # Fora de um turno, `medir` registra a etapa no histograma sem rótulos
+            with medir("persistencia"):
+                async with prisma.batch_() as batch:
+                    for _, dados in lote:
+                        batch.fluxoconversa.create(data=dados)
+            self.gravados += len(lote)
+            self.lotes += 1
+            return
+        except Exception as e:
+            print(f"[WARN] Falha ao gravar lote de {len(lote)} turnos, gravando um a um: {e}")
+            if conexao_perdida(e):
+                try:
+                    prisma = await self.obter_prisma()
+                except Exception as erro:
+                    print(f"[ERRO] Falha ao reconectar ao banco: {erro}")
+
+        for sessao_token, dados in lote:
+            try:
+                with medir("persistencia"):
+                    await gravar_turno(prisma, dados)
+                self.gravados += 1
+            except Exception:
+                self.falhas += 1
+                if self.ao_falhar is not None:
+                    await self.ao_falhar(sessao_token)
+
+    async def descarregar(self):
+        """Grava tudo o que está pendente (também usado antes de recarregar uma sessão do banco)."""
+        async with self._lock:
+            while self._pendentes:
+                lote = self._pendentes[:self.max_lote]
+                del self._pendentes[:len(lote)]
+                try:
+                    await self._gravar(lote)
+                finally:
+                    for sessao_token, _ in lote:
+                        self._por_token[sessao_token] -= 1
+                        if self._por_token[sessao_token] <= 0:
+                            del self._por_token[sessao_token]
+
+    async def _executar(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._cheio.wait(), self.intervalo)
+            except asyncio.TimeoutError:
+                pass
+            self._cheio.clear()
+            try:
+                await self.descarregar()
+            except Exception as e:
+                print(f"[ERRO] Falha no write-behind de turnos: {e}")
+
+    def iniciar(self):
+        if self._tarefa is None or self._tarefa.done():
+            self._tarefa = asyncio.create_task(self._executar())
+
+    async def encerrar(self):
+        """Para a tarefa e grava o que ainda estiver na fila."""
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
+        await self.descarregar()
+
+    def estatisticas(self) -> dict:
+        return {
+            "pendentes": len(self._pendentes),
+            "gravados": self.gravados,
+            "lotes": self.lotes,
+            "falhas": self.falhas,
+        }
+
+
+class EstadoSessoes:
+    """
+    Estado das sessões ativas (últimos turnos + slots acumulados) por token.
+    Sessões no cache não consultam o banco na leitura; numa falta, turnos ainda
+    na fila do write-behind são gravados antes de recarregar a sessão do banco.
+    Um turno que não chega ao banco tira a sessão do cache, para os dois não divergirem.
+    """
+
+    def __init__(self, cache: CacheEstados = None, persistencia: PersistenciaTurnos = None, turnos: int = SESSAO_HISTORICO_TURNOS):
+        self.cache = cache
+        self.persistencia = persistencia
+        self.turnos = turnos
+        if persistencia is not None:
+            persistencia.ao_falhar = self.descartar
+
+    async def carregar(self, prisma, sessao_token: str) -> dict:
+        if self.cache is not None:
+            with medir("sessao"):
+                estado = await self.cache.obter(sessao_token)
+            if estado is not None:
+                return contexto_do_estado(sessao_token, estado)
+
+        if self.persistencia is not None and self.persistencia.pendente(sessao_token):
+            await self.persistencia.descarregar()
+        estado = await buscar_estado_sessao(prisma, sessao_token, self.turnos)
+        if self.cache is not None:
+            await self.cache.salvar(sessao_token, estado)
+        return contexto_do_estado(sessao_token, estado)
+
+    async def registrar_turno(self, sessao_token: str, pedido: str, resposta: str, slots: list):
+        """
+        Acrescenta o turno ao estado em cache (se a sessão não estiver lá, a próxima leitura vai ao banco).
+        `slots` é a saída de `preparar_slots`, a mesma que vai para o banco.
+        """
+        if self.cache is None:
+            return
+        estado = await self.cache.obter(sessao_token)
+        if estado is None:
+            return
+        estado["turnos"] = (estado["turnos"] + [[pedido, resposta]])[-self.turnos:]
+        estado["slots"].update({slot["nome"]: slot["valor"] for slot in slots})
+        await self.cache.salvar(sessao_token, estado)
+
+    async def descartar(self, sessao_token: str):
+        """Tira a sessão do cache: a próxima leitura recarrega o que de fato está no banco."""
+        if self.cache is not None:
+            await self.cache.remover(sessao_token)
+
+    async def gravar_turno(self, prisma, sessao_token: str, dados: dict):
+        """`gravar_turno` fora do write-behind; se falhar, a sessão sai do cache."""
+        try:
+            return await gravar_turno(prisma, dados)
+        except Exception:
+            await self.descartar(sessao_token)
+            raise
+
+
+class CarregadorSessao:
+    """
+    Memo do contexto de sessão de uma requisição: cada token é carregado uma vez
+    e a mesma tarefa é entregue a todos que pedirem (rota, buscas especulativas...).
+    """
+
+    def __init__(self, prisma, estados: EstadoSessoes = None):
+        self.prisma = prisma
+        self.estados = estados or estado_sessoes
+        self._tarefas = {}
+
+    def carregar(self, sessao_token: str) -> asyncio.Future:
+        tarefa = self._tarefas.get(sessao_token)
+        if tarefa is None:
+            tarefa = self._tarefas[sessao_token] = asyncio.ensure_future(
+                self.estados.carregar(self.prisma, sessao_token)
+            )
+        return tarefa
+
+
+async def get_carregador_sessao() -> CarregadorSessao:
+    """Dependência do FastAPI: um carregador por requisição (o FastAPI reaproveita dentro dela)."""
+    return CarregadorSessao(await get_prisma())
+
+
+persistencia_turnos = PersistenciaTurnos() if SESSAO_WRITE_BEHIND else None
+estado_sessoes = EstadoSessoes(criar_cache_estados(), persistencia_turnos)
@@ -0,0 +1,208 @@
+import os
+import time
+import queue
+import threading
+
+# 🔹 Fila de telemetria: o request só enfileira, uma thread grava em lotes
+TELEMETRIA_FILA_MAX = int(os.getenv("TELEMETRIA_FILA_MAX", "10000"))
+TELEMETRIA_LOTE_MAX = int(os.getenv("TELEMETRIA_LOTE_MAX", "50"))
+TELEMETRIA_INTERVALO_S = float(os.getenv("TELEMETRIA_INTERVALO_S", "1.0"))
+MLFLOW_EXPERIMENTO = os.getenv("MLFLOW_EXPERIMENTO", "chat")
+# Destinos: "log" (NDJSON comprimido em INTERACOES_DIR) e/ou "mlflow" (uma run por turno)
+TELEMETRIA_DESTINOS = tuple(
+    d.strip() for d in os.getenv("TELEMETRIA_DESTINOS", "log").split(",") if d.strip()
+)
+
+
+class EscritorTelemetria:
+    """
+    Fila limitada drenada por uma thread: `registrar` nunca bloqueia o event loop
+    (fila cheia descarta o evento e conta), e a thread entrega a `escrever_lote`
+    até `max_lote` eventos por vez, no máximo a cada `intervalo` segundos.
+    """
+
+    def __init__(
+        self,
+        escrever_lote,
+        max_fila: int = TELEMETRIA_FILA_MAX,
+        max_lote: int = TELEMETRIA_LOTE_MAX,
+        intervalo: float = TELEMETRIA_INTERVALO_S,
+    ):
+        self.escrever_lote = escrever_lote
+        self.max_lote = max(1, max_lote)
+        self.intervalo = intervalo
+        self._fila = queue.Queue(maxsize=max(1, max_fila))
+        self._parar = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.enfileirados = 0
+        self.descartados = 0
+        self.escritos = 0
+        self.falhas = 0
+        self.lotes = 0
+
+    def iniciar(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._parar.clear()
+                self._thread = threading.Thread(target=self._drenar, name="telemetria", daemon=True)
+                self._thread.start()
+
+    def registrar(self, evento: dict) -> bool:
+        self.iniciar()
+        try:
+            self._fila.put_nowait(evento)
+        except queue.Full:
+            self.descartados += 1
+            return False
+        self.enfileirados += 1
+        return True
+
+    def _proximo_lote(self, esperar: bool = True):
+        lote = []
+        if esperar:
+            try:
+                lote.append(self._fila.get(timeout=self.intervalo))
+            except queue.Empty:
+                return lote
+        while len(lote) < self.max_lote:
+            try:
+                lote.append(self._fila.get_nowait())
+            except queue.Empty:
+                break
+        return lote
+
+    def _gravar(self, lote):
+        try:
+            self.escrever_lote(lote)
+            self.escritos += len(lote)
+        except Exception as e:
+            self.falhas += len(lote)
+            print(f"[WARN] Falha ao gravar {len(lote)} eventos de telemetria: {e}")
+        finally:
+            self.lotes += 1
+
+    def _drenar(self):
+        while not self._parar.is_set():
+            lote = self._proximo_lote()
+            if lote:
+                self._gravar(lote)
+        # Encerramento: grava o que ficou na fila
+        while lote := self._proximo_lote(esperar=False):
+            self._gravar(lote)
+
+    def encerrar(self, timeout: float = 10.0):
+        """Para a thread depois de gravar os eventos pendentes (chamado no desligamento)."""
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                print(f"[WARN] Telemetria encerrada com {self._fila.qsize()} eventos pendentes")
+
+    def estatisticas(self) -> dict:
+        return {
+            "fila": self._fila.qsize(),
+            "enfileirados": self.enfileirados,
+            "escritos": self.escritos,
+            "descartados": self.descartados,
+            "falhas": self.falhas,
+            "lotes": self.lotes,
+        }
+
+
+def _documentos(documentos_utilizados):
+    return [
+        {"conteudo": doc.page_content, "origem": doc.metadata.get("source", "desconhecido")}
+        for doc in documentos_utilizados
+    ]
+
+
+def evento_interacao(sessao_id, etapa, intencao, pergunta, resposta, slots_dict, documentos_utilizados, tempo_total, contexto="rag") -> dict:
+    return {
+        "tipo": "interacao",
+        "timestamp": time.time(),
+        "sessao_id": sessao_id,
+        "etapa": etapa,
+        "intencao": intencao,
+        "pergunta": pergunta,
+        "resposta": resposta,
+        "slots": dict(slots_dict),
+        "documentos": _documentos(documentos_utilizados),
+        "contexto": contexto,
+        "tempo_execucao": tempo_total,
+    }
+
+
+def evento_erro(sessao_id, erro) -> dict:
+    return {"tipo": "erro", "timestamp": time.time(), "sessao_id": sessao_id, "erro": str(erro)}
+
+
+def escrever_lote_mlflow(lote, experimento: str = MLFLOW_EXPERIMENTO):
+    """Uma run por evento, com params/tags/métricas num único `log_batch` cada."""
+    from mlflow.tracking import MlflowClient
+    from mlflow.entities import Metric, Param, RunTag
+
+    cliente = MlflowClient()
+    existente = cliente.get_experiment_by_name(experimento)
+    experimento_id = existente.experiment_id if existente else cliente.create_experiment(experimento)
+
+    for evento in lote:
+        instante = int(evento["timestamp"] * 1000)
+
+        if evento["tipo"] == "erro":
+            run = cliente.create_run(experimento_id, start_time=instante, tags={
+                "sessao_id": str(evento["sessao_id"]), "erro": evento["erro"], "sucesso": "False",
+            })
+            cliente.set_terminated(run.info.run_id, status="FINISHED")
+            continue
+
+        run = cliente.create_run(experimento_id, start_time=instante)
+        run_id = run.info.run_id
+        cliente.log_batch(
+            run_id,
+            metrics=[Metric("tempo_execucao", evento["tempo_execucao"], instante, 0)],
+            params=[
+                Param("intencao", str(evento["intencao"])),
+                Param("pergunta", evento["pergunta"]),
+                Param("resposta", evento["resposta"][:300]),
+            ],
+            tags=[
+                RunTag("sessao_id", str(evento["sessao_id"])),
+                RunTag("etapa", str(evento["etapa"])),
+                RunTag("sucesso", "True"),
+            ],
+        )
+
+        docs_usados = [doc["conteudo"] for doc in evento["documentos"]]
+        origens_utilizadas = list({doc["origem"] for doc in evento["documentos"]})
+        cliente.log_dict(run_id, {"documentos": docs_usados}, "rag_contexto.json")
+        cliente.log_dict(run_id, {
+            "pergunta": evento["pergunta"],
+            "resposta": evento["resposta"],
+            "documentos": docs_usados,
+            "origens": origens_utilizadas,
+            "slots": evento["slots"],
+            "intencao": evento["intencao"],
+        }, "interacao.json")
+        cliente.log_dict(run_id, {
+            "origens_utilizadas": origens_utilizadas,
+            "contexto": evento["contexto"],
+        }, "input_metadata.json")
+        cliente.set_terminated(run_id, status="FINISHED")
+
+
+def escrever_lote_log(lote):
+    from app.services.registro_interacoes import log_interacoes
+
+    log_interacoes.escrever_lote(lote)
+
+
+ESCRITORES = {"log": escrever_lote_log, "mlflow": escrever_lote_mlflow}
+
+
+def escrever_lote_destinos(lote, destinos=TELEMETRIA_DESTINOS):
+    for destino in destinos:
+        ESCRITORES[destino](lote)
+
+
+telemetria = EscritorTelemetria(escrever_lote_destinos)
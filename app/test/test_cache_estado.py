@@ -0,0 +1,68 @@
+import pytest
+from app.services.cache_estado import CacheEstados, CacheEstadosMemoria, CacheEstadosRedis
+
+
+class RedisFalso:
+    """Subconjunto assíncrono do cliente redis usado pelo cache (get / set com ex / delete)."""
+
+    def __init__(self):
+        self.valores = {}
+        self.expiracoes = {}
+
+    async def get(self, chave):
+        return self.valores.get(chave)
+
+    async def set(self, chave, valor, ex=None):
+        self.valores[chave] = valor
+        self.expiracoes[chave] = ex
+
+    async def delete(self, chave):
+        self.valores.pop(chave, None)
+
+
+@pytest.mark.asyncio
+async def test_cache_em_memoria_com_lru_e_ttl():
+    agora = [0.0]
+    cache = CacheEstadosMemoria(max_entradas=2, ttl=10, relogio=lambda: agora[0])
+
+    await cache.salvar("a", {"turnos": []})
+    await cache.salvar("b", {"turnos": []})
+    await cache.obter("a")
+    await cache.salvar("c", {"turnos": []})
+
+    # ✅ "b" foi o menos usado e saiu; o valor devolvido é uma cópia
+    assert await cache.obter("b") is None
+    estado = await cache.obter("a")
+    estado["turnos"].append(["x", "y"])
+    assert await cache.obter("a") == {"turnos": []}
+
+    # ✅ Expira depois do TTL
+    agora[0] = 11
+    assert await cache.obter("a") is None
+
+
+@pytest.mark.asyncio
+async def test_cache_redis_serializa_com_prefixo_e_expiracao():
+    redis = RedisFalso()
+    cache = CacheEstadosRedis(redis, ttl=1800, prefixo="sessao:")
+
+    await cache.salvar("token", {"sessao_id": 1, "turnos": [["oi", "olá"]], "slots": {}})
+
+    assert redis.expiracoes["sessao:token"] == 1800
+    assert await cache.obter("token") == {"sessao_id": 1, "turnos": [["oi", "olá"]], "slots": {}}
+    await cache.remover("token")
+    assert await cache.obter("token") is None
+    assert cache.estatisticas()["acertos"] == 1
+
+
+def test_cache_sem_remover_nao_instancia():
+    class CacheIncompleto(CacheEstados):
+        async def obter(self, chave):
+            return None
+
+        async def salvar(self, chave, valor):
+            pass
+
+    # ✅ Backend incompleto falha ao ser criado, não na primeira sessão que expira
+    with pytest.raises(TypeError):
+        CacheIncompleto()
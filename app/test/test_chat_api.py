@@ -1,3 +1,4 @@
+import json
 import pytest
 from httpx import AsyncClient, ASGITransport
 from app.main import app
@@ -40,3 +41,39 @@ async def test_chat_quero_orcamento_piso_vinilico():
 
     # ✅ Valida etapa do fluxo
     assert data["etapa"] == "FINALIZADO", f"Etapa incorreta: {data['etapa']}"
+
+
+@pytest.mark.asyncio
+async def test_chat_stream_emite_meta_antes_da_resposta():
+    """
+    Deve emitir intenção e slots no primeiro evento SSE
+    e fechar o stream com a resposta final.
+    """
+    pergunta = "Quero orçamento de piso vinílico para Canoas"
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post(
+            "/chat/stream",
+            headers={"Authorization": VALID_TOKEN},
+            json={"pergunta": pergunta}
+        )
+
+    assert response.status_code == 200, f"Status inesperado: {response.status_code}"
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    eventos = []
+    for bloco in response.text.strip().split("\n\n"):
+        linhas = dict(linha.split(": ", 1) for linha in bloco.splitlines())
+        eventos.append((linhas["event"], json.loads(linhas["data"])))
+
+    # ✅ Primeiro evento traz intenção e slots
+    nome, meta = eventos[0]
+    assert nome == "meta"
+    assert meta["intencao"] == "PEDIDO_ORCAMENTO", f"Intenção Errada: {meta['intencao']}"
+    assert meta["slots"]["localidade"] == "Canoas"
+
+    # ✅ Último evento traz resposta e etapa
+    nome, fim = eventos[-1]
+    assert nome == "fim"
+    assert fim["etapa"] == "FINALIZADO", f"Etapa incorreta: {fim['etapa']}"
@@ -0,0 +1,124 @@
+import httpx
+import pytest
+from types import SimpleNamespace
+from app.services import database
+from app.services.database import get_prisma, connect_prisma, conexao_perdida, disconnect_prisma
+
+
+@pytest.mark.asyncio
+async def test_cliente_prisma_compartilhado():
+    """
+    Deve entregar sempre o mesmo cliente conectado,
+    sem abrir um novo query engine a cada chamada.
+    """
+    primeiro = await get_prisma()
+    segundo = await get_prisma()
+
+    # ✅ Mesmo cliente e mesmo engine
+    assert primeiro is segundo, "Cliente Prisma foi recriado"
+    assert primeiro.is_connected(), "Cliente Prisma não conectado"
+    engine = primeiro._internal_engine
+    await get_prisma()
+    assert primeiro._internal_engine is engine, "Query engine foi reaberto"
+
+    await disconnect_prisma()
+
+
+@pytest.mark.asyncio
+async def test_reconecta_se_engine_morrer():
+    """
+    Deve reconectar quando o processo do query engine morre e uma operação falha por isso.
+    """
+    prisma = await connect_prisma()
+    processo = prisma._internal_engine.process
+    processo.kill()
+    processo.wait()
+
+    # ✅ O erro de uso marca a conexão como perdida; o próximo get_prisma sobe outro engine
+    with pytest.raises(Exception) as erro:
+        await prisma.usuario.count()
+    assert conexao_perdida(erro.value)
+    prisma = await get_prisma()
+    assert prisma._internal_engine.process is not processo, "Engine não foi reiniciado"
+    await prisma.usuario.count()
+
+    await disconnect_prisma()
+
+
+class PrismaFalso:
+    def __init__(self):
+        self.conexoes = 0
+        self.conectado = False
+        self._internal_engine = None
+
+    def is_connected(self):
+        return self.conectado
+
+    async def connect(self):
+        self.conexoes += 1
+        self.conectado = True
+        self._internal_engine = SimpleNamespace(url=f"http://localhost:{41000 + self.conexoes}")
+
+    async def disconnect(self):
+        self.conectado = False
+
+
+def _erro_de_transporte(url: str, tipo=httpx.ConnectError):
+    return tipo("falha de transporte", request=httpx.Request("POST", url))
+
+
+@pytest.mark.asyncio
+async def test_erro_de_conexao_no_uso_dispara_reconexao(monkeypatch):
+    """
+    Só falhas de transporte para o query engine (ou erros de conexão do próprio Prisma)
+    fazem o próximo get_prisma reconectar.
+    """
+    falso = PrismaFalso()
+    monkeypatch.setattr(database, "prisma", falso)
+    monkeypatch.setattr(database, "_loop", None)
+    monkeypatch.setattr(database, "_reconectar", False)
+    monkeypatch.setattr(database, "_url_engine", None)
+
+    assert await get_prisma() is falso
+    await get_prisma()
+    assert falso.conexoes == 1
+
+    # ✅ Erro comum não reconecta; o engine fora do ar (mesmo embrulhado) reconecta
+    assert not conexao_perdida(ValueError("slot inválido"))
+    try:
+        try:
+            raise _erro_de_transporte("http://localhost:41001/")
+        except httpx.ConnectError as e:
+            raise RuntimeError("Erro no processamento") from e
+    except RuntimeError as e:
+        assert conexao_perdida(e)
+    await get_prisma()
+    assert falso.conexoes == 2
+    await get_prisma()
+    assert falso.conexoes == 2
+
+
+@pytest.mark.asyncio
+async def test_timeout_do_llm_ou_do_qdrant_nao_reconecta(monkeypatch):
+    """
+    LLM e Qdrant também usam httpx: um timeout deles não pode derrubar o engine compartilhado.
+    """
+    falso = PrismaFalso()
+    monkeypatch.setattr(database, "prisma", falso)
+    monkeypatch.setattr(database, "_loop", None)
+    monkeypatch.setattr(database, "_reconectar", False)
+    monkeypatch.setattr(database, "_url_engine", None)
+    await get_prisma()
+
+    for url in ("https://api.mistral.ai/v1/chat/completions", "http://localhost:6333/collections/x/points/search"):
+        try:
+            try:
+                raise _erro_de_transporte(url, httpx.ReadTimeout)
+            except httpx.ReadTimeout as e:
+                raise TimeoutError("Request timed out.") from e
+        except TimeoutError as e:
+            assert not conexao_perdida(e)
+
+    # ✅ Nenhuma reconexão: o engine (e as consultas em andamento nele) seguem intactos
+    await get_prisma()
+    assert falso.conexoes == 1
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from app.services import embedding_backends
+from app.services.embedding_backends import BackendEmbeddings, criar_backend
+
+
+class BackendFake(BackendEmbeddings):
+    nome = "fake"
+
+    def __init__(self, diretorio=None):
+        self.diretorio = diretorio
+        self.chamadas = []
+
+    def embed_documents(self, texts):
+        self.chamadas.append(list(texts))
+        return [[float(len(t)), 1.0] for t in texts]
+
+
+def test_criar_backend_rejeita_nome_desconhecido():
+    with pytest.raises(ValueError):
+        criar_backend("tpu")
+
+
+def test_criar_backend_usa_registro_e_diretorio(monkeypatch):
+    monkeypatch.setitem(embedding_backends.BACKENDS, "fake", BackendFake)
+
+    backend = criar_backend(" FAKE ", diretorio="/modelos/bge")
+
+    assert isinstance(backend, BackendFake)
+    assert backend.diretorio == "/modelos/bge"
+
+
+def test_embed_query_reaproveita_embed_documents():
+    backend = BackendFake()
+
+    assert backend.embed_query("abc") == [3.0, 1.0]
+    assert backend.chamadas == [["abc"]]
+
+
+def test_backend_sem_embed_documents_nao_instancia():
+    class BackendIncompleto(BackendEmbeddings):
+        nome = "incompleto"
+
+    # ✅ O erro aparece ao criar o backend, não na primeira busca
+    with pytest.raises(TypeError):
+        BackendIncompleto()
+
+
+def test_sobreposicao_top_k():
+    from benchmarks.bench_embeddings import sobreposicao
+
+    referencia = np.array([[0, 1, 2], [3, 4, 5]])
+    candidato = np.array([[2, 1, 0], [3, 9, 8]])
+
+    assert sobreposicao(referencia, referencia) == 1.0
+    assert sobreposicao(candidato, referencia) == pytest.approx((1 + 1 / 3) / 2)
@@ -0,0 +1,59 @@
+import asyncio
+import pytest
+from app.services.embedding_batcher import MicroBatcherEmbeddings
+
+
+def _executor_fake(lotes):
+    async def executar_lote(textos):
+        lotes.append(list(textos))
+        return [[float(len(t))] for t in textos]
+    return executar_lote
+
+
+@pytest.mark.asyncio
+async def test_consultas_concorrentes_viram_um_lote():
+    """
+    Consultas concorrentes dentro da janela devem ser calculadas num único lote.
+    """
+    lotes = []
+    batcher = MicroBatcherEmbeddings(_executor_fake(lotes), max_batch=32, max_espera_ms=20)
+
+    textos = ["oi", "bom dia", "piso vinílico", "oi"]
+    vetores = await asyncio.gather(*(batcher.embed_query(t) for t in textos))
+
+    # ✅ Um lote só, sem repetir textos, e cada chamador recebe o seu vetor
+    assert lotes == [["oi", "bom dia", "piso vinílico"]]
+    assert vetores == [[2.0], [7.0], [13.0], [2.0]]
+    assert batcher.estatisticas()["maior_lote"] == 4
+
+
+@pytest.mark.asyncio
+async def test_lote_cheio_dispara_sem_esperar():
+    """
+    Ao atingir `max_batch`, o lote deve sair imediatamente e o restante forma outro lote.
+    """
+    lotes = []
+    batcher = MicroBatcherEmbeddings(_executor_fake(lotes), max_batch=2, max_espera_ms=10_000)
+
+    vetores = await asyncio.wait_for(
+        asyncio.gather(*(batcher.embed_query(t) for t in ["a", "bb", "ccc", "dddd"])), timeout=1
+    )
+
+    # ✅ Dois lotes de dois, sem esperar a janela de 10 s
+    assert lotes == [["a", "bb"], ["ccc", "dddd"]]
+    assert vetores == [[1.0], [2.0], [3.0], [4.0]]
+
+
+@pytest.mark.asyncio
+async def test_erro_no_lote_chega_a_todos_os_chamadores():
+    """
+    Uma falha no embed_documents deve ser repassada a todas as consultas do lote.
+    """
+    async def falhar(textos):
+        raise RuntimeError("modelo indisponível")
+
+    batcher = MicroBatcherEmbeddings(falhar, max_espera_ms=1)
+    resultados = await asyncio.gather(batcher.embed_query("a"), batcher.embed_query("b"), return_exceptions=True)
+
+    # ✅ Ambos recebem a exceção
+    assert all(isinstance(r, RuntimeError) for r in resultados)
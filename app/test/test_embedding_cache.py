@@ -0,0 +1,60 @@
+import pytest
+from app.services.embedding_batcher import EmbeddingsComMicroBatch
+from app.services.embedding_cache import CacheVetores, normalizar_texto
+
+
+class ModeloFake:
+    def __init__(self):
+        self.chamadas = []
+
+    def embed_documents(self, texts):
+        self.chamadas.extend(texts)
+        return [[float(len(t)), 1.0, 0.0, 0.0] for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def test_normalizacao_unifica_caixa_e_espacos():
+    assert normalizar_texto("  Bom   DIA ") == normalizar_texto("bom dia")
+
+
+def test_lru_respeita_orcamento_de_memoria():
+    """
+    Com espaço para duas linhas de 4 floats, a terceira chave deve expulsar a menos usada.
+    """
+    cache = CacheVetores(max_bytes=2 * 4 * 4)
+    cache.salvar("a", [1, 0, 0, 0])
+    cache.salvar("b", [0, 1, 0, 0])
+    assert cache.buscar("a") == [1.0, 0.0, 0.0, 0.0]
+
+    cache.salvar("c", [0, 0, 1, 0])
+
+    # ✅ "b" foi removida; "a" (usada há pouco) e "c" continuam
+    assert cache.buscar("b") is None
+    assert cache.buscar("a") == [1.0, 0.0, 0.0, 0.0]
+    assert cache.buscar("c") == [0.0, 0.0, 1.0, 0.0]
+
+    stats = cache.estatisticas()
+    assert stats["entradas"] == 2
+    assert stats["remocoes"] == 1
+    assert stats["bytes_usados"] == 32
+    assert stats["bytes_alocados"] <= stats["bytes_max"]
+    assert stats["taxa_acerto"] == pytest.approx(3 / 4)
+
+
+@pytest.mark.asyncio
+async def test_pergunta_repetida_nao_chega_ao_modelo():
+    """
+    A mesma pergunta (com variações de caixa e espaço) só deve ser embedada uma vez.
+    """
+    modelo = ModeloFake()
+    embeddings = EmbeddingsComMicroBatch(modelo, cache=CacheVetores())
+
+    primeiro = await embeddings.aembed_query("Vocês têm piso vinílico?")
+    segundo = await embeddings.aembed_query("vocês têm  piso vinílico?")
+    terceiro = embeddings.embed_query("VOCÊS TÊM PISO VINÍLICO?")
+
+    # ✅ Um único forward pass, mesmo vetor para todos
+    assert modelo.chamadas == ["Vocês têm piso vinílico?"]
+    assert primeiro == segundo == terceiro
@@ -0,0 +1,58 @@
+import asyncio
+import threading
+import pytest
+from app.services.embedding_pool import PoolEmbeddings
+
+
+class ModeloLento:
+    def __init__(self):
+        self.liberar = threading.Event()
+        self.threads = set()
+
+    def embed_documents(self, textos):
+        self.threads.add(threading.current_thread().name)
+        self.liberar.wait(timeout=2)
+        return [[float(len(t))] for t in textos]
+
+
+@pytest.mark.asyncio
+async def test_inferencia_nao_trava_event_loop():
+    """
+    A inferência deve rodar nas threads do pool, deixando o event loop livre.
+    """
+    modelo = ModeloLento()
+    pool = PoolEmbeddings(modelo, workers=1)
+
+    tarefa = asyncio.create_task(pool.embed_documents(["piso", "forro"]))
+    await asyncio.sleep(0.05)
+
+    # ✅ Event loop continua respondendo enquanto o modelo trabalha
+    assert not tarefa.done()
+    assert pool.estatisticas()["em_execucao"] == 1
+
+    modelo.liberar.set()
+    assert await tarefa == [[4.0], [5.0]]
+    assert all(nome.startswith("embeddings") for nome in modelo.threads)
+    pool.encerrar()
+
+
+@pytest.mark.asyncio
+async def test_fila_limitada_pelos_workers():
+    """
+    Com um worker, chamadas extras devem aparecer como fila nas métricas.
+    """
+    modelo = ModeloLento()
+    pool = PoolEmbeddings(modelo, workers=1)
+
+    tarefas = [asyncio.create_task(pool.embed_query(t)) for t in ["a", "bb", "ccc"]]
+    await asyncio.sleep(0.05)
+
+    # ✅ Um em execução, dois na fila
+    estatisticas = pool.estatisticas()
+    assert estatisticas["em_execucao"] == 1
+    assert estatisticas["em_fila"] == 2
+
+    modelo.liberar.set()
+    assert await asyncio.gather(*tarefas) == [[1.0], [2.0], [3.0]]
+    assert pool.estatisticas()["concluidas"] == 3
+    pool.encerrar()
@@ -0,0 +1,260 @@
+import asyncio
+import pytest
+from types import SimpleNamespace
+from app.services import especulacao
+from app.services.especulacao import (
+    BuscaEspeculativa, EstatisticasEspeculacao, EstatisticasGeracao, GeracaoEspeculativa,
+    buscar_todas_categorias, recuperar_documentos,
+)
+
+
+class QdrantFalso:
+    def __init__(self):
+        self.chamadas = []
+
+    async def search_batch(self, collection_name, requests):
+        self.chamadas.append(requests)
+        return [
+            [SimpleNamespace(payload={"page_content": f"doc {i}", "metadata": {"ordem": i}})]
+            for i, _ in enumerate(requests)
+        ]
+
+
+class RetrieverFalso:
+    def __init__(self, documentos):
+        self.documentos = documentos
+        self.consultas = []
+
+    async def ainvoke(self, consulta):
+        self.consultas.append(consulta)
+        return self.documentos
+
+
+async def _sessao():
+    return {"chat_history": []}
+
+
+@pytest.mark.asyncio
+async def test_busca_todas_as_categorias_num_unico_search_batch(monkeypatch):
+    from app.services import embeddings
+
+    async def embed_falso(texto):
+        return [0.1, 0.2, 0.3]
+
+    monkeypatch.setattr(embeddings.embeddings_consulta, "aembed_query", embed_falso)
+    qdrant = QdrantFalso()
+
+    resultado = await buscar_todas_categorias(
+        {"qdrant_async_client": qdrant}, "piso vinílico", categorias=(None, "produtos_servicos", "institucional")
+    )
+
+    # ✅ Um único round trip com uma busca por categoria, filtrando só as categorias nomeadas
+    assert len(qdrant.chamadas) == 1
+    buscas = qdrant.chamadas[0]
+    assert [b.filter is None for b in buscas] == [True, False, False]
+    assert buscas[1].filter.must[0].key == "metadata.categoria"
+    assert resultado["institucional"][0].page_content == "doc 2"
+    assert resultado["produtos_servicos"][0].metadata == {"ordem": 1}
+
+
+@pytest.mark.asyncio
+async def test_busca_especulativa_usada_e_cancelada(monkeypatch):
+    liberar = asyncio.Event()
+
+    async def preparar_falso(pergunta, chat_history, condense_chain=None):
+        return pergunta
+
+    async def buscar_falso(pipeline, consulta):
+        await liberar.wait()
+        return {"produtos_servicos": ["doc produto"], "institucional": ["doc institucional"]}
+
+    monkeypatch.setattr(especulacao, "preparar_consulta", preparar_falso)
+    monkeypatch.setattr(especulacao, "buscar_todas_categorias", buscar_falso)
+    estatisticas = EstatisticasEspeculacao()
+    retriever = RetrieverFalso(["doc retriever"])
+    pipeline = {"condense_chain": None, "retrievers": {"institucional": retriever}}
+
+    # ✅ Intenção resolvida: usa o resultado da categoria escolhida, sem passar pelo retriever
+    busca = BuscaEspeculativa(pipeline, "quem são vocês?", asyncio.ensure_future(_sessao()), estatisticas)
+    liberar.set()
+    documentos = await recuperar_documentos(pipeline, "quem são vocês?", [], "institucional", busca)
+    busca.cancelar()
+    assert documentos == ["doc institucional"]
+    assert retriever.consultas == []
+
+    # ✅ Resposta fixa: a busca em andamento é descartada
+    liberar.clear()
+    busca = BuscaEspeculativa(pipeline, "oi", asyncio.ensure_future(_sessao()), estatisticas)
+    await asyncio.sleep(0)
+    busca.cancelar()
+    await asyncio.sleep(0)
+    assert busca.tarefa.cancelled()
+
+    assert estatisticas.estatisticas()["iniciadas"] == 2
+    assert estatisticas.estatisticas()["usadas"] == 1
+    assert estatisticas.estatisticas()["canceladas"] == 1
+
+
+@pytest.mark.asyncio
+async def test_falha_na_busca_especulativa_cai_no_retriever(monkeypatch):
+    async def preparar_falso(pergunta, chat_history, condense_chain=None):
+        return pergunta
+
+    async def buscar_falho(pipeline, consulta):
+        raise RuntimeError("qdrant fora do ar")
+
+    monkeypatch.setattr(especulacao, "preparar_consulta", preparar_falso)
+    monkeypatch.setattr(especulacao, "buscar_todas_categorias", buscar_falho)
+    estatisticas = EstatisticasEspeculacao()
+    retriever = RetrieverFalso(["doc retriever"])
+    pipeline = {"condense_chain": None, "retrievers": {"produtos_servicos": retriever}}
+
+    busca = BuscaEspeculativa(pipeline, "tem piso?", asyncio.ensure_future(_sessao()), estatisticas)
+    documentos = await recuperar_documentos(pipeline, "tem piso?", [], "produtos_servicos", busca)
+
+    assert documentos == ["doc retriever"]
+    assert retriever.consultas == ["tem piso?"]
+    assert estatisticas.falhas == 1
+
+
+class PromptFalso:
+    def __init__(self, llm):
+        self.llm = llm
+
+    def __or__(self, llm):
+        return llm
+
+
+class LLMFalso:
+    """Gera o primeiro trecho na hora e os demais só depois de `liberar`."""
+
+    def __init__(self, trechos):
+        self.trechos = trechos
+        self.liberar = asyncio.Event()
+        self.gerados = 0
+
+    async def astream(self, entrada):
+        for i, texto in enumerate(self.trechos):
+            if i:
+                await self.liberar.wait()
+            self.gerados += 1
+            yield SimpleNamespace(content=texto)
+
+
+DOC_PRODUTO = SimpleNamespace(page_content="Piso vinílico em régua.", metadata={})
+
+
+def _pipeline_geracao(llm):
+    return {
+        "condense_chain": None,
+        "retrievers": {"produtos_servicos": RetrieverFalso([DOC_PRODUTO])},
+        "resposta_prompt": PromptFalso(llm),
+        "llm": llm,
+    }
+
+
+@pytest.mark.asyncio
+async def test_geracao_especulativa_aproveitada_na_mesma_categoria():
+    llm = LLMFalso(["Temos ", "piso ", "vinílico."])
+    estatisticas = EstatisticasGeracao()
+    geracao = GeracaoEspeculativa(
+        _pipeline_geracao(llm), "tem piso?", asyncio.ensure_future(_sessao()), estatisticas=estatisticas
+    )
+
+    # ✅ Intenção em outra categoria não usa a geração
+    assert await geracao.resultado("institucional") is None
+
+    llm.liberar.set()
+    documentos, resposta = await geracao.resultado("produtos_servicos")
+    geracao.cancelar()
+
+    assert documentos == [DOC_PRODUTO]
+    assert resposta == "Temos piso vinílico."
+    assert estatisticas.estatisticas()["usadas"] == 1
+    assert estatisticas.estatisticas()["tokens_usados"] == 3
+    assert estatisticas.estatisticas()["canceladas"] == 0
+
+
+@pytest.mark.asyncio
+async def test_geracao_especulativa_cancelada_conta_tokens_desperdicados():
+    llm = LLMFalso(["Temos ", "piso ", "vinílico."])
+    estatisticas = EstatisticasGeracao()
+    geracao = GeracaoEspeculativa(
+        _pipeline_geracao(llm), "quem são vocês?", asyncio.ensure_future(_sessao()), estatisticas=estatisticas
+    )
+    while geracao.tokens < 1:
+        await asyncio.sleep(0)
+
+    # ✅ Classificador escolheu outra categoria: o stream do LLM é interrompido
+    geracao.cancelar()
+    llm.liberar.set()
+    await asyncio.sleep(0)
+
+    assert geracao.tarefa.cancelled()
+    assert llm.gerados == 1
+    assert estatisticas.estatisticas()["canceladas"] == 1
+    assert estatisticas.estatisticas()["tokens_desperdicados"] == 1
+    assert estatisticas.estatisticas()["taxa_uso"] == 0.0
+
+
+@pytest.mark.asyncio
+async def test_geracao_especulativa_repassa_trechos_no_stream():
+    llm = LLMFalso(["Temos ", "piso."])
+    geracao = GeracaoEspeculativa(
+        _pipeline_geracao(llm), "tem piso?", asyncio.ensure_future(_sessao()), estatisticas=EstatisticasGeracao()
+    )
+
+    assert await geracao.documentos_prontos("produtos_servicos") == [DOC_PRODUTO]
+    llm.liberar.set()
+    assert [texto async for texto in geracao.trechos()] == ["Temos ", "piso."]
+
+
+@pytest.mark.asyncio
+async def test_stream_interrompido_cancela_a_geracao_especulativa():
+    llm = LLMFalso(["Temos ", "piso ", "vinílico."])
+    estatisticas = EstatisticasGeracao()
+    geracao = GeracaoEspeculativa(
+        _pipeline_geracao(llm), "tem piso?", asyncio.ensure_future(_sessao()), estatisticas=estatisticas
+    )
+    await geracao.documentos_prontos("produtos_servicos")
+
+    # ✅ Cliente desconecta depois do primeiro trecho: o stream do LLM não segue até o fim
+    trechos = geracao.trechos()
+    assert await trechos.__anext__() == "Temos "
+    await trechos.aclose()
+    geracao.cancelar()
+    llm.liberar.set()
+    await asyncio.sleep(0)
+
+    assert geracao.tarefa.cancelled()
+    assert llm.gerados == 1
+
+
+class LLMFalho:
+    """Falha só depois de `liberar`, com os documentos já entregues ao stream."""
+
+    def __init__(self):
+        self.liberar = asyncio.Event()
+
+    async def astream(self, entrada):
+        await self.liberar.wait()
+        raise RuntimeError("LLM fora do ar")
+        yield
+
+
+@pytest.mark.asyncio
+async def test_falha_antes_do_primeiro_trecho_gera_de_novo_no_stream():
+    estatisticas = EstatisticasGeracao()
+    llm = LLMFalho()
+    geracao = GeracaoEspeculativa(
+        _pipeline_geracao(llm), "tem piso?", asyncio.ensure_future(_sessao()), estatisticas=estatisticas
+    )
+    await geracao.documentos_prontos("produtos_servicos")
+    llm.liberar.set()
+
+    async def alternativa():
+        yield "Temos piso."
+
+    # ✅ Mesmo comportamento do /chat: a geração normal assume no lugar de um evento de erro
+    assert [texto async for texto in geracao.trechos(alternativa)] == ["Temos piso."]
+    assert estatisticas.estatisticas()["falhas"] == 1
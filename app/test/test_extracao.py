@@ -0,0 +1,121 @@
+import json
+import pytest
+from app.services import extracao
+from app.services.extracao import extrair_intencao_e_slots
+
+
+class ChainFake:
+    def __init__(self, resposta):
+        self.resposta = resposta
+        self.chamadas = 0
+
+    async def ainvoke(self, entrada):
+        self.chamadas += 1
+        return self.resposta
+
+
+def _pipeline(resposta_combinada):
+    return {
+        "extracao_chain": ChainFake(resposta_combinada),
+        "classificacao_chain": ChainFake(" PERGUNTA_PRODUTO\n"),
+        "slot_filling_chain": ChainFake({"produto": "forro", "volume_aproximado": None, "localidade": None, "prazo": None}),
+    }
+
+
+@pytest.mark.asyncio
+async def test_extracao_combinada_uma_chamada():
+    """
+    Deve extrair intenção e slots numa única chamada quando o JSON é válido.
+    """
+    pipeline = _pipeline(json.dumps({
+        "intencao": "PEDIDO_ORCAMENTO",
+        "produto": "piso vinílico",
+        "volume_aproximado": None,
+        "localidade": "Canoas",
+        "prazo": None,
+    }))
+
+    intencao, slots = await extrair_intencao_e_slots(pipeline, "Quero orçamento de piso vinílico para Canoas", modo="combinada")
+
+    # ✅ Resultado da chamada combinada
+    assert intencao == "PEDIDO_ORCAMENTO"
+    assert slots == {"produto": "piso vinílico", "volume_aproximado": None, "localidade": "Canoas", "prazo": None}
+
+    # ✅ Caminho de duas chamadas não foi usado
+    assert pipeline["classificacao_chain"].chamadas == 0
+    assert pipeline["slot_filling_chain"].chamadas == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("resposta", [
+    "não é json",
+    json.dumps({"intencao": "INEXISTENTE", "produto": None, "volume_aproximado": None, "localidade": None, "prazo": None}),
+    json.dumps({"intencao": "OUTRO", "produto": None, "volume_aproximado": None, "localidade": None, "prazo": None, "extra": 1}),
+])
+async def test_extracao_combinada_fallback(resposta):
+    """
+    Deve voltar ao classificador + slot filling quando a validação do schema falha.
+    """
+    pipeline = _pipeline(resposta)
+
+    intencao, slots = await extrair_intencao_e_slots(pipeline, "Vocês têm forro?", modo="combinada")
+
+    # ✅ Resultado vem do caminho de duas chamadas
+    assert intencao == "PERGUNTA_PRODUTO"
+    assert slots["produto"] == "forro"
+    assert pipeline["classificacao_chain"].chamadas == 1
+    assert pipeline["slot_filling_chain"].chamadas == 1
+
+
+@pytest.mark.asyncio
+async def test_fast_path_local_nao_chama_o_llm(monkeypatch):
+    """
+    Deve dispensar o LLM quando o classificador local resolve a intenção com confiança.
+    """
+    async def classificar_falso(pergunta):
+        return "SAUDACAO"
+
+    monkeypatch.setattr(extracao, "classificar_local", classificar_falso)
+    pipeline = _pipeline("")
+
+    intencao, slots = await extrair_intencao_e_slots(pipeline, "oi", modo="combinada")
+
+    # ✅ Intenção do classificador local; nenhuma chamada ao LLM foi feita (nem cancelada)
+    assert intencao == "SAUDACAO"
+    assert all(valor is None for valor in slots.values())
+    assert pipeline["extracao_chain"].chamadas == 0
+    assert pipeline["classificacao_chain"].chamadas == 0
+    assert pipeline["slot_filling_chain"].chamadas == 0
+
+
+@pytest.mark.asyncio
+async def test_falha_no_classificador_local_segue_com_o_llm(monkeypatch):
+    """
+    Deve ignorar um erro do classificador local (ex.: embeddings fora do ar) e usar o LLM.
+    """
+    async def classificar_falho(pergunta):
+        raise RuntimeError("embeddings fora do ar")
+
+    monkeypatch.setattr(extracao, "classificar_local", classificar_falho)
+    pipeline = _pipeline(json.dumps({
+        "intencao": "PERGUNTA_PRODUTO", "produto": "forro", "volume_aproximado": None, "localidade": None, "prazo": None,
+    }))
+
+    intencao, slots = await extrair_intencao_e_slots(pipeline, "Vocês têm forro?", modo="combinada")
+
+    assert intencao == "PERGUNTA_PRODUTO"
+    assert slots["produto"] == "forro"
+
+
+@pytest.mark.asyncio
+async def test_intencao_fora_da_lista_vira_outro():
+    """
+    Deve trocar por OUTRO a resposta livre do classificador que não é uma intenção conhecida.
+    """
+    pipeline = _pipeline("não é json")
+    pipeline["classificacao_chain"] = ChainFake("A intenção do cliente é PERGUNTA_PRODUTO.")
+
+    intencao, slots = await extrair_intencao_e_slots(pipeline, "Vocês têm forro?", modo="separada")
+
+    assert intencao == "OUTRO"
+    assert slots["produto"] == "forro"
@@ -0,0 +1,15 @@
+from benchmarks.bench_importtime import IMPORT_ORCAMENTO_MS, medir_import
+
+
+def test_import_de_app_main_dentro_do_orcamento():
+    """
+    Importar app.main não pode carregar LangChain, Qdrant, MLflow, o modelo de embeddings
+    nem o client gerado do Prisma, e precisa caber no orçamento de tempo.
+    """
+    resultado = medir_import("app.main")
+
+    # ✅ Nada pesado na subida; tudo isso fica para o primeiro uso ou o aquecimento
+    assert resultado["pesados"] == [], f"Módulos pesados na subida: {resultado['pesados']}"
+    assert resultado["total_ms"] <= IMPORT_ORCAMENTO_MS, (
+        f"Import de app.main levou {resultado['total_ms']:.0f} ms (orçamento {IMPORT_ORCAMENTO_MS:.0f} ms)"
+    )
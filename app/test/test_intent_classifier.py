@@ -0,0 +1,96 @@
+import zlib
+import numpy as np
+from datetime import datetime
+from app.services.intent_classifier import ClassificadorIntencaoLocal, carregar_exemplos_log
+from app.services.registro_interacoes import LogInteracoes
+
+
+class EmbeddingsFake:
+    """Bag-of-words com hash: frases com as mesmas palavras ficam próximas."""
+
+    def embed_query(self, texto):
+        vetor = np.zeros(64, dtype=np.float32)
+        for palavra in texto.lower().replace(",", " ").split():
+            vetor[zlib.crc32(palavra.encode()) % 64] += 1.0
+        return vetor.tolist()
+
+    def embed_documents(self, textos):
+        return [self.embed_query(t) for t in textos]
+
+
+EXEMPLOS = [
+    ("bom dia", "SAUDACAO"),
+    ("oi bom dia", "SAUDACAO"),
+    ("tchau obrigado", "DESPEDIDA"),
+    ("obrigado até mais", "DESPEDIDA"),
+    ("quero orçamento de piso", "PEDIDO_ORCAMENTO"),
+]
+
+
+def test_classificador_local_confiante():
+    """
+    Deve reconhecer frases próximas dos exemplos com confiança alta.
+    """
+    classificador = ClassificadorIntencaoLocal(EmbeddingsFake(), limiar=0.7, margem=0.05).treinar(EXEMPLOS)
+
+    intencao, confianca = classificador.prever("bom dia")
+
+    # ✅ Intenção reconhecida sem LLM
+    assert intencao == "SAUDACAO"
+    assert confianca >= 0.7
+
+
+def test_classificador_local_delega_ao_llm():
+    """
+    Deve devolver None quando a frase não se parece com nenhum exemplo.
+    """
+    classificador = ClassificadorIntencaoLocal(EmbeddingsFake(), limiar=0.7, margem=0.05).treinar(EXEMPLOS)
+
+    intencao, _ = classificador.prever("vocês atendem em manaus")
+
+    # ✅ Sem confiança, o LLM decide
+    assert intencao is None
+
+
+def test_classificador_local_ignora_rotulos_invalidos():
+    """
+    Deve descartar exemplos vazios ou com intenção fora da lista.
+    """
+    classificador = ClassificadorIntencaoLocal(EmbeddingsFake()).treinar(
+        EXEMPLOS + [("", "SAUDACAO"), ("qualquer coisa", "INEXISTENTE"), (None, "OUTRO")]
+    )
+
+    # ✅ Apenas os exemplos válidos foram usados
+    assert classificador.total_exemplos == len(EXEMPLOS)
+    assert "INEXISTENTE" not in classificador.intencoes
+
+
+class LogContado(LogInteracoes):
+    def __init__(self, diretorio):
+        super().__init__(diretorio)
+        self.lidos = []
+
+    def ler_segmento(self, caminho):
+        self.lidos.append(caminho.name)
+        return super().ler_segmento(caminho)
+
+
+def test_exemplos_do_log_so_dos_segmentos_mais_novos(tmp_path):
+    """
+    Deve ler os segmentos do mais novo para o mais antigo e parar ao juntar `limite` exemplos.
+    """
+    log = LogContado(tmp_path)
+    for dia in ("2026-01-10", "2026-01-11", "2026-01-12"):
+        timestamp = datetime.fromisoformat(f"{dia}T12:00:00").timestamp()
+        log.escrever_lote([
+            {"tipo": "interacao", "timestamp": timestamp, "sessao_id": 1, "pergunta": f"{dia} {i}", "intencao": "SAUDACAO"}
+            for i in range(2)
+        ])
+    log.fechar()
+
+    exemplos = carregar_exemplos_log(limite=3, log=log)
+
+    # ✅ Os 3 mais recentes, em ordem cronológica, sem abrir o segmento do dia 10
+    assert [pergunta for pergunta, _ in exemplos] == ["2026-01-11 1", "2026-01-12 0", "2026-01-12 1"]
+    assert len(log.lidos) == 2
+    assert all("2026-01-10" not in nome for nome in log.lidos)
@@ -0,0 +1,54 @@
+from langchain_core.outputs import Generation
+from app.services.llm_cache import ArmazemSQLite, CacheLLMEmCamadas
+
+
+def test_cache_llm_acerto_exato():
+    """
+    Deve devolver a mesma geração apenas para prompt e parâmetros idênticos.
+    """
+    cache = CacheLLMEmCamadas("classificacao", armazem=ArmazemSQLite(":memory:"))
+    llm_string = "mistral-large-latest|temperature=0.3"
+    cache.update("Frase: bom dia", llm_string, [Generation(text="SAUDACAO")])
+
+    # ✅ Mesmo prompt + mesmo modelo/temperatura
+    assert cache.lookup("Frase: bom dia", llm_string)[0].text == "SAUDACAO"
+
+    # ✅ Prompt ou parâmetros diferentes não acertam
+    assert cache.lookup("Frase: boa tarde", llm_string) is None
+    assert cache.lookup("Frase: bom dia", "mistral-large-latest|temperature=0.7") is None
+
+    estatisticas = cache.estatisticas()
+    assert estatisticas["acertos_memoria"] == 1
+    assert estatisticas["falhas"] == 2
+
+
+def test_cache_llm_sobrevive_a_reinicio(tmp_path):
+    """
+    Deve recuperar do SQLite o que foi gravado por outra instância (reinício do processo).
+    """
+    caminho = str(tmp_path / "llm_cache.sqlite")
+    llm_string = "mistral-large-latest|temperature=0.3"
+
+    CacheLLMEmCamadas("slots", armazem=ArmazemSQLite(caminho)).update(
+        "Frase: quero orçamento", llm_string, [Generation(text='{"produto": null}')]
+    )
+    novo = CacheLLMEmCamadas("slots", armazem=ArmazemSQLite(caminho))
+
+    # ✅ Acerto em disco, depois em memória
+    assert novo.lookup("Frase: quero orçamento", llm_string)[0].text == '{"produto": null}'
+    assert novo.lookup("Frase: quero orçamento", llm_string) is not None
+    assert novo.estatisticas()["acertos_disco"] == 1
+    assert novo.estatisticas()["acertos_memoria"] == 1
+
+
+def test_cache_llm_lru_em_memoria():
+    """
+    Deve manter no máximo `memoria_max` entradas em memória.
+    """
+    cache = CacheLLMEmCamadas("extracao", armazem=None, memoria_max=2)
+    for i in range(3):
+        cache.update(f"p{i}", "llm", [Generation(text=str(i))])
+
+    # ✅ A mais antiga saiu
+    assert cache.lookup("p0", "llm") is None
+    assert cache.lookup("p2", "llm")[0].text == "2"
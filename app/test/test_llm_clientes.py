@@ -0,0 +1,82 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from app.services import llm_clientes
+from app.services.llm_clientes import criar_llm, fechar_clientes
+
+
+class ServidorOpenAIFake(BaseHTTPRequestHandler):
+    """Stand-in local de /v1/chat/completions que registra a porta de cada conexão."""
+
+    protocol_version = "HTTP/1.1"
+    conexoes = set()
+    requisicoes = 0
+
+    def do_POST(self):
+        corpo = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        ServidorOpenAIFake.conexoes.add(self.client_address[1])
+        ServidorOpenAIFake.requisicoes += 1
+
+        resposta = json.dumps({
+            "id": "chatcmpl-teste",
+            "object": "chat.completion",
+            "created": 0,
+            "model": corpo["model"],
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "PERGUNTA_PRODUTO"},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(resposta)))
+        self.end_headers()
+        self.wfile.write(resposta)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def servidor():
+    ServidorOpenAIFake.conexoes = set()
+    ServidorOpenAIFake.requisicoes = 0
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), ServidorOpenAIFake)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/v1"
+    httpd.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_chains_reaproveitam_a_mesma_conexao(servidor, monkeypatch):
+    """
+    Dois LLMs (ex.: classificação e resposta) devem compartilhar o pool HTTP:
+    chamadas em sequência usam uma única conexão TCP com keep-alive.
+    """
+    monkeypatch.setattr(llm_clientes, "LLM_HTTP2", False)
+    await fechar_clientes()
+
+    llm_classificacao = criar_llm(base_url=servidor, api_key="teste", modelo="modelo-teste")
+    llm_resposta = criar_llm(base_url=servidor, api_key="teste", modelo="modelo-teste")
+
+    respostas = [
+        await llm_classificacao.ainvoke("Vocês têm piso vinílico?"),
+        await llm_resposta.ainvoke("Vocês têm piso vinílico?"),
+        await llm_classificacao.ainvoke("E forro de gesso?"),
+    ]
+    await fechar_clientes()
+
+    # ✅ Três chamadas, uma conexão
+    assert [r.content for r in respostas] == ["PERGUNTA_PRODUTO"] * 3
+    assert ServidorOpenAIFake.requisicoes == 3
+    assert len(ServidorOpenAIFake.conexoes) == 1
+
+
+def test_cliente_http_e_unico_no_processo(monkeypatch):
+    monkeypatch.setattr(llm_clientes, "LLM_HTTP2", False)
+
+    assert llm_clientes.http_async_client() is llm_clientes.http_async_client()
+    assert llm_clientes.http_client() is llm_clientes.http_client()
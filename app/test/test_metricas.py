@@ -0,0 +1,61 @@
+import asyncio
+import pytest
+from app.services.metricas import HistogramaLatencia, MedicaoTurno, medir, turno_atual, estatisticas_prometheus
+
+
+def test_histograma_em_formato_prometheus():
+    histograma = HistogramaLatencia("teste_duracao_segundos", "Teste.", buckets=(0.1, 1))
+    histograma.observar(0.05, "embedding", "PERGUNTA_PRODUTO", "produtos_servicos")
+    histograma.observar(0.5, "embedding", "PERGUNTA_PRODUTO", "produtos_servicos")
+
+    texto = histograma.prometheus()
+
+    # ✅ Buckets cumulativos, +Inf, soma e contagem com os rótulos
+    rotulos = 'etapa="embedding",intencao="PERGUNTA_PRODUTO",categoria="produtos_servicos"'
+    assert "# TYPE teste_duracao_segundos histogram" in texto
+    assert f'teste_duracao_segundos_bucket{{{rotulos},le="0.1"}} 1' in texto
+    assert f'teste_duracao_segundos_bucket{{{rotulos},le="1"}} 2' in texto
+    assert f'teste_duracao_segundos_bucket{{{rotulos},le="+Inf"}} 2' in texto
+    assert f"teste_duracao_segundos_count{{{rotulos}}} 2" in texto
+
+
+@pytest.mark.asyncio
+async def test_etapas_de_tarefas_paralelas_vao_para_o_turno():
+    """
+    Etapas medidas em tarefas do asyncio.gather recebem os rótulos definidos no fim do turno.
+    """
+    histograma = HistogramaLatencia("teste_duracao_segundos", "Teste.")
+    medicao = MedicaoTurno(histograma)
+    token = turno_atual.set(medicao)
+
+    async def etapa(nome):
+        with medir(nome):
+            await asyncio.sleep(0)
+
+    await asyncio.gather(etapa("sessao"), etapa("classificacao"))
+    turno_atual.reset(token)
+    medicao.finalizar("SAUDACAO", None)
+
+    series = histograma.series()
+    assert set(series) == {
+        ("sessao", "SAUDACAO", ""),
+        ("classificacao", "SAUDACAO", ""),
+        ("total", "SAUDACAO", ""),
+    }
+    assert all(s["total"] == 1 for s in series.values())
+
+
+def test_estatisticas_viram_gauges():
+    texto = estatisticas_prometheus("chat_componente", {"telemetria": {"descartados": 3, "nome": "x", "ativo": True}})
+
+    assert 'chat_componente{componente="telemetria",estatistica="descartados"} 3' in texto
+    assert "nome" not in texto.split("# TYPE")[1].split("\n", 1)[1]
+
+
+def test_intencao_desconhecida_vira_outro():
+    histograma = HistogramaLatencia("teste_duracao_segundos", "Teste.")
+    histograma.observar(0.1, "classificacao", "Claro! A intenção é PEDIDO_ORCAMENTO", "")
+    histograma.observar(0.1, "classificacao", "SAUDACAO", "")
+
+    # ✅ Texto livre do LLM não abre uma série nova por resposta
+    assert set(histograma.series()) == {("classificacao", "OUTRO", ""), ("classificacao", "SAUDACAO", "")}
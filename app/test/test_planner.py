@@ -0,0 +1,48 @@
+from app.services.planner import planejar_turno, concluir_turno, RESPOSTA_TRANSFERENCIA, RESPOSTA_ESPECIALISTA
+
+SEM_SLOTS = {"produto": None, "volume_aproximado": None, "localidade": None, "prazo": None}
+
+
+def test_pedido_orcamento_completo_dispensa_rag():
+    """
+    PEDIDO_ORCAMENTO com produto e localidade deve ter resposta fixa, sem RAG.
+    """
+    slots = {**SEM_SLOTS, "produto": "piso vinílico", "localidade": "Canoas"}
+    plano = planejar_turno("PEDIDO_ORCAMENTO", slots, eh_primeira_interacao=True)
+
+    # ✅ Nada de busca vetorial nem geração
+    assert plano["usar_rag"] is False
+    assert concluir_turno(plano) == (RESPOSTA_TRANSFERENCIA, "FINALIZADO")
+
+
+def test_confirmacao_com_slots_dispensa_rag():
+    """
+    CONFIRMACAO com produto e localidade deve montar o texto de encaminhamento, sem RAG.
+    """
+    slots = {**SEM_SLOTS, "produto": "forro", "localidade": "Porto Alegre"}
+    plano = planejar_turno("CONFIRMACAO", slots, eh_primeira_interacao=False)
+
+    resposta, etapa = concluir_turno(plano)
+
+    # ✅ Resposta fixa com os slots
+    assert plano["usar_rag"] is False
+    assert "forro" in resposta and "Porto Alegre" in resposta and "volume não informado" in resposta
+    assert etapa == "FINALIZADO"
+
+
+def test_pergunta_produto_usa_rag():
+    """
+    PERGUNTA_PRODUTO precisa do RAG e recebe saudação/encaminhamento conforme o caso.
+    """
+    plano = planejar_turno("PERGUNTA_PRODUTO", SEM_SLOTS, eh_primeira_interacao=True)
+
+    # ✅ RAG com categoria produtos_servicos
+    assert plano["usar_rag"] is True
+    assert plano["categoria"] == "produtos_servicos"
+
+    resposta, etapa = concluir_turno(plano, "Sim, trabalhamos com piso laminado.", ["doc"])
+    assert resposta == "Bom dia, tudo bem? Sim, trabalhamos com piso laminado."
+    assert etapa == "MEIO"
+
+    # ✅ Sem documentos, consulta um especialista
+    assert concluir_turno(plano, "qualquer coisa", []) == (RESPOSTA_ESPECIALISTA, "FINALIZADO")
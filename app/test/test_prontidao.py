@@ -0,0 +1,110 @@
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+from app.routes.health import router as health_router
+from app.services import prontidao
+from app.services.prontidao import EstadoProntidao, aquecer
+
+
+def _etapas_fake(monkeypatch, chamadas, falhas):
+    def fake(etapa):
+        async def executar(*args):
+            chamadas.append(etapa)
+            if falhas.get(etapa, 0) > 0:
+                falhas[etapa] -= 1
+                raise ConnectionError(f"{etapa} indisponível")
+        return executar
+
+    monkeypatch.setattr(prontidao, "_aquecer_embeddings", fake("embeddings"))
+    monkeypatch.setattr(prontidao, "_aquecer_pipeline", fake("pipeline"))
+    monkeypatch.setattr(prontidao, "_aquecer_qdrant", fake("qdrant"))
+    monkeypatch.setattr(prontidao, "_aquecer_prisma", fake("prisma"))
+    monkeypatch.setattr(prontidao, "_treinar_classificador", fake("classificador"))
+    monkeypatch.setattr(prontidao, "precarregar_modulos", lambda: None)
+
+
+@pytest.mark.asyncio
+async def test_aquecimento_repete_so_as_etapas_que_falharam(monkeypatch):
+    """
+    Se o Qdrant não responde na primeira tentativa, as etapas já aquecidas não são refeitas.
+    """
+    chamadas = []
+    _etapas_fake(monkeypatch, chamadas, {"qdrant": 1})
+    estado = EstadoProntidao()
+
+    await aquecer(estado, retentativa=0)
+
+    # ✅ Pronto no fim, com o Qdrant tentado duas vezes e o resto uma vez
+    assert estado.pronto
+    assert chamadas == ["embeddings", "pipeline", "qdrant", "qdrant", "prisma", "classificador"]
+    assert estado.erros == {}
+
+
+@pytest.mark.asyncio
+async def test_classificador_nao_bloqueia_prontidao(monkeypatch):
+    chamadas = []
+    _etapas_fake(monkeypatch, chamadas, {"classificador": 1})
+    estado = EstadoProntidao()
+
+    await aquecer(estado, retentativa=0)
+
+    assert estado.pronto
+    assert estado.etapas["classificador"] == "falhou"
+
+
+@pytest.mark.asyncio
+async def test_health_ready_so_fica_verde_depois_do_aquecimento():
+    """
+    /health/ready responde 503 enquanto alguma etapa obrigatória não passou e 200 depois.
+    """
+    app = FastAPI()
+    app.include_router(health_router)
+    app.state.prontidao = estado = EstadoProntidao()
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        aquecendo = await ac.get("/health/ready")
+        for etapa in ("embeddings", "pipeline", "qdrant", "prisma"):
+            estado.marcar(etapa, "ok")
+        pronto = await ac.get("/health/ready")
+        vivo = await ac.get("/health/live")
+
+    assert aquecendo.status_code == 503
+    assert aquecendo.json()["status"] == "aquecendo"
+    assert pronto.status_code == 200
+    assert pronto.json()["status"] == "pronto"
+    assert vivo.status_code == 200
+
+
+class QdrantVazio:
+    def __init__(self):
+        self.consultas = []
+
+    async def collection_exists(self, nome):
+        self.consultas.append(nome)
+        return False
+
+
+class RetrieverProibido:
+    async def ainvoke(self, consulta):
+        raise AssertionError("O aquecimento não deve buscar numa coleção que não existe")
+
+
+@pytest.mark.asyncio
+async def test_qdrant_sem_colecao_conta_como_aquecido(monkeypatch):
+    """
+    Numa implantação nova a coleção só aparece no primeiro upload: o Qdrant respondendo basta.
+    """
+    from app.services import rag_chain
+
+    qdrant = QdrantVazio()
+
+    async def carregar_falso():
+        return {"qdrant_async_client": qdrant, "retrievers": {None: RetrieverProibido()}}
+
+    monkeypatch.setattr(rag_chain, "carregar_pipeline", carregar_falso)
+    estado = EstadoProntidao()
+
+    # ✅ Etapa obrigatória passa, sem busca vetorial
+    assert await prontidao._executar_etapa(estado, "qdrant", prontidao._aquecer_qdrant())
+    assert qdrant.consultas == [rag_chain.QDRANT_COLLECTION]
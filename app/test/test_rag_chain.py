@@ -24,7 +24,79 @@ async def test_setup_rag_chain_components():
     # ✅ Cadeias auxiliares
     assert resultado["classificacao_chain"] is not None, "Classificador não carregado"
     assert resultado["slot_filling_chain"] is not None, "Slot filler não carregado"
-    assert resultado["rag_chain"] is not None, "RAG chain não carregada"
+    assert resultado["retriever"] is not None, "Retriever não carregado"
+    assert resultado["answer_chain"] is not None, "Chain de resposta não carregada"
 
     # ✅ Histórico de conversa (pode ser vazio)
     assert isinstance(resultado["chat_history"], list), "Histórico de chat inválido"
+
+
+def test_pipeline_montado_uma_vez_por_processo():
+    """
+    Deve reutilizar o mesmo pipeline entre chamadas e expor
+    um retriever já montado por categoria.
+    """
+    from app.services.rag_chain import get_pipeline, CATEGORIAS_RAG
+
+    pipeline = get_pipeline()
+
+    # ✅ Mesma instância em chamadas seguidas
+    assert get_pipeline() is pipeline, "Pipeline foi remontado"
+
+    # ✅ Retrievers por categoria
+    for categoria in CATEGORIAS_RAG:
+        assert pipeline["retrievers"][categoria] is not None, f"Retriever ausente: {categoria}"
+
+
+def test_condensacao_heuristica():
+    """
+    Deve levar o último pedido para a busca só quando a pergunta depende do histórico.
+    """
+    from app.services.rag_chain import condensar_heuristica
+
+    historico = [("vocês trabalham com piso laminado?", "Sim, trabalhamos com piso laminado.")]
+
+    # ✅ Pergunta curta/anafórica ganha contexto
+    assert condensar_heuristica("e o preço?", historico) == "vocês trabalham com piso laminado? e o preço?"
+    assert "piso laminado" in condensar_heuristica("vocês fazem a instalação disso em Canoas?", historico)
+
+    # ✅ Pergunta independente fica como está
+    pergunta = "quais modelos de divisória acústica vocês têm disponíveis?"
+    assert condensar_heuristica(pergunta, historico) == pergunta
+    assert condensar_heuristica("e o preço?", []) == "e o preço?"
+
+
+@pytest.mark.asyncio
+async def test_pipeline_montado_uma_vez_com_requisicoes_concorrentes(monkeypatch):
+    """
+    Requisições que chegam durante o aquecimento esperam a mesma montagem,
+    feita numa thread, sem montar outra cópia nem bloquear o event loop.
+    """
+    import asyncio
+    import threading
+    from app.services import rag_chain
+
+    montagens = []
+    liberar = threading.Event()
+
+    def build_falso():
+        montagens.append(threading.current_thread())
+        liberar.wait(5)
+        return {"llm": "fake"}
+
+    monkeypatch.setattr(rag_chain, "build_pipeline", build_falso)
+    monkeypatch.setattr(rag_chain, "_pipeline", None)
+    monkeypatch.setattr(rag_chain, "_montagem", None)
+
+    tarefas = [asyncio.ensure_future(rag_chain.carregar_pipeline()) for _ in range(3)]
+    await asyncio.sleep(0.05)
+
+    # ✅ O loop segue livre enquanto monta; get_pipeline não monta dentro do loop
+    assert not any(t.done() for t in tarefas)
+    with pytest.raises(RuntimeError):
+        rag_chain.get_pipeline()
+
+    liberar.set()
+    resultados = await asyncio.gather(*tarefas)
+    assert len(montagens) == 1 and montagens[0] is not threading.main_thread()
+    assert all(r is resultados[0] for r in resultados)
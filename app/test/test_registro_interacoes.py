@@ -0,0 +1,75 @@
+import gzip
+from datetime import datetime
+from app.services.registro_interacoes import LogInteracoes, agregar_por_dia
+
+
+def _evento(sessao_id, dia, intencao="PERGUNTA_PRODUTO", tipo="interacao"):
+    timestamp = datetime.fromisoformat(f"{dia}T12:00:00").timestamp()
+    if tipo == "erro":
+        return {"tipo": "erro", "timestamp": timestamp, "sessao_id": sessao_id, "erro": "falha"}
+    return {
+        "tipo": "interacao", "timestamp": timestamp, "sessao_id": sessao_id, "etapa": "coleta",
+        "intencao": intencao, "pergunta": "tem piso?", "resposta": "Temos.",
+        "slots": {}, "documentos": [{"conteudo": "Piso vinílico", "origem": "catalogo"}],
+        "contexto": "rag", "tempo_execucao": 1.5,
+    }
+
+
+def test_segmentos_rotacionam_por_dia_e_indice_filtra(tmp_path):
+    """
+    Cada dia vai para um segmento gzip próprio; o índice permite ler só os segmentos
+    da sessão ou do dia pedidos.
+    """
+    log = LogInteracoes(tmp_path)
+    log.escrever_lote([_evento(1, "2026-01-10"), _evento(2, "2026-01-10")])
+    log.escrever_lote([_evento(1, "2026-01-11"), _evento(3, "2026-01-11", tipo="erro")])
+    log.fechar()
+
+    segmentos = sorted(tmp_path.glob("interacoes-*.ndjson.gz"))
+    assert len(segmentos) == 2
+    with gzip.open(segmentos[0], "rt", encoding="utf-8") as arquivo:
+        assert len(arquivo.readlines()) == 2
+
+    # ✅ Índice com dia e sessões de cada segmento
+    indice = log.indice()
+    assert sorted(e["dia"] for e in indice.values()) == ["2026-01-10", "2026-01-11"]
+    assert len(log.segmentos(sessao_id=2)) == 1
+    assert len(log.segmentos(desde="2026-01-11")) == 1
+
+    assert [e["sessao_id"] for e in log.ler(sessao_id=1)] == [1, 1]
+    assert [e["sessao_id"] for e in log.ler(desde="2026-01-11", ate="2026-01-11")] == [1, 3]
+
+
+def test_segmento_ativo_e_lido_antes_de_fechar(tmp_path):
+    log = LogInteracoes(tmp_path)
+    log.escrever_lote([_evento(7, "2026-01-10")])
+
+    # ✅ Ainda sem entrada no índice, mas legível até o último flush
+    assert log.indice() == {}
+    assert [e["sessao_id"] for e in log.ler(sessao_id=7)] == [7]
+    log.fechar()
+
+
+def test_rotacao_por_tamanho(tmp_path):
+    log = LogInteracoes(tmp_path, max_bytes=1)
+    for i in range(3):
+        log.escrever_lote([_evento(i, "2026-01-10")])
+    log.fechar()
+
+    assert len(list(tmp_path.glob("interacoes-*.ndjson.gz"))) == 3
+    assert len(list(log.ler())) == 3
+
+
+def test_agregado_diario():
+    eventos = [
+        _evento(1, "2026-01-10"),
+        _evento(2, "2026-01-10", intencao="PEDIDO_ORCAMENTO"),
+        _evento(3, "2026-01-10", tipo="erro"),
+    ]
+
+    dias = agregar_por_dia(eventos)
+
+    assert dias["2026-01-10"]["turnos"] == 2
+    assert dias["2026-01-10"]["erros"] == 1
+    assert dias["2026-01-10"]["intencoes"] == {"PERGUNTA_PRODUTO": 1, "PEDIDO_ORCAMENTO": 1}
+    assert dias["2026-01-10"]["tempo_medio"] == 1.5
@@ -0,0 +1,93 @@
+import pytest
+from app.services.semantic_cache import CacheSemantico
+
+
+class RelogioFake:
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self):
+        return self.agora
+
+
+def test_cache_semantico_acerto_por_similaridade():
+    """
+    Deve devolver a resposta salva para uma pergunta quase idêntica na mesma categoria.
+    """
+    cache = CacheSemantico(limiar=0.95)
+    cache.salvar([1.0, 0.0, 0.0], "produtos_servicos", "Sim, trabalhamos com piso laminado.", ["doc"])
+
+    entrada = cache.buscar([0.99, 0.05, 0.0], "produtos_servicos")
+
+    # ✅ Acerto com resposta e documentos
+    assert entrada is not None
+    assert entrada["resposta"] == "Sim, trabalhamos com piso laminado."
+    assert entrada["documentos"] == ["doc"]
+    assert cache.estatisticas()["acertos"] == 1
+
+
+def test_cache_semantico_respeita_categoria_e_limiar():
+    """
+    Não deve reaproveitar respostas de outra categoria nem abaixo do limiar.
+    """
+    cache = CacheSemantico(limiar=0.95)
+    cache.salvar([1.0, 0.0, 0.0], "produtos_servicos", "resposta", ["doc"])
+
+    # ✅ Outra categoria e pergunta distante não acertam
+    assert cache.buscar([1.0, 0.0, 0.0], "institucional") is None
+    assert cache.buscar([0.0, 1.0, 0.0], "produtos_servicos") is None
+    assert cache.estatisticas()["falhas"] == 2
+
+
+def test_cache_semantico_lru_ttl_e_invalidacao():
+    """
+    Deve remover entradas antigas por LRU/TTL e tudo ao trocar a base de conhecimento.
+    """
+    relogio = RelogioFake()
+    cache = CacheSemantico(limiar=0.9, max_entradas=2, ttl=60, relogio=relogio)
+    cache.salvar([1.0, 0.0], None, "a", ["doc"])
+    cache.salvar([0.0, 1.0], None, "b", ["doc"])
+    cache.buscar([1.0, 0.0], None)  # "a" passa a ser a mais recente
+    cache.salvar([0.7, 0.7], None, "c", ["doc"])
+
+    # ✅ LRU removeu "b"
+    assert cache.buscar([0.0, 1.0], None) is None
+
+    # ✅ TTL expira as entradas
+    relogio.agora = 120
+    assert cache.buscar([1.0, 0.0], None) is None
+
+    # ✅ Invalidação limpa e muda a versão da base
+    cache.salvar([1.0, 0.0], None, "d", ["doc"])
+    cache.invalidar()
+    assert cache.buscar([1.0, 0.0], None) is None
+    assert cache.estatisticas()["versao_base"] == 1
+
+
+def test_cache_semantico_descarta_resposta_de_versao_antiga():
+    """
+    Resposta gerada antes de um upload (invalidação) não entra no cache como se fosse nova.
+    """
+    cache = CacheSemantico(limiar=0.9)
+    versao_vista = cache.versao_base
+    cache.invalidar()
+
+    # ✅ Salvar com a versão vista na busca é recusado; com a atual, aceito
+    assert cache.salvar([1.0, 0.0], None, "resposta antiga", ["doc"], versao=versao_vista) is False
+    assert cache.buscar([1.0, 0.0], None) is None
+    assert cache.salvar([1.0, 0.0], None, "resposta nova", ["doc"], versao=cache.versao_base) is True
+
+
+@pytest.mark.asyncio
+async def test_cache_semantico_ignora_perguntas_com_historico():
+    """
+    Com histórico, a resposta depende da conversa: nem busca nem chave para salvar.
+    """
+    from app.services.semantic_cache import buscar_resposta_cache
+
+    entrada, chave = await buscar_resposta_cache(
+        "e o preço?", "produtos_servicos", [("vocês têm piso laminado?", "Sim.")]
+    )
+
+    assert entrada is None
+    assert chave is None
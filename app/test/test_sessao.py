@@ -0,0 +1,196 @@
+import asyncio
+import pytest
+from types import SimpleNamespace
+from app.services.cache_estado import CacheEstadosMemoria
+from app.services.metricas import latencia_etapas
+from app.services.sessao import (
+    CarregadorSessao, EstadoSessoes, PersistenciaTurnos, carregar_sessao, dados_turno, gravar_turno, preparar_slots,
+)
+
+
+class SessaoFalsa:
+    """Faz o papel de `prisma.sessao`, aplicando take/order_by do include como o banco faria."""
+
+    def __init__(self, fluxo):
+        self.fluxo = fluxo
+        self.consultas = []
+
+    async def find_unique(self, where, include=None):
+        self.consultas.append((where, include))
+        if where["token"] != "token-valido":
+            return None
+        opcoes = include["fluxo"]
+        fluxo = sorted(self.fluxo, key=lambda f: f.id, reverse=opcoes["order_by"]["id"] == "desc")
+        return SimpleNamespace(id=1, token=where["token"], fluxo=fluxo[:opcoes["take"]])
+
+
+def _prisma(turnos: int):
+    fluxo = [
+        SimpleNamespace(id=i, pedido=f"pergunta {i}", resposta=f"resposta {i}", slots=[SimpleNamespace(nome="produto", valor=f"produto {i}")])
+        for i in range(1, turnos + 1)
+    ]
+    return SimpleNamespace(sessao=SessaoFalsa(fluxo))
+
+
+@pytest.mark.asyncio
+async def test_sessao_com_turnos_mais_recentes_numa_consulta():
+    prisma = _prisma(8)
+
+    contexto = await carregar_sessao(prisma, "token-valido", turnos=3)
+
+    # ✅ Uma única consulta, trazendo os 3 últimos turnos em ordem cronológica
+    assert len(prisma.sessao.consultas) == 1
+    assert contexto["chat_history"] == [
+        ("pergunta 6", "resposta 6"), ("pergunta 7", "resposta 7"), ("pergunta 8", "resposta 8"),
+    ]
+    assert contexto["eh_primeira_interacao"] is False
+    assert contexto["slots"] == {"produto": "produto 8"}
+
+    contexto = await carregar_sessao(_prisma(0), "token-valido")
+    assert contexto["eh_primeira_interacao"] is True
+
+    with pytest.raises(ValueError):
+        await carregar_sessao(prisma, "token-invalido")
+
+
+@pytest.mark.asyncio
+async def test_carregador_consulta_cada_token_uma_vez_por_requisicao():
+    prisma = _prisma(2)
+    carregador = CarregadorSessao(prisma, EstadoSessoes())
+
+    primeira, segunda = await asyncio.gather(
+        carregador.carregar("token-valido"), carregador.carregar("token-valido")
+    )
+
+    assert primeira is segunda
+    assert len(prisma.sessao.consultas) == 1
+
+
+@pytest.mark.asyncio
+async def test_sessao_ativa_lida_do_cache_sem_consultar_o_banco():
+    prisma = _prisma(5)
+    estados = EstadoSessoes(CacheEstadosMemoria(), turnos=3)
+
+    await estados.carregar(prisma, "token-valido")
+    slots, _ = preparar_slots({"localidade": " Canoas ", "prazo": None})
+    await estados.registrar_turno("token-valido", "pergunta 6", "resposta 6", slots)
+    contexto = await estados.carregar(prisma, "token-valido")
+
+    # ✅ Só a primeira leitura vai ao banco; o turno novo entra no histórico e nos slots
+    assert len(prisma.sessao.consultas) == 1
+    assert [pedido for pedido, _ in contexto["chat_history"]] == ["pergunta 4", "pergunta 5", "pergunta 6"]
+    assert contexto["slots"] == {"produto": "produto 5", "localidade": "Canoas"}
+    assert contexto["sessao"].id == 1
+
+
+class BatchFalso:
+    def __init__(self, prisma):
+        self.prisma = prisma
+        self.fluxoconversa = SimpleNamespace(create=self._create)
+        self._operacoes = []
+
+    def _create(self, data):
+        self._operacoes.append(data)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *erro):
+        if erro[0] is None:
+            if self.prisma.falhar:
+                raise RuntimeError("banco fora do ar")
+            self.prisma.lotes.append(self._operacoes)
+
+
+class PrismaEscritaFalso:
+    def __init__(self, falhar: bool = False):
+        self.lotes = []
+        self.falhar = falhar
+        self.fluxoconversa = SimpleNamespace(create=self._create)
+
+    def batch_(self):
+        return BatchFalso(self)
+
+    async def _create(self, data):
+        if self.falhar:
+            raise RuntimeError("banco fora do ar")
+        self.lotes.append([data])
+
+
+@pytest.mark.asyncio
+async def test_write_behind_grava_turnos_em_lote():
+    prisma = PrismaEscritaFalso()
+
+    async def obter_prisma():
+        return prisma
+
+    persistencia = PersistenciaTurnos(obter_prisma, max_lote=2, intervalo=60)
+    medidas_antes = latencia_etapas.series().get(("persistencia", "", ""), {"total": 0})["total"]
+    for i in range(3):
+        slots, _ = preparar_slots({"produto": "piso", "prazo": None})
+        persistencia.registrar("token-valido", dados_turno(1, "MEIO", "PERGUNTA_PRODUTO", f"pergunta {i}", "ok", slots))
+    assert persistencia.pendente("token-valido")
+
+    await persistencia.encerrar()
+
+    # ✅ Três turnos em dois batch_(), com os slots como create aninhado
+    assert [len(lote) for lote in prisma.lotes] == [2, 1]
+    assert prisma.lotes[0][0]["slots"] == {"create": [{"nome": "produto", "valor": "piso"}]}
+    assert not persistencia.pendente("token-valido")
+    assert persistencia.estatisticas()["gravados"] == 3
+    # ✅ Cada batch_() é medido como "persistencia", sem rótulos de turno
+    assert latencia_etapas.series()[("persistencia", "", "")]["total"] - medidas_antes == 2
+
+
+@pytest.mark.asyncio
+async def test_turno_e_slots_num_unico_create_aninhado():
+    creates = []
+
+    async def create(data):
+        creates.append(data)
+        return SimpleNamespace(id=10)
+
+    prisma = SimpleNamespace(fluxoconversa=SimpleNamespace(create=create))
+    slots, erros = preparar_slots({
+        "produto": " piso vinílico ", "localidade": "Canoas", "volume_aproximado": 120,
+        "prazo": None, "extra": {"invalido": True},
+    })
+
+    fluxo = await gravar_turno(prisma, dados_turno(1, "FINALIZADO", "PEDIDO_ORCAMENTO", "quero piso", "ok", slots))
+
+    # ✅ Uma única escrita; o slot inválido é reportado sozinho sem derrubar os demais
+    assert fluxo.id == 10
+    assert len(creates) == 1
+    assert creates[0]["slots"]["create"] == [
+        {"nome": "produto", "valor": "piso vinílico"},
+        {"nome": "localidade", "valor": "Canoas"},
+        {"nome": "volume_aproximado", "valor": "120"},
+    ]
+    assert list(erros) == ["extra"]
+
+
+@pytest.mark.asyncio
+async def test_turno_que_nao_chega_ao_banco_tira_a_sessao_do_cache():
+    prisma = _prisma(2)
+    prisma_escrita = PrismaEscritaFalso(falhar=True)
+
+    async def obter_prisma():
+        return prisma_escrita
+
+    persistencia = PersistenciaTurnos(obter_prisma, intervalo=60)
+    estados = EstadoSessoes(CacheEstadosMemoria(), persistencia)
+    slots, _ = preparar_slots({"produto": "forro"})
+
+    # ✅ Write-behind: o lote e o turno isolado falham, e o cache não fica com um turno que o banco não tem
+    await estados.carregar(prisma, "token-valido")
+    await estados.registrar_turno("token-valido", "pergunta 3", "resposta 3", slots)
+    persistencia.registrar("token-valido", dados_turno(1, "MEIO", "PERGUNTA_PRODUTO", "pergunta 3", "resposta 3", slots))
+    await persistencia.encerrar()
+    assert await estados.cache.obter("token-valido") is None
+    assert persistencia.estatisticas()["falhas"] == 1
+
+    # ✅ Gravação direta (sem write-behind): mesma coisa, e o erro continua subindo
+    await estados.carregar(prisma, "token-valido")
+    with pytest.raises(RuntimeError):
+        await estados.gravar_turno(prisma_escrita, "token-valido", dados_turno(1, "MEIO", "OUTRO", "p", "r", slots))
+    assert await estados.cache.obter("token-valido") is None
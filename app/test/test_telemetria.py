@@ -0,0 +1,65 @@
+import threading
+from app.services.telemetria import EscritorTelemetria, evento_erro
+
+
+def test_eventos_sao_gravados_em_lote_no_encerramento():
+    """
+    Eventos enfileirados devem ser gravados pela thread em lotes de até `max_lote`,
+    e `encerrar` grava o que ainda estiver na fila.
+    """
+    lotes = []
+    escritor = EscritorTelemetria(lotes.append, max_fila=100, max_lote=3, intervalo=0.01)
+
+    for i in range(7):
+        assert escritor.registrar(evento_erro(i, "falha"))
+    escritor.encerrar()
+
+    # ✅ Todos gravados, na ordem, sem lote maior que 3
+    gravados = [evento["sessao_id"] for lote in lotes for evento in lote]
+    assert gravados == list(range(7))
+    assert max(len(lote) for lote in lotes) <= 3
+    assert escritor.estatisticas()["escritos"] == 7
+
+
+def test_fila_cheia_descarta_e_conta():
+    """
+    Com a gravação travada e a fila cheia, `registrar` não bloqueia: descarta e conta.
+    """
+    gravando = threading.Event()
+    liberar = threading.Event()
+
+    def escrever_lento(lote):
+        gravando.set()
+        liberar.wait(5)
+
+    escritor = EscritorTelemetria(escrever_lento, max_fila=2, max_lote=1, intervalo=0.01)
+    escritor.registrar(evento_erro("a", "x"))
+    assert gravando.wait(5)
+
+    resultados = [escritor.registrar(evento_erro(s, "x")) for s in ("b", "c", "d")]
+    liberar.set()
+    escritor.encerrar()
+
+    # ✅ Dois cabem na fila, o terceiro é descartado
+    assert resultados == [True, True, False]
+    stats = escritor.estatisticas()
+    assert stats["descartados"] == 1
+    assert stats["escritos"] == 3
+
+
+def test_falha_na_gravacao_nao_derruba_a_thread():
+    chamadas = []
+
+    def escrever(lote):
+        chamadas.append(lote)
+        if len(chamadas) == 1:
+            raise OSError("disco cheio")
+
+    escritor = EscritorTelemetria(escrever, max_lote=1, intervalo=0.01)
+    escritor.registrar(evento_erro("a", "x"))
+    escritor.registrar(evento_erro("b", "x"))
+    escritor.encerrar()
+
+    stats = escritor.estatisticas()
+    assert stats["falhas"] == 1
+    assert stats["escritos"] == 1
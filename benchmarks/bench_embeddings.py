@@ -0,0 +1,125 @@
+"""
+Compara os backends de embeddings com o baseline fp32 (sentence-transformers):
+- latência por consulta (p50/p95) e vazão de documentos por segundo
+- concordância de recuperação: sobreposição do top-k de cada consulta contra o fp32
+
+O corpus vem da coleção do Qdrant ou de um JSON no formato do /upload-conhecimento.
+
+Uso:
+    python -m benchmarks.bench_embeddings [--backends onnx,onnx_int8,int8] [--base conhecimento.json] [--k 3]
+    python -m benchmarks.bench_embeddings --exportar-onnx modelos/bge-large-onnx
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+import numpy as np
+from app.services.embedding_backends import EMBEDDING_MODEL, EMBEDDING_MODEL_DIR, criar_backend, exportar_onnx
+from app.services.intent_classifier import carregar_exemplos_mlruns
+
+QDRANT_URL = os.getenv("QDRANT_URL", "http://localhost:6333")
+QDRANT_COLLECTION = "cemear_knowledge_base"
+
+CONSULTAS = [
+    "Vocês trabalham com divisórias acústicas?",
+    "Quero orçamento de piso vinílico para Canoas",
+    "O forro de gesso é resistente à umidade?",
+    "Quais tipos de brise vocês instalam?",
+    "Onde fica a Cemear e qual o horário de atendimento?",
+    "Vocês fazem manutenção de forro mineral?",
+    "Qual a diferença entre piso laminado e vinílico?",
+    "Há quanto tempo a empresa existe?",
+]
+
+
+def carregar_corpus(arquivo: str = None, limite: int = 2000):
+    if arquivo:
+        with open(arquivo, encoding="utf-8") as f:
+            return [item["conteudo"] for item in json.load(f) if item.get("conteudo")][:limite]
+
+    from qdrant_client import QdrantClient
+
+    cliente = QdrantClient(url=QDRANT_URL)
+    pontos, _ = cliente.scroll(QDRANT_COLLECTION, limit=limite, with_payload=True, with_vectors=False)
+    return [p.payload["page_content"] for p in pontos if p.payload.get("page_content")]
+
+
+def carregar_consultas():
+    perguntas = [texto for texto, _ in carregar_exemplos_mlruns() if texto]
+    return list(dict.fromkeys(CONSULTAS + perguntas))
+
+
+def _top_k(consultas: np.ndarray, corpus: np.ndarray, k: int) -> np.ndarray:
+    return np.argsort(-(consultas @ corpus.T), axis=1)[:, :k]
+
+
+def medir(backend, corpus, consultas, k):
+    backend.embed_documents(consultas[:2])  # aquecimento
+
+    latencias = []
+    vetores_consultas = []
+    for consulta in consultas:
+        inicio = time.perf_counter()
+        vetores_consultas.append(backend.embed_query(consulta))
+        latencias.append(time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    vetores_corpus = backend.embed_documents(corpus)
+    duracao_corpus = time.perf_counter() - inicio
+
+    latencias.sort()
+    return {
+        "p50_ms": statistics.median(latencias) * 1000,
+        "p95_ms": latencias[max(0, int(len(latencias) * 0.95) - 1)] * 1000,
+        "docs_por_s": len(corpus) / duracao_corpus if duracao_corpus else 0.0,
+        "top_k": _top_k(
+            np.asarray(vetores_consultas, dtype=np.float32), np.asarray(vetores_corpus, dtype=np.float32), k
+        ),
+    }
+
+
+def sobreposicao(top_k: np.ndarray, referencia: np.ndarray) -> float:
+    k = referencia.shape[1]
+    return float(np.mean([len(set(a) & set(b)) / k for a, b in zip(top_k, referencia)]))
+
+
+def main(backends, arquivo, diretorio_onnx, k):
+    corpus = carregar_corpus(arquivo)
+    consultas = carregar_consultas()
+    if len(corpus) < k:
+        raise SystemExit(f"Corpus com {len(corpus)} documentos; são necessários pelo menos {k}.")
+    print(f"corpus: {len(corpus)} documentos | consultas: {len(consultas)} | k={k}")
+
+    resultados = {"sentence_transformers": medir(criar_backend("sentence_transformers"), corpus, consultas, k)}
+    for nome in backends:
+        if nome == "sentence_transformers":
+            continue
+        try:
+            diretorio = diretorio_onnx if nome.startswith("onnx") else None
+            resultados[nome] = medir(criar_backend(nome, diretorio), corpus, consultas, k)
+        except Exception as e:
+            print(f"[WARN] Backend {nome} indisponível: {e}")
+
+    referencia = resultados["sentence_transformers"]["top_k"]
+    print(f"\n{'backend':<22}{'p50 ms':>9}{'p95 ms':>9}{'docs/s':>9}{'top-k':>8}")
+    for nome, r in resultados.items():
+        print(
+            f"{nome:<22}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['docs_por_s']:>9.1f}"
+            f"{sobreposicao(r['top_k'], referencia):>8.1%}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default="onnx,onnx_int8,int8")
+    parser.add_argument("--base", help="JSON no formato do /upload-conhecimento (padrão: coleção do Qdrant)")
+    parser.add_argument("--onnx-dir", help="diretório com model.onnx / model_int8.onnx (padrão: EMBEDDING_MODEL_DIR)")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--exportar-onnx", metavar="DESTINO", help="exporta o modelo para ONNX (fp32 e int8) e sai")
+    args = parser.parse_args()
+
+    if args.exportar_onnx:
+        exportar_onnx(EMBEDDING_MODEL_DIR or EMBEDDING_MODEL, args.exportar_onnx)
+    else:
+        main([b.strip() for b in args.backends.split(",") if b.strip()], args.base, args.onnx_dir, args.k)
@@ -0,0 +1,101 @@
+"""
+Compara os modos de extração de intenção + slots:
+- separada: classificador e slot filling (duas chamadas, três se o JSON precisar de correção)
+- combinada: uma única chamada em JSON mode com validação estrita
+
+O cache exato de LLM é desligado: com ele, as repetições (e toda execução depois da
+primeira) viriam do cache e contariam como chamadas de ~0 ms.
+
+Uso:
+    python -m benchmarks.bench_extracao [--repeticoes 3]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from langchain_core.callbacks import BaseCallbackHandler
+from app.services import llm_cache
+from app.services.rag_chain import carregar_pipeline
+from app.services.extracao import extrair_separado, extrair_intencao_e_slots
+
+FRASES = [
+    "Bom dia",
+    "Quero orçamento de piso vinílico para Canoas",
+    "Vocês trabalham com divisórias acústicas?",
+    "Preciso de 200 m² de forro de gesso em Porto Alegre até o fim do mês",
+    "Tem vaga de emprego aí?",
+    "Vocês atendem em Manaus?",
+    "Isso mesmo, pode seguir",
+    "Obrigado, tchau",
+]
+
+
+class ContadorChamadasLLM(BaseCallbackHandler):
+    def __init__(self):
+        self.chamadas = 0
+
+    def on_llm_start(self, *args, **kwargs):
+        self.chamadas += 1
+
+    def on_chat_model_start(self, *args, **kwargs):
+        self.chamadas += 1
+
+
+async def _medir(nome, extrator, pipeline, repeticoes):
+    latencias = []
+    contador = ContadorChamadasLLM()
+    resultados = {}
+
+    for _ in range(repeticoes):
+        for frase in FRASES:
+            inicio = time.perf_counter()
+            resultados[frase] = await extrator(pipeline, frase, contador)
+            latencias.append(time.perf_counter() - inicio)
+
+    total = len(latencias)
+    print(f"\n== {nome} ==")
+    print(f"turnos: {total}")
+    print(f"chamadas LLM por turno: {contador.chamadas / total:.2f}")
+    print(f"latência média: {statistics.mean(latencias) * 1000:.0f} ms")
+    print(f"latência p95: {sorted(latencias)[int(total * 0.95) - 1] * 1000:.0f} ms")
+    return resultados
+
+
+def _com_callbacks(pipeline, contador):
+    config = {"callbacks": [contador]}
+    return {
+        nome: chain.with_config(config) if nome.endswith("_chain") else chain
+        for nome, chain in pipeline.items()
+    }
+
+
+async def _separado(pipeline, frase, contador):
+    return await extrair_separado(_com_callbacks(pipeline, contador), frase)
+
+
+async def _combinado(pipeline, frase, contador):
+    return await extrair_intencao_e_slots(_com_callbacks(pipeline, contador), frase, modo="combinada")
+
+
+async def main(repeticoes):
+    # 🔹 Toda chamada vai ao modelo: sem cache exato (memória nem SQLite) nas chains
+    llm_cache.LLM_CACHE_CHAINS = ()
+    pipeline = await carregar_pipeline()
+    if llm_cache.caches_llm:
+        raise SystemExit(f"Cache de LLM ativo nas chains {sorted(llm_cache.caches_llm)}; medição inválida")
+
+    separado = await _medir("separada", _separado, pipeline, repeticoes)
+    combinado = await _medir("combinada", _combinado, pipeline, repeticoes)
+
+    iguais = sum(1 for f in FRASES if separado[f][0] == combinado[f][0])
+    print(f"\nconcordância de intenção: {iguais}/{len(FRASES)}")
+    for frase in FRASES:
+        if separado[frase] != combinado[frase]:
+            print(f"- {frase!r}\n  separada:  {separado[frase]}\n  combinada: {combinado[frase]}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.repeticoes))
@@ -0,0 +1,85 @@
+"""
+Mede o import a frio de `app.main` com `python -X importtime` num processo novo:
+- tempo total e os módulos mais caros (cumulativo)
+- módulos pesados que deveriam ser carregados só no primeiro uso ou no aquecimento
+
+Sai com código 1 se o tempo passar do orçamento ou se algum módulo pesado for importado.
+
+Uso:
+    python -m benchmarks.bench_importtime [--orcamento-ms 2000] [--top 15]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+IMPORT_ORCAMENTO_MS = float(os.getenv("IMPORT_ORCAMENTO_MS", "2000"))
+
+# Nada disso pode ser importado só por carregar a aplicação
+MODULOS_PESADOS = (
+    "mlflow",
+    "torch",
+    "transformers",
+    "sentence_transformers",
+    "onnxruntime",
+    "qdrant_client",
+    "langchain",
+    "langchain_core",
+    "langchain_community",
+    "langchain_openai",
+    "app.generated.types",
+    "app.generated.actions",
+)
+
+
+def medir_import(modulo: str = "app.main") -> dict:
+    codigo = f"import sys, json, {modulo}; print(json.dumps(sorted(sys.modules)))"
+    processo = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        cwd=RAIZ, env={**os.environ, "PYTHONPATH": str(RAIZ)},
+        capture_output=True, text=True, check=True,
+    )
+
+    tempos = {}
+    for linha in processo.stderr.splitlines():
+        if not linha.startswith("import time:") or "|" not in linha:
+            continue
+        _, cumulativo, nome = linha.split(":", 1)[1].split("|")
+        if cumulativo.strip().isdigit():
+            tempos[nome.strip()] = int(cumulativo) / 1000
+
+    carregados = set(json.loads(processo.stdout.strip().splitlines()[-1]))
+    return {
+        "total_ms": tempos.get(modulo, 0.0),
+        "ranking": sorted(tempos.items(), key=lambda item: item[1], reverse=True),
+        "pesados": sorted(m for m in MODULOS_PESADOS if m in carregados),
+    }
+
+
+def main(orcamento_ms: float, top: int) -> int:
+    resultado = medir_import()
+
+    print(f"import a frio de app.main: {resultado['total_ms']:.0f} ms (orçamento {orcamento_ms:.0f} ms)")
+    print(f"\n{'módulo':<50}{'cumulativo ms':>15}")
+    for nome, ms in resultado["ranking"][:top]:
+        print(f"{nome:<50}{ms:>15.1f}")
+
+    falhou = False
+    if resultado["pesados"]:
+        print(f"\n[ERRO] Módulos pesados importados na subida: {', '.join(resultado['pesados'])}")
+        falhou = True
+    if resultado["total_ms"] > orcamento_ms:
+        print(f"\n[ERRO] Import de app.main passou do orçamento de {orcamento_ms:.0f} ms")
+        falhou = True
+    return 1 if falhou else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orcamento-ms", type=float, default=IMPORT_ORCAMENTO_MS)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+    sys.exit(main(args.orcamento_ms, args.top))